@@ -3,17 +3,26 @@ import logging
 import uuid
 import json
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, stream_with_context, g
 
 # Import backend modules
 from backend.intent_parser import parse_user_prompt
-from backend.ai_agent import generate_strategies, optimize_strategy
-from backend.data_fetcher import get_stock_data, search_stock
+from backend.ai_agent import generate_strategies
+from backend.data_fetcher import get_stock_data, search_stock, twelvedata, stock_data_flights, search_flights
+from backend.symbol_index import symbol_index, search_cache
+from backend.prefetch import PREFETCH_ENABLED, prefetch_scheduler
 from backend.backtester import run_backtest
+from backend.indicator_cache import indicator_cache
+from backend.bar_cache import bar_cache
+from backend.optimizer import DEFAULT_PARAMETER_SPACE, build_search_space, optimize_parameters
+from backend.walk_forward import walk_forward, window_lengths
+from backend.universe import run_universe
+from backend.payload import compact_results, payload_options
 from backend.strategy_store import save_strategy, get_user_strategies, get_all_strategies
+from backend.instrumentation import LOG_LEVEL, TIMINGS_ENABLED, span, start_trace, finish_trace, route_timings
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
@@ -33,12 +42,48 @@ if not os.path.exists('data/user_strategies.json'):
     with open('data/user_strategies.json', 'w') as f:
         json.dump({}, f)
 
+# Keep the bar cache warm for popular and saved tickers outside peak hours
+if PREFETCH_ENABLED:
+    prefetch_scheduler.start()
+
 # User session management
 @app.before_request
 def check_user_session():
     if 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
-        logger.debug(f"New user session created: {session['user_id']}")
+        logger.debug("New user session created: %s", session['user_id'])
+
+def timings_requested():
+    """True when the request asks for its stage timings (?debug=1 or "debug": true)."""
+    if request.args.get('debug', '').lower() in ('1', 'true', 'yes'):
+        return True
+    body = request.get_json(silent=True) if request.is_json else None
+    return isinstance(body, dict) and bool(body.get('debug'))
+
+# Stage timings: recorded for every request when TIMINGS_ENABLED is set,
+# otherwise only for requests with the debug flag
+@app.before_request
+def start_request_trace():
+    g.timings_debug = timings_requested()
+    if TIMINGS_ENABLED or g.timings_debug:
+        start_trace()
+
+@app.after_request
+def finish_request_trace(response):
+    trace = finish_trace()
+    if trace is None:
+        return response
+    
+    summary = trace.summary()
+    route_timings.record(request.endpoint or request.path, summary)
+    
+    # Streamed bodies are still being produced and are left untouched
+    if g.get('timings_debug') and response.is_json and not response.is_streamed:
+        body = response.get_json(silent=True)
+        if isinstance(body, dict):
+            body['timings'] = summary
+            response.set_data(json.dumps(body))
+    return response
 
 # Routes
 @app.route('/')
@@ -52,7 +97,7 @@ def parse_intent():
         parsed_intent = parse_user_prompt(user_prompt)
         return jsonify(parsed_intent)
     except Exception as e:
-        logger.error(f"Error parsing intent: {str(e)}")
+        logger.error("Error parsing intent: %s", e)
         return jsonify({"error": f"Failed to parse intent: {str(e)}"}), 500
 
 @app.route('/generate_strategies', methods=['POST'])
@@ -62,7 +107,7 @@ def create_strategies():
         strategies = generate_strategies(parsed_intent)
         return jsonify(strategies)
     except Exception as e:
-        logger.error(f"Error generating strategies: {str(e)}")
+        logger.error("Error generating strategies: %s", e)
         return jsonify({"error": f"Failed to generate strategies: {str(e)}"}), 500
 
 @app.route('/strategy/<strategy_id>')
@@ -88,14 +133,44 @@ def backtest():
     try:
         # Get historical data
         stock_data = get_stock_data(ticker, years=5)
+        prefetch_scheduler.record(ticker, strategy_params)
         
         # Run backtest
         results = run_backtest(stock_data, strategy_params)
-        return jsonify(results)
+        
+        # Downsample and round the curves unless full resolution is requested
+        with span('serialize'):
+            return jsonify(compact_results(results, dates=stock_data['dates'], **payload_options(data)))
     except Exception as e:
-        logger.error(f"Error running backtest: {str(e)}")
+        logger.error("Error running backtest: %s", e)
         return jsonify({"error": f"Failed to run backtest: {str(e)}"}), 500
 
+@app.route('/backtest_universe', methods=['POST'])
+def backtest_universe():
+    data = request.json
+    strategy_params = data.get('strategy_params', {})
+    
+    try:
+        events = run_universe(data.get('tickers', []), strategy_params, years=data.get('years', 5))
+    except Exception as e:
+        logger.error("Error running universe backtest: %s", e)
+        return jsonify({"error": f"Failed to run universe backtest: {str(e)}"}), 400
+    
+    if not data.get('stream', True):
+        results = []
+        for event in events:
+            event_type = event.pop('event')
+            if event_type == 'summary':
+                return jsonify({**event, 'results': results})
+            results.append(event)
+    
+    # One JSON object per line: each symbol as it finishes, then the summary
+    def generate():
+        for event in events:
+            yield json.dumps(event) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/optimize', methods=['POST'])
 def optimize():
     data = request.json
@@ -103,17 +178,97 @@ def optimize():
     strategy_params = data.get('strategy_params', {})
     optimization_goal = data.get('optimization_goal', 'sharpe')
     
+    try:
+        build_search_space(data.get('parameter_space') or DEFAULT_PARAMETER_SPACE, strategy_params)
+    except Exception as e:
+        return jsonify({"error": f"Invalid parameter space: {str(e)}"}), 400
+    
     try:
         # Get historical data
         stock_data = get_stock_data(ticker, years=5)
+        prefetch_scheduler.record(ticker, strategy_params)
         
-        # Optimize strategy
-        optimized_params = optimize_strategy(stock_data, strategy_params, optimization_goal)
-        return jsonify(optimized_params)
+        # Search the strategy's parameter space by running backtests
+        results = optimize_parameters(
+            stock_data,
+            strategy_params,
+            parameter_space=data.get('parameter_space'),
+            optimization_goal=optimization_goal,
+            method=data.get('method', 'grid'),
+            max_evals=data.get('max_evals'),
+            time_budget=data.get('time_budget')
+        )
+        with span('serialize'):
+            return jsonify(results)
     except Exception as e:
-        logger.error(f"Error optimizing strategy: {str(e)}")
+        logger.error("Error optimizing strategy: %s", e)
         return jsonify({"error": f"Failed to optimize strategy: {str(e)}"}), 500
 
+@app.route('/walk_forward', methods=['POST'])
+def walk_forward_endpoint():
+    data = request.json
+    ticker = data.get('ticker', '')
+    strategy_params = data.get('strategy_params', {})
+    
+    try:
+        in_sample_bars, out_of_sample_bars = window_lengths(data.get('in_sample_bars'), data.get('out_of_sample_bars'))
+        build_search_space(data.get('parameter_space') or DEFAULT_PARAMETER_SPACE, strategy_params)
+    except Exception as e:
+        return jsonify({"error": f"Invalid walk-forward request: {str(e)}"}), 400
+    
+    try:
+        # Get historical data
+        stock_data = get_stock_data(ticker, years=5)
+        
+        # Optimize on rolling in-sample windows and validate out-of-sample
+        results = walk_forward(
+            stock_data,
+            strategy_params,
+            parameter_space=data.get('parameter_space'),
+            optimization_goal=data.get('optimization_goal', 'sharpe'),
+            method=data.get('method', 'grid'),
+            in_sample_bars=in_sample_bars,
+            out_of_sample_bars=out_of_sample_bars,
+            max_evals=data.get('max_evals'),
+            time_budget=data.get('time_budget')
+        )
+        with span('serialize'):
+            return jsonify(compact_results(
+                results,
+                dates=results['out_of_sample_dates'],
+                dates_key='out_of_sample_dates',
+                **payload_options(data)
+            ))
+    except Exception as e:
+        logger.error("Error running walk-forward: %s", e)
+        return jsonify({"error": f"Failed to run walk-forward: {str(e)}"}), 500
+
+@app.route('/indicator_cache_stats', methods=['GET'])
+def indicator_cache_stats():
+    return jsonify(indicator_cache.stats())
+
+@app.route('/bar_cache_stats', methods=['GET'])
+def bar_cache_stats():
+    return jsonify(bar_cache.stats())
+
+@app.route('/upstream_stats', methods=['GET'])
+def upstream_stats():
+    # Requests, retries and rate limit waits of the TwelveData client, and
+    # the calls that waited on an identical one in flight instead
+    stats = twelvedata.stats()
+    stats['coalescing'] = {'stock_data': stock_data_flights.stats(), 'search': search_flights.stats()}
+    stats['symbol_search'] = {'index': symbol_index.stats(), 'cache': search_cache.stats()}
+    return jsonify(stats)
+
+@app.route('/prefetch_stats', methods=['GET'])
+def prefetch_stats():
+    return jsonify(prefetch_scheduler.stats())
+
+@app.route('/timings', methods=['GET'])
+def timings():
+    # Per-route request and stage timings recorded by this process
+    return jsonify(route_timings.stats())
+
 @app.route('/save_strategy', methods=['POST'])
 def save_user_strategy():
     strategy_data = request.json
@@ -128,7 +283,7 @@ def save_user_strategy():
         save_strategy(user_id, strategy_data)
         return jsonify({"success": True, "strategy_id": strategy_data['id']})
     except Exception as e:
-        logger.error(f"Error saving strategy: {str(e)}")
+        logger.error("Error saving strategy: %s", e)
         return jsonify({"error": f"Failed to save strategy: {str(e)}"}), 500
 
 @app.route('/library')
@@ -149,7 +304,7 @@ def search_stock_endpoint():
         results = search_stock(query)
         return jsonify(results)
     except Exception as e:
-        logger.error(f"Error searching stock: {str(e)}")
+        logger.error("Error searching stock: %s", e)
         return jsonify({"error": f"Failed to search stock: {str(e)}"}), 500
 
 if __name__ == '__main__':
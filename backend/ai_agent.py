@@ -4,8 +4,10 @@ import logging
 import uuid
 from openai import OpenAI
 
+from backend.instrumentation import LOG_LEVEL, span
+
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 # Initialize OpenAI client
@@ -24,7 +26,7 @@ def generate_strategies(parsed_intent):
     Returns:
         list: Three trading strategies as JSON
     """
-    logger.debug(f"Generating strategies for intent: {parsed_intent}")
+    logger.debug("Generating strategies for intent: %s", parsed_intent)
     
     system_message = """
     You are an expert financial analyst and algorithmic trading specialist.
@@ -49,14 +51,15 @@ def generate_strategies(parsed_intent):
     """
     
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": json.dumps(parsed_intent)}
-            ],
-            response_format={"type": "json_object"}
-        )
+        with span('llm'):
+            response = openai.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": json.dumps(parsed_intent)}
+                ],
+                response_format={"type": "json_object"}
+            )
         
         strategies_data = json.loads(response.choices[0].message.content)
         
@@ -81,70 +84,11 @@ def generate_strategies(parsed_intent):
             with open('data/all_strategies.json', 'w') as f:
                 json.dump(all_strategies, f, indent=2)
         except Exception as e:
-            logger.error(f"Error saving generated strategies: {str(e)}")
+            logger.error("Error saving generated strategies: %s", e)
         
-        logger.debug(f"Generated {len(strategies_data['strategies'])} strategies")
+        logger.debug("Generated %s strategies", len(strategies_data['strategies']))
         return strategies_data['strategies']
         
     except Exception as e:
-        logger.error(f"Error generating strategies: {str(e)}")
+        logger.error("Error generating strategies: %s", e)
         raise Exception(f"Failed to generate strategies: {str(e)}")
-
-def optimize_strategy(stock_data, strategy_params, optimization_goal='sharpe'):
-    """
-    Optimize the strategy parameters based on historical data.
-    
-    Args:
-        stock_data (dict): Historical stock data
-        strategy_params (dict): Current strategy parameters
-        optimization_goal (str): Metric to optimize for (sharpe, return, drawdown)
-        
-    Returns:
-        dict: Optimized strategy parameters
-    """
-    logger.debug(f"Optimizing strategy with goal: {optimization_goal}")
-    
-    system_message = f"""
-    You are an expert in algorithmic trading and strategy optimization.
-    Based on the provided historical stock data summary and the current strategy parameters,
-    suggest optimized parameters to maximize the {optimization_goal} ratio.
-    
-    Current strategy parameters: {json.dumps(strategy_params)}
-    
-    Analyze the data patterns and suggest improved parameter values that would likely 
-    enhance the strategy's performance for the optimization goal.
-    
-    Respond with a JSON object containing the optimized parameters, maintaining the same
-    structure as the input parameters but with improved values.
-    """
-    
-    # Create a summary of the stock data for the prompt
-    data_summary = {
-        "ticker": stock_data.get("ticker", "Unknown"),
-        "period": f"{stock_data.get('start_date', 'Unknown')} to {stock_data.get('end_date', 'Unknown')}",
-        "data_points": len(stock_data.get("prices", [])),
-        "price_range": {
-            "min": min(stock_data.get("prices", [0])) if stock_data.get("prices") else 0,
-            "max": max(stock_data.get("prices", [0])) if stock_data.get("prices") else 0
-        },
-        "trends": "The data shows typical market cycles with both uptrends and downtrends."
-    }
-    
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": json.dumps(data_summary)}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        optimized_params = json.loads(response.choices[0].message.content)
-        logger.debug(f"Optimized parameters generated: {optimized_params}")
-        
-        return optimized_params
-        
-    except Exception as e:
-        logger.error(f"Error optimizing strategy: {str(e)}")
-        raise Exception(f"Failed to optimize strategy: {str(e)}")
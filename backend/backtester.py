@@ -1,24 +1,68 @@
+import os
 import logging
-import math
 import numpy as np
 from datetime import datetime
 
+from backend.indicators import as_price_array, sma, ema, rsi, bollinger_bands, macd
+from backend.indicator_cache import data_version
+from backend.indicator_graph import IndicatorGraph, strategy_indicators
+from backend.signals import entry_signals, exit_signals, batch_signals
+from backend.simulation import PositionState, warmup_bars, simulate_trades, resume_position, equity_curve
+from backend.chunked import ChunkedIndicators
+from backend.bars import DateColumn
+from backend.metrics import (TRADING_DAYS, periods_per_year, equity_metrics, trade_metrics, trade_arrays,
+                             position_arrays, exposure, round_metrics, empty_metrics)
+from backend.instrumentation import LOG_LEVEL, span
+
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
-def run_backtest(stock_data, strategy_params):
+# Parameter sets evaluated together as one (sets x bars) block in a batch
+BATCH_ROWS = 64
+
+# Histories longer than this many bars are backtested chunk by chunk, which
+# bounds the memory used by indicators and signals to one chunk
+CHUNK_BARS = int(os.environ.get("BACKTEST_CHUNK_BARS", 262144))
+
+# The stock data fields a backtest reads; the rest need not reach workers
+BACKTEST_FIELDS = ('ticker', 'interval', 'dates', 'prices')
+
+def backtest_data(stock_data, ticker=None):
+    """
+    Keep only the stock data fields a backtest reads.
+
+    Args:
+        stock_data (dict): Historical stock data
+        ticker (str): Ticker to label the result with, if not the data's own
+
+    Returns:
+        dict: The BACKTEST_FIELDS of stock_data
+    """
+    data = {key: stock_data.get(key) for key in BACKTEST_FIELDS}
+    if ticker is not None:
+        data['ticker'] = ticker
+    return data
+
+def run_backtest(stock_data, strategy_params, graph=None, chunk_bars=None):
     """
     Run a backtest on historical stock data with given strategy parameters.
     
     Args:
-        stock_data (dict): Historical stock data
+        stock_data (dict or Bars): Historical stock data
         strategy_params (dict): Strategy parameters
+        graph (IndicatorGraph): Indicators already built for these prices,
+            e.g. a window of a longer history; built from the prices if None
+        chunk_bars (int): Process the history in chunks of this many bars;
+            by default only histories longer than CHUNK_BARS are chunked
         
     Returns:
         dict: Backtest results
     """
-    logger.debug(f"Running backtest for {stock_data.get('ticker')} with params: {strategy_params}")
+    logger.debug("Running backtest for %s with params: %s", stock_data.get('ticker'), strategy_params)
+    
+    if graph is None and (chunk_bars or len(stock_data.get('prices', [])) > CHUNK_BARS):
+        return run_backtest_chunked(stock_data, strategy_params, chunk_bars or CHUNK_BARS)
     
     # Extract data
     ticker = stock_data.get('ticker', 'Unknown')
@@ -29,75 +73,42 @@ def run_backtest(stock_data, strategy_params):
     lows = stock_data.get('lows', [])
     volumes = stock_data.get('volumes', [])
     
-    if not prices:
+    if len(prices) == 0:
         raise Exception("No price data available for backtest")
     
-    # Initialize trade log and portfolio values
-    trades = []
-    portfolio_values = [1.0]  # Starting with $1.00 normalized
-    cash = 1.0
-    position = 0
     position_size = strategy_params.get('position_size', 1.0)
-    
-    # Calculate indicators based on strategy parameters
-    indicators = calculate_indicators(prices, strategy_params)
-    
-    # Simulate trading day by day
-    for i in range(1, len(prices)):
-        # Skip if not enough data for indicators
-        if i < max(strategy_params.get('ma_fast', 10), strategy_params.get('ma_slow', 50)):
-            portfolio_values.append(cash)
-            continue
-        
-        current_price = prices[i]
-        current_date = dates[i] if i < len(dates) else None
-        
-        # Check entry conditions if not in position
-        if position == 0:
-            if check_entry_conditions(i, prices, indicators, strategy_params):
-                # Enter position
-                position = position_size / current_price
-                cost = position_size
-                cash -= cost
-                
-                trades.append({
-                    'type': 'entry',
-                    'date': current_date,
-                    'price': current_price,
-                    'shares': position,
-                    'value': cost
-                })
-                
-                logger.debug(f"Entered position: {current_date}, price: {current_price}, shares: {position}")
-        
-        # Check exit conditions if in position
-        elif position > 0:
-            if check_exit_conditions(i, prices, indicators, strategy_params, position, current_price):
-                # Exit position
-                sale_value = position * current_price
-                cash += sale_value
-                
-                trades.append({
-                    'type': 'exit',
-                    'date': current_date,
-                    'price': current_price,
-                    'shares': position,
-                    'value': sale_value
-                })
-                
-                logger.debug(f"Exited position: {current_date}, price: {current_price}, shares: {position}, value: {sale_value}")
-                position = 0
+    annualization = periods_per_year(stock_data.get('interval'))
+    
+    # Calculate only the indicators the strategy type reads, reusing any
+    # already computed for this exact price history
+    with span('indicators'):
+        if graph is None:
+            price_array = as_price_array(prices)
+            graph = calculate_indicators(price_array, strategy_params, data_version(stock_data, price_array))
+        else:
+            price_array = graph.prices
+            graph = graph.for_params(strategy_params)
+        indicators = graph.compute(strategy_indicators(strategy_params))
+    
+    # Evaluate the entry and exit rules on all bars at once
+    with span('signals'):
+        entries = entry_signals(price_array, indicators, strategy_params)
+        exits = exit_signals(price_array, indicators, strategy_params)
+    
+    # Walk the masks to find the trades and value the portfolio on every bar
+    with span('simulation'):
+        start = warmup_bars(strategy_params, graph.offset)
+        positions = simulate_trades(price_array, entries, exits, start, strategy_params)
+        portfolio_values = equity_curve(price_array, positions, position_size).tolist()
+        trades = build_trade_log(positions, dates, price_array, position_size)
+    
+    with span('metrics'):
+        # Calculate performance metrics
+        metrics = calculate_performance_metrics(portfolio_values, trades, positions, annualization)
         
-        # Calculate portfolio value (cash + position value)
-        portfolio_value = cash + (position * current_price)
-        portfolio_values.append(portfolio_value)
-    
-    # Calculate performance metrics
-    metrics = calculate_performance_metrics(portfolio_values, trades)
-    
-    # Calculate buy and hold performance
-    buy_hold_values = calculate_buy_hold_performance(prices)
-    buy_hold_metrics = calculate_performance_metrics(buy_hold_values, [])
+        # Calculate buy and hold performance
+        buy_hold_values = calculate_buy_hold_performance(prices)
+        buy_hold_metrics = calculate_performance_metrics(buy_hold_values, [], [(0, None)], annualization)
     
     # Calculate strategy vs buy and hold
     strategy_return = metrics['total_return']
@@ -110,8 +121,8 @@ def run_backtest(stock_data, strategy_params):
     # Prepare the response
     results = {
         'ticker': ticker,
-        'start_date': dates[0] if dates else None,
-        'end_date': dates[-1] if dates else None,
+        'start_date': dates[0] if len(dates) else None,
+        'end_date': dates[-1] if len(dates) else None,
         'trades': trades,
         'portfolio_values': portfolio_values,
         'metrics': metrics,
@@ -119,322 +130,328 @@ def run_backtest(stock_data, strategy_params):
         'buy_hold_metrics': buy_hold_metrics
     }
     
-    logger.debug(f"Backtest completed with {len(trades)} trades and final value: {portfolio_values[-1]}")
-    logger.debug(f"Buy and hold final value: {buy_hold_values[-1]}")
-    logger.debug(f"Strategy vs Buy and Hold: {outperformance}%")
+    logger.debug("Backtest completed with %d trades, final value %s (buy and hold %s)",
+                 len(trades), portfolio_values[-1], buy_hold_values[-1])
     return results
 
-def calculate_indicators(prices, params):
+def run_backtest_chunked(stock_data, strategy_params, chunk_bars=CHUNK_BARS):
     """
-    Calculate technical indicators based on strategy parameters.
+    Run a backtest over a long history one chunk of bars at a time.
+    
+    Indicators, signals and the position state are carried from one chunk
+    to the next, so the trades and metrics are those of run_backtest (up to
+    floating point rounding in the indicators) while the working memory is
+    bounded by the chunk size. Only the closing prices of one chunk are
+    converted to float64 at a time, so a float32 or memory-mapped column is
+    read in place.
     
     Args:
-        prices (list): Historical prices
-        params (dict): Strategy parameters
+        stock_data (dict or Bars): Historical stock data
+        strategy_params (dict): Strategy parameters
+        chunk_bars (int): Bars processed per chunk
         
     Returns:
-        dict: Calculated indicators
+        dict: Backtest results, as from run_backtest
     """
-    indicators = {}
+    ticker = stock_data.get('ticker', 'Unknown')
+    dates = stock_data.get('dates', [])
+    prices = stock_data.get('prices', [])
+    length = len(prices)
     
-    # Moving Averages
-    ma_fast_period = params.get('ma_fast', 10)
-    ma_slow_period = params.get('ma_slow', 50)
+    if length == 0:
+        raise Exception("No price data available for backtest")
     
-    indicators['ma_fast'] = calculate_ma(prices, ma_fast_period)
-    indicators['ma_slow'] = calculate_ma(prices, ma_slow_period)
+    chunk_bars = max(int(chunk_bars), 2)
+    position_size = strategy_params.get('position_size', 1.0)
+    annualization = periods_per_year(stock_data.get('interval'))
+    
+    indicators = ChunkedIndicators(strategy_params)
+    next_bar = warmup_bars(strategy_params)
+    state = None
+    positions = []
+    portfolio_values = np.empty(length)
+    cash, shares = 1.0, 0.0
+    previous = None
+    
+    for offset in range(0, length, chunk_bars):
+        chunk = as_price_array(prices[offset:offset + chunk_bars])
+        
+        with span('indicators'):
+            series = indicators.update(chunk)
+        
+        # Crossings are evaluated against the previous chunk's last bar
+        with span('signals'):
+            if previous is None:
+                extended, extended_series = chunk, series
+            else:
+                extended = np.concatenate(([previous[0]], chunk))
+                extended_series = {name: np.concatenate(([previous[1][name]], values))
+                                   for name, values in series.items()}
+            skip = len(extended) - len(chunk)
+            entries = entry_signals(extended, extended_series, strategy_params)[skip:]
+            exits = exit_signals(extended, extended_series, strategy_params)[skip:]
+            previous = (chunk[-1], {name: values[-1] for name, values in series.items()})
+        
+        with span('simulation'):
+            # Holdings entering the chunk, then every (bar, cash, shares) change
+            holdings = (cash, shares)
+            changes = []
+            
+            if state is not None:
+                exit_bar = resume_position(chunk, exits, state, offset)
+                if exit_bar is not None:
+                    cash += shares * chunk[exit_bar - offset]
+                    shares = 0.0
+                    changes.append((exit_bar - offset, cash, shares))
+                    positions[-1] = (state.entry_index, exit_bar)
+                    state = None
+                    next_bar = exit_bar + 1
+            
+            if state is None:
+                start = max(next_bar - offset, 0)
+                for entry, exit_bar in simulate_trades(chunk, entries, exits, start, strategy_params):
+                    shares = position_size / chunk[entry]
+                    cash -= position_size
+                    changes.append((entry, cash, shares))
+                    
+                    if exit_bar is None:
+                        positions.append((offset + entry, None))
+                        state = PositionState(offset + entry, float(chunk[entry]), strategy_params)
+                        state.update(offset + len(chunk) - 1, float(chunk[entry:].max()))
+                        break
+                    
+                    cash += shares * chunk[exit_bar]
+                    shares = 0.0
+                    changes.append((exit_bar, cash, shares))
+                    positions.append((offset + entry, offset + exit_bar))
+                    next_bar = offset + exit_bar + 1
+            
+            portfolio_values[offset:offset + len(chunk)] = chunk_equity(chunk, holdings, changes)
     
-    # RSI
-    rsi_period = params.get('rsi_period', 14)
-    indicators['rsi'] = calculate_rsi(prices, rsi_period)
+    portfolio_values[0] = 1.0
+    portfolio_values = portfolio_values.tolist()
+    trades = build_trade_log(positions, dates, prices, position_size)
     
-    # Bollinger Bands
-    bb_period = params.get('bb_period', 20)
-    bb_std = params.get('bb_std', 2)
-    indicators['bb_upper'], indicators['bb_middle'], indicators['bb_lower'] = calculate_bollinger_bands(prices, bb_period, bb_std)
+    with span('metrics'):
+        metrics = calculate_performance_metrics(portfolio_values, trades, positions, annualization)
+        buy_hold_values = calculate_buy_hold_performance(prices)
+        buy_hold_metrics = calculate_performance_metrics(buy_hold_values, [], [(0, None)], annualization)
     
-    # MACD
-    macd_fast = params.get('macd_fast', 12)
-    macd_slow = params.get('macd_slow', 26)
-    macd_signal = params.get('macd_signal', 9)
-    indicators['macd'], indicators['macd_signal'], indicators['macd_hist'] = calculate_macd(prices, macd_fast, macd_slow, macd_signal)
+    metrics['vs_buy_hold'] = round(metrics['total_return'] - buy_hold_metrics['total_return'], 2)
     
-    return indicators
+    return {
+        'ticker': ticker,
+        'start_date': dates[0] if len(dates) else None,
+        'end_date': dates[-1] if len(dates) else None,
+        'trades': trades,
+        'portfolio_values': portfolio_values,
+        'metrics': metrics,
+        'buy_hold_values': buy_hold_values,
+        'buy_hold_metrics': buy_hold_metrics
+    }
 
-def calculate_ma(prices, period):
-    """Calculate a simple moving average."""
-    if not prices or period <= 0:
-        return [None] * len(prices)
+def run_backtest_batch(stock_data, param_sets, include_curves=False, graph=None):
+    """
+    Run backtests for many parameter sets on the same historical data.
     
-    ma = [None] * (period - 1)
-    for i in range(period - 1, len(prices)):
-        ma.append(sum(prices[i-period+1:i+1]) / period)
+    The price array, buy and hold performance and every indicator node are
+    computed once and shared. Parameter sets are grouped by strategy type and
+    evaluated in blocks laid out as (sets x bars) arrays, and the equity
+    statistics of all sets are computed in one pass over their curves.
     
-    return ma
-
-def calculate_rsi(prices, period=14):
-    """Calculate Relative Strength Index."""
-    if not prices or period <= 0 or len(prices) <= period:
-        return [None] * len(prices)
+    Args:
+        stock_data (dict): Historical stock data
+        param_sets (list): Strategy parameter dicts
+        include_curves (bool): Whether to include each set's portfolio values
+        graph (IndicatorGraph): Indicators already built for these prices;
+            built from the prices if None
+        
+    Returns:
+        dict: Shared buy and hold results plus one result per parameter set,
+            in the order the sets were given
+    """
+    logger.debug("Running batch backtest for %s with %d parameter sets", stock_data.get('ticker'), len(param_sets))
     
-    # Calculate price changes
-    deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
+    ticker = stock_data.get('ticker', 'Unknown')
+    dates = stock_data.get('dates', [])
+    prices = stock_data.get('prices', [])
     
-    # Initialize gains and losses
-    gains = [max(0, d) for d in deltas]
-    losses = [max(0, -d) for d in deltas]
+    if len(prices) == 0:
+        raise Exception("No price data available for backtest")
     
-    # Prepend initial None values
-    rsi = [None] * period
+    annualization = periods_per_year(stock_data.get('interval'))
     
-    # Calculate first average gain and loss
-    avg_gain = sum(gains[:period]) / period
-    avg_loss = sum(losses[:period]) / period
+    with span('indicators'):
+        if graph is None:
+            price_array = as_price_array(prices)
+            graph = calculate_indicators(price_array, {}, data_version(stock_data, price_array))
+        else:
+            price_array = graph.prices
     
-    # Calculate RSI values
-    for i in range(period, len(prices)):
-        # Update average gain and loss using smoothing
-        avg_gain = (avg_gain * (period - 1) + gains[i-1]) / period
-        avg_loss = (avg_loss * (period - 1) + losses[i-1]) / period
+    # Computed once for the whole batch
+    buy_hold_values = calculate_buy_hold_performance(prices)
+    buy_hold_metrics = calculate_performance_metrics(buy_hold_values, [], [(0, None)], annualization)
+    
+    groups = {}
+    for row, params in enumerate(param_sets):
+        groups.setdefault(params.get('strategy_type', 'ma_crossover'), []).append(row)
+    
+    curves = np.empty((len(param_sets), len(price_array)))
+    positions = [None] * len(param_sets)
+    
+    for rows in groups.values():
+        for start in range(0, len(rows), BATCH_ROWS):
+            block = rows[start:start + BATCH_ROWS]
+            with span('signals'):
+                entries, exits = batch_signals(price_array, graph, [param_sets[row] for row in block])
+            
+            with span('simulation'):
+                for k, row in enumerate(block):
+                    params = param_sets[row]
+                    position_size = params.get('position_size', 1.0)
+                    
+                    start_bar = warmup_bars(params, graph.offset)
+                    positions[row] = simulate_trades(price_array, entries[k], exits[k], start_bar, params)
+                    curves[row] = equity_curve(price_array, positions[row], position_size)
+    
+    with span('metrics'):
+        stats = equity_metrics(curves, annualization) if len(price_array) > 1 else None
+    results = []
+    
+    for row, params in enumerate(param_sets):
+        position_size = params.get('position_size', 1.0)
+        trades = build_trade_log(positions[row], dates, price_array, position_size)
         
-        if avg_loss == 0:
-            rsi.append(100)
+        if stats is None:
+            metrics = calculate_performance_metrics(curves[row], trades, periods_per_year=annualization)
         else:
-            rs = avg_gain / avg_loss
-            rsi.append(100 - (100 / (1 + rs)))
-    
-    return rsi
-
-def calculate_bollinger_bands(prices, period=20, std_dev=2):
-    """Calculate Bollinger Bands."""
-    if not prices or period <= 0 or len(prices) <= period:
-        return [None] * len(prices), [None] * len(prices), [None] * len(prices)
-    
-    # Initialize arrays
-    middle_band = [None] * period
-    upper_band = [None] * period
-    lower_band = [None] * period
-    
-    # Calculate bands
-    for i in range(period, len(prices)):
-        window = prices[i-period:i]
-        sma = sum(window) / period
-        std = math.sqrt(sum((x - sma) ** 2 for x in window) / period)
+            metrics = {name: values[row] for name, values in stats.items()}
+            metrics.update(trade_metrics(*position_arrays(positions[row], price_array, position_size)))
+            metrics['exposure'] = exposure(positions[row], len(price_array))
+            metrics = round_metrics(metrics)
+        metrics['vs_buy_hold'] = round(metrics['total_return'] - buy_hold_metrics['total_return'], 2)
         
-        middle_band.append(sma)
-        upper_band.append(sma + (std_dev * std))
-        lower_band.append(sma - (std_dev * std))
+        result = {
+            'params': params,
+            'trades': trades,
+            'metrics': metrics
+        }
+        if include_curves:
+            result['portfolio_values'] = curves[row].tolist()
+        results.append(result)
     
-    return upper_band, middle_band, lower_band
-
-def calculate_macd(prices, fast_period=12, slow_period=26, signal_period=9):
-    """Calculate MACD indicator."""
-    if not prices or len(prices) <= slow_period + signal_period:
-        return [None] * len(prices), [None] * len(prices), [None] * len(prices)
-    
-    # Calculate EMAs
-    ema_fast = calculate_ema(prices, fast_period)
-    ema_slow = calculate_ema(prices, slow_period)
-    
-    # Calculate MACD line
-    macd_line = [None] * slow_period
-    for i in range(slow_period, len(prices)):
-        macd_line.append(ema_fast[i] - ema_slow[i])
-    
-    # Calculate signal line (EMA of MACD line)
-    signal_line = [None] * (slow_period + signal_period - 1)
-    
-    # Calculate first EMA of MACD
-    first_valid_macd = macd_line[slow_period:slow_period+signal_period]
-    signal = sum(first_valid_macd) / signal_period
-    signal_line.append(signal)
-    
-    # Calculate remaining signal line values
-    alpha = 2 / (signal_period + 1)
-    for i in range(slow_period + signal_period, len(prices)):
-        signal = macd_line[i] * alpha + signal_line[-1] * (1 - alpha)
-        signal_line.append(signal)
-    
-    # Calculate histogram
-    histogram = [None] * len(signal_line)
-    for i in range(len(signal_line)):
-        if signal_line[i] is not None and i < len(macd_line) and macd_line[i] is not None:
-            histogram[i] = macd_line[i] - signal_line[i]
-    
-    return macd_line, signal_line, histogram
+    return {
+        'ticker': ticker,
+        'start_date': dates[0] if len(dates) else None,
+        'end_date': dates[-1] if len(dates) else None,
+        'results': results,
+        'buy_hold_values': buy_hold_values,
+        'buy_hold_metrics': buy_hold_metrics
+    }
 
-def calculate_ema(prices, period):
-    """Calculate Exponential Moving Average."""
-    if not prices or period <= 0:
-        return [None] * len(prices)
-    
-    # Initialize EMA with SMA
-    ema = [None] * (period - 1)
-    ema.append(sum(prices[:period]) / period)
+def build_trade_log(positions, dates, prices, position_size):
+    """
+    Build the entry/exit trade records for simulated positions.
     
-    # Calculate multiplier
-    multiplier = 2 / (period + 1)
+    Args:
+        positions (list): (entry_index, exit_index) pairs
+        dates (list or DateColumn): Bar dates
+        prices (np.ndarray): Historical prices
+        position_size (float): Cash committed to each position
+        
+    Returns:
+        list: Trade dicts in chronological order
+    """
+    trades = []
     
-    # Calculate EMA values
-    for i in range(period, len(prices)):
-        ema.append((prices[i] * multiplier) + (ema[-1] * (1 - multiplier)))
+    # Columnar dates are formatted for all trade bars at once
+    dates_length = len(dates)
+    if isinstance(dates, DateColumn):
+        bars = [bar for position in positions for bar in position if bar is not None]
+        dates = dict(zip(bars, dates.take(bars)))
     
-    return ema
+    for entry, exit_bar in positions:
+        entry_price = float(prices[entry])
+        shares = position_size / entry_price
+        
+        trades.append({
+            'type': 'entry',
+            'date': dates[entry] if entry < dates_length else None,
+            'price': entry_price,
+            'shares': shares,
+            'value': position_size
+        })
+        
+        if exit_bar is not None:
+            exit_price = float(prices[exit_bar])
+            
+            trades.append({
+                'type': 'exit',
+                'date': dates[exit_bar] if exit_bar < dates_length else None,
+                'price': exit_price,
+                'shares': shares,
+                'value': shares * exit_price
+            })
+    
+    return trades
 
-def check_entry_conditions(index, prices, indicators, params):
+def chunk_equity(prices, holdings, changes):
     """
-    Check if entry conditions are met.
+    Value the portfolio on every bar of a chunk.
     
     Args:
-        index (int): Current index in the price array
-        prices (list): Historical prices
-        indicators (dict): Calculated indicators
-        params (dict): Strategy parameters
+        prices (np.ndarray): Prices of the chunk
+        holdings (tuple): (cash, shares) held entering the chunk
+        changes (list): (bar, cash, shares) after each trade, bars increasing
         
     Returns:
-        bool: True if entry conditions are met
+        np.ndarray: Cash plus position value per bar
     """
-    # Strategy type determines entry logic
-    strategy_type = params.get('strategy_type', 'ma_crossover')
-    
-    if strategy_type == 'ma_crossover':
-        # Moving Average Crossover
-        if (index > 0 and 
-            indicators['ma_fast'][index] is not None and 
-            indicators['ma_slow'][index] is not None and
-            indicators['ma_fast'][index-1] is not None and 
-            indicators['ma_slow'][index-1] is not None):
-            
-            # Check if fast MA crosses above slow MA
-            if (indicators['ma_fast'][index-1] <= indicators['ma_slow'][index-1] and 
-                indicators['ma_fast'][index] > indicators['ma_slow'][index]):
-                return True
-    
-    elif strategy_type == 'rsi_oversold':
-        # RSI Oversold Bounce
-        rsi_oversold = params.get('rsi_oversold', 30)
-        
-        if (index > 0 and 
-            indicators['rsi'][index] is not None and 
-            indicators['rsi'][index-1] is not None):
-            
-            # Check if RSI crosses above oversold threshold
-            if (indicators['rsi'][index-1] <= rsi_oversold and 
-                indicators['rsi'][index] > rsi_oversold):
-                return True
-    
-    elif strategy_type == 'bollinger_bounce':
-        # Bollinger Band Bounce
-        if (index > 0 and 
-            indicators['bb_lower'][index] is not None and 
-            prices[index-1] is not None):
-            
-            # Check if price bounces off lower band
-            if prices[index-1] <= indicators['bb_lower'][index-1] and prices[index] > indicators['bb_lower'][index]:
-                return True
-    
-    elif strategy_type == 'macd_crossover':
-        # MACD Crossover
-        if (index > 0 and 
-            indicators['macd_hist'][index] is not None and 
-            indicators['macd_hist'][index-1] is not None):
-            
-            # Check if MACD histogram crosses above zero
-            if (indicators['macd_hist'][index-1] <= 0 and 
-                indicators['macd_hist'][index] > 0):
-                return True
+    cash_levels = np.array([holdings[0]] + [cash for _, cash, _ in changes])
+    share_levels = np.array([holdings[1]] + [shares for _, _, shares in changes])
     
-    return False
+    marks = np.zeros(len(prices), dtype=np.int64)
+    marks[[bar for bar, _, _ in changes]] = 1
+    state = np.cumsum(marks)
+    return cash_levels[state] + share_levels[state] * prices
 
-def check_exit_conditions(index, prices, indicators, params, position, current_price):
+def calculate_indicators(prices, params, version=None):
     """
-    Check if exit conditions are met.
+    Build the technical indicators for the given strategy parameters.
+    
+    Indicators are evaluated lazily: a series is only computed when it is
+    first read, and intermediate results are shared between series.
     
     Args:
-        index (int): Current index in the price array
-        prices (list): Historical prices
-        indicators (dict): Calculated indicators
+        prices (list or np.ndarray): Historical prices
         params (dict): Strategy parameters
-        position (float): Current position size
-        current_price (float): Current price
+        version (tuple): Data version used as the indicator cache key;
+            caching is skipped when None
         
     Returns:
-        bool: True if exit conditions are met
+        IndicatorGraph: Mapping of indicator name to NaN-padded float64 array
     """
-    # Check stop loss
-    stop_loss_pct = params.get('stop_loss_pct', 5) / 100
-    entry_price = None
-    
-    # Find the entry price for the current position
-    for i in range(index-1, -1, -1):
-        if i < len(prices) and prices[i] > 0 and position > 0:
-            entry_price = prices[i]
-            break
-    
-    if entry_price and current_price < entry_price * (1 - stop_loss_pct):
-        logger.debug(f"Stop loss triggered at price {current_price}")
-        return True
-    
-    # Check take profit
-    take_profit_pct = params.get('take_profit_pct', 10) / 100
-    
-    if entry_price and current_price > entry_price * (1 + take_profit_pct):
-        logger.debug(f"Take profit triggered at price {current_price}")
-        return True
-    
-    # Strategy type determines exit logic
-    strategy_type = params.get('strategy_type', 'ma_crossover')
-    
-    if strategy_type == 'ma_crossover':
-        # Moving Average Crossover
-        if (index > 0 and 
-            indicators['ma_fast'][index] is not None and 
-            indicators['ma_slow'][index] is not None and
-            indicators['ma_fast'][index-1] is not None and 
-            indicators['ma_slow'][index-1] is not None):
-            
-            # Check if fast MA crosses below slow MA
-            if (indicators['ma_fast'][index-1] >= indicators['ma_slow'][index-1] and 
-                indicators['ma_fast'][index] < indicators['ma_slow'][index]):
-                return True
-    
-    elif strategy_type == 'rsi_oversold':
-        # RSI Overbought Exit
-        rsi_overbought = params.get('rsi_overbought', 70)
-        
-        if (indicators['rsi'][index] is not None and 
-            indicators['rsi'][index] > rsi_overbought):
-            return True
-    
-    elif strategy_type == 'bollinger_bounce':
-        # Exit when price reaches middle band
-        if (indicators['bb_middle'][index] is not None and 
-            prices[index-1] < indicators['bb_middle'][index-1] and 
-            prices[index] >= indicators['bb_middle'][index]):
-            return True
-    
-    elif strategy_type == 'macd_crossover':
-        # MACD Crossover
-        if (index > 0 and 
-            indicators['macd_hist'][index] is not None and 
-            indicators['macd_hist'][index-1] is not None):
-            
-            # Check if MACD histogram crosses below zero
-            if (indicators['macd_hist'][index-1] >= 0 and 
-                indicators['macd_hist'][index] < 0):
-                return True
-    
-    # Maximum holding period
-    max_hold_days = params.get('max_hold_days', 30)
-    
-    if index - max_hold_days > 0:
-        for i in range(index-1, index-max_hold_days-1, -1):
-            if i >= 0 and i < len(prices):
-                # Check if we've held the position longer than max_hold_days
-                # (This is a simplified check)
-                return True
-    
-    return False
+    return IndicatorGraph(prices, params, version)
+
+def calculate_ma(prices, period):
+    """Calculate a simple moving average (NaN-padded float64 array)."""
+    return sma(prices, period)
+
+def calculate_rsi(prices, period=14):
+    """Calculate Relative Strength Index (NaN-padded float64 array)."""
+    return rsi(prices, period)
+
+def calculate_bollinger_bands(prices, period=20, std_dev=2):
+    """Calculate Bollinger Bands as (upper, middle, lower) NaN-padded arrays."""
+    return bollinger_bands(prices, period, std_dev)
+
+def calculate_macd(prices, fast_period=12, slow_period=26, signal_period=9):
+    """Calculate MACD as (macd, signal, histogram) NaN-padded arrays."""
+    return macd(prices, fast_period, slow_period, signal_period)
+
+def calculate_ema(prices, period):
+    """Calculate Exponential Moving Average (NaN-padded float64 array)."""
+    return ema(prices, period)
 
 def calculate_buy_hold_performance(prices):
     """
@@ -444,102 +461,34 @@ def calculate_buy_hold_performance(prices):
         prices (list): Historical prices
         
     Returns:
-        list: Daily portfolio values for buy and hold
+        list: Daily portfolio values for buy and hold, normalized to start at 1.0
     """
-    if not prices or len(prices) < 2:
+    if prices is None or len(prices) < 2:
         return [1.0]
     
-    # Initialize with $1 normalized
-    initial_price = prices[0]
-    shares = 1.0 / initial_price
-    
-    # Calculate daily values
-    buy_hold_values = [shares * price for price in prices]
-    
-    # Normalize to start at 1.0
-    buy_hold_values = [value / buy_hold_values[0] for value in buy_hold_values]
-    
-    return buy_hold_values
+    price_array = as_price_array(prices)
+    return (price_array / price_array[0]).tolist()
 
-def calculate_performance_metrics(portfolio_values, trades):
+def calculate_performance_metrics(portfolio_values, trades, positions=None, periods_per_year=TRADING_DAYS):
     """
     Calculate performance metrics from the backtest results.
     
     Args:
-        portfolio_values (list): Daily portfolio values
+        portfolio_values (list or np.ndarray): Portfolio value per bar
         trades (list): List of trades
+        positions (list): (entry_index, exit_index) pairs behind the trades;
+            exposure is None when not given
+        periods_per_year (float): Bars per year of the data interval, used
+            to annualize CAGR, volatility and the ratios
         
     Returns:
         dict: Performance metrics
     """
-    if not portfolio_values or len(portfolio_values) < 2:
-        return {
-            'total_return': 0,
-            'cagr': 0,
-            'sharpe_ratio': 0,
-            'max_drawdown': 0,
-            'win_rate': 0,
-            'num_trades': 0
-        }
+    if portfolio_values is None or len(portfolio_values) < 2:
+        return empty_metrics()
     
-    # Total return
-    initial_value = portfolio_values[0]
-    final_value = portfolio_values[-1]
-    total_return = (final_value - initial_value) / initial_value * 100
-    
-    # Compound Annual Growth Rate (CAGR)
-    years = len(portfolio_values) / 252  # ~252 trading days per year
-    cagr = (final_value / initial_value) ** (1 / years) - 1 if years > 0 else 0
-    cagr *= 100  # Convert to percentage
-    
-    # Daily returns for Sharpe ratio
-    daily_returns = [(portfolio_values[i] / portfolio_values[i-1]) - 1 for i in range(1, len(portfolio_values))]
-    
-    # Sharpe ratio (assuming risk-free rate of 0 for simplicity)
-    mean_daily_return = np.mean(daily_returns) if daily_returns else 0
-    std_daily_return = np.std(daily_returns) if daily_returns else 1e-10  # Avoid division by zero
-    sharpe_ratio = (mean_daily_return / std_daily_return) * (252 ** 0.5)  # Annualized
-    
-    # Maximum drawdown
-    max_drawdown = 0
-    peak = portfolio_values[0]
-    
-    for value in portfolio_values:
-        if value > peak:
-            peak = value
-        drawdown = (peak - value) / peak
-        max_drawdown = max(max_drawdown, drawdown)
-    
-    max_drawdown *= 100  # Convert to percentage
-    
-    # Win rate
-    if not trades:
-        win_rate = 0
-    else:
-        # Group trades into entry/exit pairs
-        entry_trades = [t for t in trades if t['type'] == 'entry']
-        exit_trades = [t for t in trades if t['type'] == 'exit']
-        
-        # Count winning trades
-        winning_trades = 0
-        
-        for i in range(min(len(entry_trades), len(exit_trades))):
-            entry_price = entry_trades[i]['price']
-            exit_price = exit_trades[i]['price']
-            
-            if exit_price > entry_price:
-                winning_trades += 1
-        
-        win_rate = winning_trades / len(entry_trades) * 100 if entry_trades else 0
+    metrics = equity_metrics(portfolio_values, periods_per_year)
+    metrics.update(trade_metrics(*trade_arrays(trades)))
+    metrics['exposure'] = exposure(positions, len(portfolio_values)) if positions is not None else None
     
-    # Number of trades (entries only)
-    num_trades = len([t for t in trades if t['type'] == 'entry'])
-    
-    return {
-        'total_return': round(total_return, 2),
-        'cagr': round(cagr, 2),
-        'sharpe_ratio': round(sharpe_ratio, 2),
-        'max_drawdown': round(max_drawdown, 2),
-        'win_rate': round(win_rate, 2),
-        'num_trades': num_trades
-    }
+    return round_metrics(metrics)
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import threading
+import logging
+from collections import namedtuple
+
+from backend.bar_store import BAR_STORE_DIR, bar_path, write_bars, open_bars, delete_bars
+from backend.instrumentation import LOG_LEVEL
+
+# Configure logging
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Keep fetched price histories on disk and only fetch the bars added since
+BAR_CACHE_ENABLED = os.environ.get("BAR_CACHE_ENABLED", "1").lower() in ('1', 'true', 'yes')
+
+# Directory of the cached histories, kept apart from histories written for workers
+BAR_CACHE_DIR = os.environ.get("BAR_CACHE_DIR", os.path.join(BAR_STORE_DIR, "cache"))
+
+# Disk budget for cached histories
+BAR_CACHE_MB = float(os.environ.get("BAR_CACHE_MB", 512))
+
+# Seconds before cached bars of an interval are refreshed from the API
+DEFAULT_TTLS = {
+    '1min': 60,
+    '5min': 300,
+    '15min': 900,
+    '30min': 1800,
+    '45min': 1800,
+    '1h': 1800,
+    '2h': 1800,
+    '4h': 1800,
+    '1day': 1800,
+    '1week': 6 * 3600,
+    '1month': 12 * 3600,
+}
+
+# TTL for intervals missing from the table
+DEFAULT_TTL = 300
+
+META_FILE = "cache.json"
+
+def parse_ttls(spec):
+    """Apply 'interval=seconds,...' overrides to the default TTLs."""
+    ttls = dict(DEFAULT_TTLS)
+    for item in spec.split(','):
+        interval, _, seconds = item.partition('=')
+        if interval.strip():
+            ttls[interval.strip()] = float(seconds)
+    return ttls
+
+# Per-interval TTL overrides, e.g. "1day=600,1h=120"
+BAR_CACHE_TTLS = parse_ttls(os.environ.get("BAR_CACHE_TTLS", ""))
+
+# A cached history, the start date it was fetched from and whether it is within its TTL
+CachedBars = namedtuple('CachedBars', ['bars', 'start', 'fresh'])
+
+def _entry_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+class BarCache:
+    """
+    Persistent cache of price histories, one bar store entry per ticker and interval.
+
+    Each entry records the start date it was fetched from and when it was
+    last refreshed. Entries past their interval's TTL are returned as stale,
+    for the caller to extend with the bars added since. Least recently used
+    entries are deleted when the cache outgrows its disk budget.
+    """
+
+    def __init__(self, root, max_bytes, ttls):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl(self, interval):
+        """Return the TTL in seconds for an interval."""
+        return self.ttls.get(interval, DEFAULT_TTL)
+
+    def get(self, ticker, interval, start):
+        """
+        Look up a ticker's cached history.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            interval (str): Data interval
+            start (str): First date the caller needs ('YYYY-MM-DD')
+
+        Returns:
+            CachedBars: The memory-mapped history, or None when nothing is
+                cached or the cached history starts after start
+        """
+        path = bar_path(ticker, interval, self.root)
+        with self._lock:
+            try:
+                with open(os.path.join(path, META_FILE)) as f:
+                    meta = json.load(f)
+                bars = open_bars(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except Exception as e:
+                logger.warning("Discarding unreadable cached bars in %s: %s", path, e)
+                delete_bars(path)
+                self.misses += 1
+                return None
+
+            if meta['start'] > start:
+                self.misses += 1
+                return None
+
+            # The meta file's modification time orders entries for eviction
+            os.utime(os.path.join(path, META_FILE))
+            fresh = time.time() - meta['fetched_at'] < self.ttl(interval)
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale += 1
+            return CachedBars(bars, meta['start'], fresh)
+
+    def put(self, ticker, interval, bars, start):
+        """
+        Store a history fetched from start, replacing any cached one.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            interval (str): Data interval
+            bars (Bars): The history
+            start (str): Date the history was requested from
+        """
+        path = bar_path(ticker, interval, self.root)
+        with self._lock:
+            write_bars(path, bars)
+
+            temporary = os.path.join(path, META_FILE + '.tmp')
+            with open(temporary, 'w') as f:
+                json.dump({'start': start, 'fetched_at': time.time()}, f)
+            os.replace(temporary, os.path.join(path, META_FILE))
+
+            self._evict(keep=path)
+
+    def clear(self):
+        """Delete every cached history and reset the counters."""
+        with self._lock:
+            for path in self._entries():
+                delete_bars(path)
+            self.hits = self.stale = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return cache counters and disk usage."""
+        with self._lock:
+            entries = self._entries()
+            lookups = self.hits + self.stale + self.misses
+            return {
+                'entries': len(entries),
+                'bytes': sum(_entry_size(path) for path in entries),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale': self.stale,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0
+            }
+
+    def _entries(self):
+        if not os.path.isdir(self.root):
+            return []
+        return [entry.path for entry in os.scandir(self.root)
+                if entry.is_dir() and os.path.exists(os.path.join(entry.path, META_FILE))]
+
+    def _evict(self, keep):
+        entries = []
+        for path in self._entries():
+            last_used = os.stat(os.path.join(path, META_FILE)).st_mtime
+            entries.append((last_used, path, _entry_size(path)))
+
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            delete_bars(path)
+            total -= size
+            self.evictions += 1
+            logger.debug("Evicted cached bars in %s", path)
+
+# Shared by every request handled by this process
+bar_cache = BarCache(BAR_CACHE_DIR, int(BAR_CACHE_MB * 1024 * 1024), BAR_CACHE_TTLS)
@@ -0,0 +1,198 @@
+import os
+import json
+import shutil
+import logging
+
+import numpy as np
+
+from backend.bars import Bars, PRICE_DTYPES
+from backend.instrumentation import LOG_LEVEL
+
+# Configure logging
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Directory holding one sub-directory of column files per ticker and interval
+BAR_STORE_DIR = os.environ.get("BAR_STORE_DIR", os.path.join("data", "bars"))
+
+HEADER_FILE = "header.json"
+FORMAT_VERSION = 1
+
+# Column name -> file name; values are stored little-endian, one per bar
+COLUMN_FILES = {
+    'timestamps': 'timestamps.bin',
+    'closes': 'closes.bin',
+    'opens': 'opens.bin',
+    'highs': 'highs.bin',
+    'lows': 'lows.bin',
+    'volumes': 'volumes.bin',
+}
+
+def bar_path(ticker, interval='1day', root=None):
+    """Return the directory a ticker's bars of one interval are stored in."""
+    return os.path.join(root or BAR_STORE_DIR, f"{ticker.upper()}_{interval}")
+
+def _column_dtype(name, price_dtype):
+    kind = np.int64 if name in ('timestamps', 'volumes') else PRICE_DTYPES[price_dtype]
+    return np.dtype(kind).newbyteorder('<')
+
+def write_bars(path, stock_data, dtype='float64'):
+    """
+    Store a price history as fixed-width binary column files plus a header.
+
+    Every file is written under a temporary name and moved into place, the
+    header (listing each column's dtype and the bar count) last, so
+    processes that already mapped the previous files keep reading them.
+
+    Args:
+        path (str): Directory to write (created if missing)
+        stock_data (dict or Bars): get_stock_data output or a Bars history
+        dtype (str): 'float64' or 'float32' for the OHLC columns
+
+    Returns:
+        dict: The header written
+    """
+    bars = stock_data if isinstance(stock_data, Bars) else Bars.from_stock_data(stock_data, dtype)
+    os.makedirs(path, exist_ok=True)
+
+    columns = {}
+    for name, file_name in COLUMN_FILES.items():
+        values = getattr(bars, name)
+        if values is None:
+            continue
+
+        column_dtype = _column_dtype(name, dtype)
+        temporary = os.path.join(path, file_name + '.tmp')
+        np.ascontiguousarray(values, dtype=column_dtype).tofile(temporary)
+        os.replace(temporary, os.path.join(path, file_name))
+        columns[name] = {'file': file_name, 'dtype': column_dtype.str}
+
+    header = {
+        'version': FORMAT_VERSION,
+        'ticker': bars.ticker,
+        'interval': bars.interval,
+        'length': bars.num_bars,
+        'columns': columns
+    }
+
+    temporary = os.path.join(path, HEADER_FILE + '.tmp')
+    with open(temporary, 'w') as f:
+        json.dump(header, f)
+    os.replace(temporary, os.path.join(path, HEADER_FILE))
+
+    logger.debug("Stored %d bars of %s in %s", bars.num_bars, bars.ticker, path)
+    return header
+
+def read_header(path):
+    """Return the header of a stored history, or None if there is none."""
+    try:
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if header.get('version') != FORMAT_VERSION:
+        raise Exception(f"Unsupported bar store version {header.get('version')} in {path}")
+    return header
+
+def open_bars(path, mode='r'):
+    """
+    Open a stored history with its columns memory-mapped.
+
+    Nothing is read until the columns are accessed, and the pages are
+    shared by every process that maps the same files, so worker processes
+    can open the path instead of receiving a copy of the data. The result
+    can be passed straight to run_backtest; long histories are then read
+    chunk by chunk.
+
+    Args:
+        path (str): Directory written by write_bars
+        mode (str): numpy.memmap mode, 'r' (read-only) or 'c' (copy-on-write)
+
+    Returns:
+        Bars: The history with np.memmap columns
+    """
+    header = read_header(path)
+    if header is None:
+        raise Exception(f"No stored bars in {path}")
+
+    length = header['length']
+    columns = {}
+    for name, column in header['columns'].items():
+        column_dtype = np.dtype(column['dtype'])
+        if length == 0:
+            columns[name] = np.empty(0, dtype=column_dtype)
+        else:
+            columns[name] = np.memmap(os.path.join(path, column['file']), dtype=column_dtype, mode=mode,
+                                      shape=(length,))
+
+    return Bars(
+        columns['timestamps'],
+        columns['closes'],
+        opens=columns.get('opens'),
+        highs=columns.get('highs'),
+        lows=columns.get('lows'),
+        volumes=columns.get('volumes'),
+        ticker=header['ticker'],
+        interval=header['interval']
+    )
+
+def load_bars(ticker, interval='1day', root=None):
+    """Open a ticker's stored bars, or return None if none are stored."""
+    path = bar_path(ticker, interval, root)
+    if read_header(path) is None:
+        return None
+    return open_bars(path)
+
+def write_columns(path, columns):
+    """
+    Store named one-dimensional arrays as binary column files plus a header.
+
+    Used for series other than bars (e.g. indicator series shared with
+    worker processes); written the same way as write_bars.
+
+    Args:
+        path (str): Directory to write (created if missing)
+        columns (dict): Name -> array; names may be any string
+    """
+    os.makedirs(path, exist_ok=True)
+
+    header = {'version': FORMAT_VERSION, 'columns': {}}
+    for number, (name, values) in enumerate(columns.items()):
+        values = np.asarray(values)
+        column_dtype = values.dtype.newbyteorder('<')
+        file_name = f"{number}.bin"
+        temporary = os.path.join(path, file_name + '.tmp')
+        np.ascontiguousarray(values, dtype=column_dtype).tofile(temporary)
+        os.replace(temporary, os.path.join(path, file_name))
+        header['columns'][name] = {'file': file_name, 'dtype': column_dtype.str, 'length': len(values)}
+
+    temporary = os.path.join(path, HEADER_FILE + '.tmp')
+    with open(temporary, 'w') as f:
+        json.dump(header, f)
+    os.replace(temporary, os.path.join(path, HEADER_FILE))
+
+def open_columns(path):
+    """
+    Open arrays stored by write_columns, memory-mapped read-only.
+
+    Returns:
+        dict: Name -> np.memmap (an empty array for empty columns)
+    """
+    header = read_header(path)
+    if header is None:
+        raise Exception(f"No stored columns in {path}")
+
+    columns = {}
+    for name, column in header['columns'].items():
+        column_dtype = np.dtype(column['dtype'])
+        if column['length'] == 0:
+            columns[name] = np.empty(0, dtype=column_dtype)
+        else:
+            columns[name] = np.memmap(os.path.join(path, column['file']), dtype=column_dtype, mode='r',
+                                      shape=(column['length'],))
+    return columns
+
+def delete_bars(path):
+    """Remove a stored history (or stored columns)."""
+    shutil.rmtree(path, ignore_errors=True)
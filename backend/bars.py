@@ -0,0 +1,187 @@
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+# Float types accepted for the OHLC columns
+PRICE_DTYPES = {'float64': np.float64, 'float32': np.float32}
+
+# Intervals whose bars are labelled by date alone
+DAILY_INTERVALS = ('1day', '1week', '1month')
+
+def to_epoch(dates):
+    """Parse 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS' strings into int64 epoch seconds."""
+    return np.asarray(dates, dtype='datetime64[s]').astype(np.int64)
+
+def format_epoch(timestamps, daily=True):
+    """Format epoch seconds the way the data API labels bars."""
+    values = np.asarray(timestamps, dtype=np.int64).astype('datetime64[s]')
+    if daily:
+        return np.datetime_as_string(values, unit='D')
+    return np.char.replace(np.datetime_as_string(values, unit='s'), 'T', ' ')
+
+class DateColumn(Sequence):
+    """
+    Bar dates backed by int64 epoch seconds.
+
+    Behaves like the list of date strings in get_stock_data's output, but a
+    string is only formatted when an item is read, and slices are views.
+    """
+
+    __slots__ = ('timestamps', 'daily')
+
+    def __init__(self, timestamps, daily=True):
+        self.timestamps = timestamps
+        self.daily = daily
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return DateColumn(self.timestamps[index], self.daily)
+        return str(format_epoch(self.timestamps[index], self.daily))
+
+    def take(self, indices):
+        """Return the dates of the given bars as strings, formatted in one pass."""
+        return format_epoch(self.timestamps[np.asarray(indices, dtype=np.int64)], self.daily).tolist()
+
+    def tolist(self):
+        """Return every date as a string."""
+        return format_epoch(self.timestamps, self.daily).tolist()
+
+class Bars(Mapping):
+    """
+    Columnar price history: int64 epoch timestamps, float OHLC and int64 volume.
+
+    Exposes the same keys as get_stock_data's output ('dates', 'prices',
+    'opens', ...), so it can be passed anywhere that dict is accepted, while
+    holding each column as one contiguous array - about 44 bytes per bar in
+    float64 and 28 in float32, against several hundred for lists of Python
+    floats and date strings. Slicing with window() or bars[start:stop]
+    returns views of the same arrays.
+    """
+
+    KEYS = ('ticker', 'interval', 'start_date', 'end_date', 'dates', 'prices', 'opens', 'highs', 'lows', 'volumes')
+
+    def __init__(self, timestamps, closes, opens=None, highs=None, lows=None, volumes=None,
+                 ticker=None, interval='1day'):
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.closes = np.asarray(closes)
+        self.opens = None if opens is None else np.asarray(opens)
+        self.highs = None if highs is None else np.asarray(highs)
+        self.lows = None if lows is None else np.asarray(lows)
+        self.volumes = None if volumes is None else np.asarray(volumes)
+        self.ticker = ticker
+        self.interval = interval
+
+        if len(self.timestamps) != len(self.closes):
+            raise Exception(f"Bar columns differ in length: {len(self.timestamps)} timestamps, "
+                            f"{len(self.closes)} closes")
+
+    @classmethod
+    def from_stock_data(cls, stock_data, dtype='float64'):
+        """
+        Convert get_stock_data's output into columns.
+
+        Args:
+            stock_data (dict): Historical stock data
+            dtype (str): 'float64' or 'float32' for the OHLC columns
+
+        Returns:
+            Bars: The same history in columnar form
+        """
+        if dtype not in PRICE_DTYPES:
+            raise Exception(f"Unknown price dtype: {dtype}")
+        float_type = PRICE_DTYPES[dtype]
+
+        def column(key, kind=float_type):
+            values = stock_data.get(key)
+            return None if values is None or len(values) == 0 else np.asarray(values, dtype=kind)
+
+        return cls(
+            to_epoch(stock_data.get('dates', [])),
+            np.asarray(stock_data.get('prices', []), dtype=float_type),
+            opens=column('opens'),
+            highs=column('highs'),
+            lows=column('lows'),
+            volumes=column('volumes', np.int64),
+            ticker=stock_data.get('ticker'),
+            interval=stock_data.get('interval', '1day')
+        )
+
+    @property
+    def daily(self):
+        return self.interval in DAILY_INTERVALS
+
+    @property
+    def dates(self):
+        return DateColumn(self.timestamps, self.daily)
+
+    @property
+    def num_bars(self):
+        """Number of bars (len() counts the mapping keys)."""
+        return len(self.closes)
+
+    @property
+    def nbytes(self):
+        """Memory held by the columns."""
+        columns = (self.timestamps, self.closes, self.opens, self.highs, self.lows, self.volumes)
+        return sum(column.nbytes for column in columns if column is not None)
+
+    def window(self, start, stop):
+        """Return bars[start:stop] as views of this history's columns."""
+        def view(column):
+            return None if column is None else column[start:stop]
+
+        return Bars(
+            self.timestamps[start:stop], self.closes[start:stop], view(self.opens), view(self.highs),
+            view(self.lows), view(self.volumes), ticker=self.ticker, interval=self.interval
+        )
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self.closes))
+            if step != 1:
+                raise Exception("Bars only support contiguous slices")
+            return self.window(start, stop)
+
+        if key == 'ticker':
+            return self.ticker
+        if key == 'interval':
+            return self.interval
+        if key == 'start_date':
+            return self.dates[0] if len(self.timestamps) else None
+        if key == 'end_date':
+            return self.dates[-1] if len(self.timestamps) else None
+        if key == 'dates':
+            return self.dates
+        if key == 'prices':
+            return self.closes
+        if key in ('opens', 'highs', 'lows', 'volumes'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def to_stock_data(self):
+        """Return the history as get_stock_data's dict of lists."""
+        def values(column):
+            return [] if column is None else column.tolist()
+
+        dates = self.dates.tolist()
+        return {
+            'ticker': self.ticker,
+            'interval': self.interval,
+            'start_date': dates[0] if dates else None,
+            'end_date': dates[-1] if dates else None,
+            'dates': dates,
+            'prices': values(self.closes),
+            'opens': values(self.opens),
+            'highs': values(self.highs),
+            'lows': values(self.lows),
+            'volumes': values(self.volumes)
+        }
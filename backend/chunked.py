@@ -0,0 +1,194 @@
+import numpy as np
+
+from backend.indicator_graph import indicator_args, strategy_indicators
+from backend.indicators import nan_array, sma, bollinger_bands, recursive_filter
+
+# Indicators fed one chunk of bars at a time. Each keeps just enough state
+# (a tail of recent prices or the last recursive value) to continue exactly
+# where the previous chunk stopped, so a history can be processed in chunks
+# of any size with the same results as the full-history functions in
+# backend.indicators, up to floating point rounding.
+
+def _extend(tail, prices):
+    return np.concatenate((tail, prices)) if len(tail) else prices
+
+class ChunkedSMA:
+    """Simple moving average over the window ending at each bar."""
+
+    def __init__(self, period):
+        self.period = period
+        self.tail = np.empty(0)
+
+    def update(self, prices):
+        """Return the SMA of the chunk's bars."""
+        if self.period <= 0:
+            return nan_array(len(prices))
+
+        extended = _extend(self.tail, prices)
+        out = sma(extended, self.period)[len(self.tail):]
+        self.tail = extended[max(0, len(extended) - (self.period - 1)):] if self.period > 1 else np.empty(0)
+        return out
+
+class ChunkedBollinger:
+    """Bollinger Bands over the window of bars preceding each bar."""
+
+    def __init__(self, period, std_dev):
+        self.period = period
+        self.std_dev = std_dev
+        self.tail = np.empty(0)
+
+    def update(self, prices):
+        """Return the chunk's (upper, middle, lower) bands."""
+        if self.period <= 0:
+            return nan_array(len(prices)), nan_array(len(prices)), nan_array(len(prices))
+
+        extended = _extend(self.tail, prices)
+        bands = bollinger_bands(extended, self.period, self.std_dev)
+        self.tail = extended[max(0, len(extended) - self.period):]
+        return tuple(band[len(extended) - len(prices):] for band in bands)
+
+class ChunkedEMA:
+    """Exponential moving average seeded with the SMA of the first period values."""
+
+    def __init__(self, period):
+        self.period = period
+        self.seed = np.empty(0)
+        self.value = np.nan
+
+    def update(self, values):
+        """Return the EMA of the chunk's values (NaN during the seed window)."""
+        out = nan_array(len(values))
+        if self.period <= 0:
+            return out
+
+        start = 0
+        if np.isnan(self.value):
+            needed = self.period - len(self.seed)
+            self.seed = np.concatenate((self.seed, values[:needed]))
+            if len(self.seed) < self.period:
+                return out
+
+            self.value = self.seed.sum() / self.period
+            out[needed - 1] = self.value
+            start = needed
+
+        multiplier = 2 / (self.period + 1)
+        out[start:] = recursive_filter(values[start:], 1 - multiplier, multiplier, self.value)
+        if len(out) > start:
+            self.value = out[-1]
+        return out
+
+class ChunkedRSI:
+    """Relative Strength Index with Wilder smoothing, matching indicators.rsi."""
+
+    def __init__(self, period):
+        self.period = period
+        self.previous = None
+        self.seed_gains = np.empty(0)
+        self.seed_losses = np.empty(0)
+        self.avg_gain = np.nan
+        self.avg_loss = np.nan
+
+    def update(self, prices):
+        """Return the RSI of the chunk's bars (NaN for the first period bars)."""
+        out = nan_array(len(prices))
+        if self.period <= 0 or len(prices) == 0:
+            return out
+
+        # The first bar of the history has no change
+        deltas = np.diff(prices) if self.previous is None else np.diff(_extend(np.array([self.previous]), prices))
+        offset = len(prices) - len(deltas)
+        self.previous = prices[-1]
+
+        gains = np.maximum(deltas, 0.0)
+        losses = np.maximum(-deltas, 0.0)
+        decay = (self.period - 1) / self.period
+
+        start = 0
+        if np.isnan(self.avg_gain):
+            needed = self.period - len(self.seed_gains)
+            self.seed_gains = np.concatenate((self.seed_gains, gains[:needed]))
+            self.seed_losses = np.concatenate((self.seed_losses, losses[:needed]))
+            if len(self.seed_gains) < self.period:
+                return out
+
+            self.avg_gain = self.seed_gains.sum() / self.period
+            self.avg_loss = self.seed_losses.sum() / self.period
+            # The first smoothed value re-applies the last bar of the seed window
+            start = needed - 1
+
+        avg_gain = recursive_filter(gains[start:], decay, 1 / self.period, self.avg_gain)
+        avg_loss = recursive_filter(losses[start:], decay, 1 / self.period, self.avg_loss)
+        if len(avg_gain):
+            self.avg_gain = avg_gain[-1]
+            self.avg_loss = avg_loss[-1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[offset + start:] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+        return out
+
+class ChunkedMACD:
+    """MACD line, signal line and histogram, matching indicators.macd."""
+
+    def __init__(self, fast_period, slow_period, signal_period):
+        self.fast = ChunkedEMA(fast_period)
+        self.slow = ChunkedEMA(slow_period)
+        self.signal = ChunkedEMA(signal_period)
+        self.slow_period = slow_period
+        self.count = 0
+
+    def update(self, prices):
+        """Return the chunk's (macd, signal, histogram)."""
+        fast = self.fast.update(prices)
+        slow = self.slow.update(prices)
+        line = nan_array(len(prices))
+        signal = nan_array(len(prices))
+
+        # The line starts on bar slow_period of the history
+        first = max(0, self.slow_period - self.count)
+        self.count += len(prices)
+        if first < len(prices) and self.signal.period > 0:
+            line[first:] = fast[first:] - slow[first:]
+            signal[first:] = self.signal.update(line[first:])
+
+        return line, signal, line - signal
+
+class ChunkedIndicators:
+    """The indicator series a strategy type reads, computed chunk by chunk."""
+
+    def __init__(self, params):
+        self.names = strategy_indicators(params)
+        self.states = {}
+
+        names = set(self.names)
+        if 'ma_fast' in names:
+            self.states['ma_fast'] = ChunkedSMA(*indicator_args(params, ('ma_fast',)))
+        if 'ma_slow' in names:
+            self.states['ma_slow'] = ChunkedSMA(*indicator_args(params, ('ma_slow',)))
+        if 'rsi' in names:
+            self.states['rsi'] = ChunkedRSI(*indicator_args(params, ('rsi_period',)))
+        if names & {'bb_upper', 'bb_middle', 'bb_lower'}:
+            self.states['bollinger'] = ChunkedBollinger(*indicator_args(params, ('bb_period', 'bb_std')))
+        if names & {'macd', 'macd_signal', 'macd_hist'}:
+            self.states['macd'] = ChunkedMACD(*indicator_args(params, ('macd_fast', 'macd_slow', 'macd_signal')))
+
+    def update(self, prices):
+        """
+        Advance every indicator over the next chunk of bars.
+
+        Args:
+            prices (np.ndarray): Closing prices of the chunk (float64)
+
+        Returns:
+            dict: Series name -> values for the chunk's bars
+        """
+        series = {}
+        for name, state in self.states.items():
+            values = state.update(prices)
+            if name == 'bollinger':
+                series['bb_upper'], series['bb_middle'], series['bb_lower'] = values
+            elif name == 'macd':
+                series['macd'], series['macd_signal'], series['macd_hist'] = values
+            else:
+                series[name] = values
+        return {name: series[name] for name in self.names}
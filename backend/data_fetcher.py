@@ -1,44 +1,286 @@
 import os
+import json
+import time
+import threading
 import requests
 import logging
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from backend.bars import Bars, to_epoch, format_epoch
+from backend.bar_cache import BAR_CACHE_ENABLED, bar_cache
+from backend.http_client import HttpClient
+from backend.instrumentation import LOG_LEVEL, span
+from backend.single_flight import SingleFlight
+from backend.symbol_index import (SYMBOL_INDEX_FILE, SYMBOL_INDEX_REFRESH, SYMBOL_INDEX_RETRY, symbol_index,
+                                  search_cache, save_symbols)
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 # TwelveData API
 TWELVEDATA_API_KEY = os.environ.get("TWELVEDATA_API_KEY")
 TWELVEDATA_BASE_URL = "https://api.twelvedata.com"
 
+# API credits the plan allows per minute (0 disables client-side throttling)
+TWELVEDATA_CREDITS_PER_MINUTE = int(os.environ.get("TWELVEDATA_CREDITS_PER_MINUTE", 8))
+
+# Shared by every request handled by this process
+twelvedata = HttpClient(TWELVEDATA_BASE_URL, TWELVEDATA_CREDITS_PER_MINUTE)
+
+# Concurrent identical fetches and searches wait on the call in flight
+stock_data_flights = SingleFlight()
+search_flights = SingleFlight()
+
+# Symbols per batched time_series request (each still costs a credit)
+TWELVEDATA_BATCH_SIZE = int(os.environ.get("TWELVEDATA_BATCH_SIZE", 8))
+
+# Concurrent requests when get_stock_data_many fetches symbols one by one
+FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", 4))
+
+def _request_range(years):
+    """Return the (start date, end date, outputsize) requested for a number of years."""
+    # Calculate start date
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=years*365)
+    
+    # Format dates for API
+    end_date_str = end_date.strftime("%Y-%m-%d")
+    start_date_str = start_date.strftime("%Y-%m-%d")
+    
+    # Determine how many data points we need
+    outputsize = years * 252  # ~252 trading days per year
+    
+    return start_date_str, end_date_str, outputsize
+
 def get_stock_data(ticker, years=5, interval="1day"):
     """
     Fetch historical stock data from TwelveData API.
     
+    Histories are kept in the bar cache: within the interval's TTL the
+    cached bars are returned without a request, after it only the bars
+    since the last cached one are fetched and merged in. Concurrent calls
+    for the same ticker, interval and range share one fetch and receive
+    the same (read-only) result.
+    
     Args:
         ticker (str): Stock ticker symbol
         years (int): Number of years of historical data to fetch
         interval (str): Data interval (1day, 1week, 1month)
         
     Returns:
-        dict: Historical stock data
+        Bars: Historical stock data as columns (int64 epoch timestamps,
+            float64 prices), readable by the keys of the former dict of
+            lists ('dates', 'prices', 'opens', ...)
     """
-    logger.debug(f"Fetching {years} years of {interval} data for {ticker}")
+    return stock_data_flights.do((ticker, interval, years), _get_stock_data, ticker, years, interval)
+
+def _get_stock_data(ticker, years, interval):
+    logger.debug("Fetching %s years of %s data for %s", years, interval, ticker)
     
-    # Calculate start date
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=years*365)
+    start_date_str, end_date_str, outputsize = _request_range(years)
     
-    # Format dates for API
-    end_date_str = end_date.strftime("%Y-%m-%d")
-    start_date_str = start_date.strftime("%Y-%m-%d")
+    if not BAR_CACHE_ENABLED:
+        return fetch_time_series(ticker, interval, start_date_str, end_date_str, outputsize)
     
-    # Determine how many data points we need
-    outputsize = years * 252  # ~252 trading days per year
+    with span('cache'):
+        cached = bar_cache.get(ticker, interval, start_date_str)
+    
+    bars = _cached_bars(cached, ticker, interval, start_date_str, end_date_str, outputsize)
+    return _serve_range(bars, ticker, start_date_str, outputsize)
+
+def get_stock_data_many(tickers, years=5, interval="1day", max_workers=None):
+    """
+    Fetch historical stock data for several symbols.
+    
+    Symbols served by the bar cache cost no request. Symbols with nothing
+    cached are requested several at a time with the batch form of
+    time_series (comma-separated symbols); cached histories past their TTL,
+    symbols a get_stock_data call is already fetching, and the symbols of a
+    batch request that failed as a whole, are fetched one by one on a
+    bounded thread pool, sharing in-flight fetches the way get_stock_data
+    does. A symbol that fails is reported in the errors without failing the
+    others.
+    
+    Args:
+        tickers (list): Stock ticker symbols
+        years (int): Number of years of historical data to fetch
+        interval (str): Data interval (1day, 1week, 1month)
+        max_workers (int): Concurrent requests for symbols fetched one by one
+        
+    Returns:
+        tuple: ({ticker: Bars}, {ticker: error message}),
+            each in the order the tickers were given
+    """
+    tickers = list(dict.fromkeys(tickers))
+    logger.debug("Fetching %s years of %s data for %d symbols", years, interval, len(tickers))
+    
+    start_date_str, end_date_str, outputsize = _request_range(years)
+    results = {}
+    errors = {}
+    
+    # Serve what the cache can; stale histories only need their latest bars
+    stale = {}
+    missing = []
+    one_by_one = []
+    for ticker in tickers:
+        cached = bar_cache.get(ticker, interval, start_date_str) if BAR_CACHE_ENABLED else None
+        if cached is not None and cached.fresh:
+            results[ticker] = _serve_range(cached.bars, ticker, start_date_str, outputsize)
+        elif cached is not None:
+            stale[ticker] = cached
+        elif stock_data_flights.running((ticker, interval, years)):
+            # Wait on the fetch already in flight rather than batch it again
+            one_by_one.append(ticker)
+        else:
+            missing.append(ticker)
+    
+    # A batch costs a credit per symbol, so it must fit in a minute of credits
+    batch_size = TWELVEDATA_BATCH_SIZE
+    if twelvedata.bucket is not None:
+        batch_size = min(batch_size, int(twelvedata.bucket.capacity))
+    batch_size = max(1, batch_size)
+    
+    one_by_one.extend(stale)
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        if len(batch) == 1:
+            one_by_one.extend(batch)
+            continue
+        
+        try:
+            fetched = fetch_time_series_batch(batch, interval, start_date_str, end_date_str, outputsize)
+        except Exception as e:
+            logger.warning("Batch request for %s failed, fetching them one by one: %s", ", ".join(batch), e)
+            one_by_one.extend(batch)
+            continue
+        
+        for ticker, stock_data in fetched.items():
+            if isinstance(stock_data, Exception):
+                errors[ticker] = str(stock_data)
+            elif BAR_CACHE_ENABLED:
+                bar_cache.put(ticker, interval, stock_data, start_date_str)
+                results[ticker] = _serve_range(stock_data, ticker, start_date_str, outputsize)
+            else:
+                results[ticker] = stock_data
+    
+    # Pool threads charge the caller's credit meter, if it has one
+    meter = twelvedata.active_meter()
+    
+    def refresh(ticker):
+        if not BAR_CACHE_ENABLED:
+            return fetch_time_series(ticker, interval, start_date_str, end_date_str, outputsize)
+        bars = _cached_bars(stale.get(ticker), ticker, interval, start_date_str, end_date_str, outputsize)
+        return _serve_range(bars, ticker, start_date_str, outputsize)
+    
+    def fetch_one(ticker):
+        with twelvedata.metering(meter):
+            # Same key as get_stock_data, so the two share fetches
+            return stock_data_flights.do((ticker, interval, years), refresh, ticker)
+    
+    if one_by_one:
+        workers = max(1, min(len(one_by_one), int(max_workers or FETCH_WORKERS)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(fetch_one, ticker): ticker for ticker in one_by_one}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    errors[futures[future]] = str(e)
+    
+    return (
+        {ticker: results[ticker] for ticker in tickers if ticker in results},
+        {ticker: errors[ticker] for ticker in tickers if ticker in errors}
+    )
+
+def _serve_range(bars, ticker, start_date_str, outputsize):
+    """Cut a cached history to the range a direct request would return."""
+    first = int(np.searchsorted(bars.timestamps, to_epoch(start_date_str)))
+    first = max(first, bars.num_bars - outputsize)
+    stock_data = bars.window(first, bars.num_bars)
+    stock_data.ticker = ticker
+    return stock_data
+
+def _cached_bars(cached, ticker, interval, start_date_str, end_date_str, outputsize):
+    """Return a cache lookup's history, refreshed or fetched when it is stale or missing."""
+    if cached is not None and cached.fresh:
+        return cached.bars
+    
+    if cached is not None:
+        try:
+            bars = _refresh_bars(cached.bars, ticker, interval, end_date_str, outputsize)
+        except Exception as e:
+            logger.warning("Refreshing cached %s data for %s failed, serving cached bars: %s", interval, ticker, e)
+            return cached.bars
+        
+        if bars is not None:
+            bar_cache.put(ticker, interval, bars, cached.start)
+            return bars
+    
+    bars = fetch_time_series(ticker, interval, start_date_str, end_date_str, outputsize)
+    bar_cache.put(ticker, interval, bars, start_date_str)
+    return bars
+
+def _refresh_bars(cached, ticker, interval, end_date_str, outputsize):
+    """
+    Extend a cached history with the bars since its last one.
+    
+    The last cached bar is requested again, since it may have been fetched
+    before its period closed, and replaced by the fresh copy.
+    
+    Returns:
+        Bars: The merged history, or None when the response does not reach
+            back to the last cached bar and the history must be fetched again
+    """
+    last = cached.timestamps[-1] if cached.num_bars else None
+    if last is None:
+        return None
     
-    # Build API endpoint
-    endpoint = f"{TWELVEDATA_BASE_URL}/time_series"
+    since = str(format_epoch(last, cached.daily))
+    latest = fetch_time_series(ticker, interval, since, end_date_str, outputsize)
+    if latest.num_bars == 0 or latest.timestamps[0] > last:
+        return None
     
+    keep = int(np.searchsorted(cached.timestamps, latest.timestamps[0]))
+    
+    def merge(old, new):
+        return None if old is None or new is None else np.concatenate((old[:keep], new))
+    
+    logger.debug("Merged %d new %s bars into cached %s data", latest.num_bars, interval, ticker)
+    return Bars(
+        merge(cached.timestamps, latest.timestamps),
+        merge(cached.closes, latest.closes),
+        opens=merge(cached.opens, latest.opens),
+        highs=merge(cached.highs, latest.highs),
+        lows=merge(cached.lows, latest.lows),
+        volumes=merge(cached.volumes, latest.volumes),
+        ticker=cached.ticker,
+        interval=interval
+    )
+
+def fetch_time_series(ticker, interval, start_date_str, end_date_str, outputsize):
+    """
+    Request a date range of bars from the TwelveData time_series endpoint.
+    
+    Args:
+        ticker (str): Stock ticker symbol
+        interval (str): Data interval
+        start_date_str (str): First date or bar time of the range
+        end_date_str (str): Last date of the range
+        outputsize (int): Maximum number of bars (the most recent are kept)
+        
+    Returns:
+        Bars: Historical stock data in chronological order
+    """
     # Build parameters
     params = {
         "symbol": ticker,
@@ -50,72 +292,196 @@ def get_stock_data(ticker, years=5, interval="1day"):
     }
     
     try:
-        response = requests.get(endpoint, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if "values" not in data:
-            logger.error(f"API response missing values: {data}")
-            raise Exception(f"Failed to get historical data for {ticker}: {data.get('message', 'Unknown error')}")
-        
-        # Transform data into a more usable format
-        prices = []
-        dates = []
-        opens = []
-        highs = []
-        lows = []
-        volumes = []
-        
-        for bar in data["values"]:
-            dates.append(bar["datetime"])
-            prices.append(float(bar["close"]))
-            opens.append(float(bar["open"]))
-            highs.append(float(bar["high"]))
-            lows.append(float(bar["low"]))
-            volumes.append(float(bar["volume"]) if "volume" in bar else 0)
-        
-        # Reverse arrays so they're in chronological order
-        dates.reverse()
-        prices.reverse()
-        opens.reverse()
-        highs.reverse()
-        lows.reverse()
-        volumes.reverse()
-        
-        return {
-            "ticker": ticker,
-            "start_date": dates[0] if dates else None,
-            "end_date": dates[-1] if dates else None,
-            "dates": dates,
-            "prices": prices,
-            "opens": opens,
-            "highs": highs,
-            "lows": lows,
-            "volumes": volumes
-        }
+        response = twelvedata.get("/time_series", params)
+        
+        with span('parse'):
+            return _parse_time_series(_loads(response.content), ticker, interval)
         
     except requests.exceptions.RequestException as e:
-        logger.error(f"API request error: {str(e)}")
+        logger.error("API request error: %s", e)
         raise Exception(f"Error fetching data from API: {str(e)}")
     except Exception as e:
-        logger.error(f"Error processing stock data: {str(e)}")
+        logger.error("Error processing stock data: %s", e)
         raise Exception(f"Failed to process stock data: {str(e)}")
 
+def _loads(content):
+    """Decode a JSON response body, with orjson when it is installed."""
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+def _parse_time_series(data, ticker, interval):
+    """
+    Turn one symbol's time_series response into a columnar history.
+    
+    Each column is parsed from the response's strings into a preallocated
+    array; the API lists the newest bar first, so the columns are then
+    reversed as views rather than copied.
+    
+    Returns:
+        Bars: Historical stock data in chronological order
+    """
+    if "values" not in data:
+        logger.error("API response missing values: %s", data)
+        raise Exception(f"Failed to get historical data for {ticker}: {data.get('message', 'Unknown error')}")
+    
+    values = data["values"]
+    count = len(values)
+    
+    def column(key, dtype=np.float64):
+        return np.fromiter(map(itemgetter(key), values), dtype=dtype, count=count)[::-1]
+    
+    if count and "volume" in values[0]:
+        volumes = column("volume").astype(np.int64)
+    else:
+        volumes = np.zeros(count, dtype=np.int64)
+    
+    return Bars(
+        column("datetime", "datetime64[s]").astype(np.int64),
+        column("close"),
+        opens=column("open"),
+        highs=column("high"),
+        lows=column("low"),
+        volumes=volumes,
+        ticker=ticker,
+        interval=interval
+    )
+
+def fetch_time_series_batch(tickers, interval, start_date_str, end_date_str, outputsize):
+    """
+    Request the same date range for several symbols in one time_series call.
+    
+    Args:
+        tickers (list): Two or more stock ticker symbols
+        interval (str): Data interval
+        start_date_str (str): First date or bar time of the range
+        end_date_str (str): Last date of the range
+        outputsize (int): Maximum number of bars per symbol
+        
+    Returns:
+        dict: Ticker -> Bars, or the Exception explaining
+            why that symbol has none
+            
+    Raises:
+        Exception: When the request as a whole fails
+    """
+    params = {
+        "symbol": ",".join(tickers),
+        "interval": interval,
+        "start_date": start_date_str,
+        "end_date": end_date_str,
+        "outputsize": outputsize,
+        "apikey": TWELVEDATA_API_KEY
+    }
+    
+    try:
+        response = twelvedata.get("/time_series", params, credits=len(tickers))
+        
+        with span('parse'):
+            data = _loads(response.content)
+    except requests.exceptions.RequestException as e:
+        logger.error("API request error: %s", e)
+        raise Exception(f"Error fetching data from API: {str(e)}")
+    
+    if data.get("status") == "error":
+        raise Exception(f"Failed to get historical data: {data.get('message', 'Unknown error')}")
+    
+    # The response holds one time_series response per symbol
+    results = {}
+    with span('parse'):
+        for ticker in tickers:
+            series = data.get(ticker, data.get(ticker.upper()))
+            try:
+                if series is None:
+                    raise Exception(f"No data returned for {ticker}")
+                results[ticker] = _parse_time_series(series, ticker, interval)
+            except Exception as e:
+                results[ticker] = e
+    return results
+
 def search_stock(query):
     """
     Search for stocks by name or symbol.
     
+    Searches are answered from the local symbol index when it has a match,
+    then from recent remote results; only the rest call symbol_search,
+    and concurrent searches for the same query share one request.
+    
     Args:
         query (str): Search query
         
     Returns:
         list: Matching stocks
     """
-    logger.debug(f"Searching for stocks matching: {query}")
+    _ensure_symbol_index()
+    results = symbol_index.search(query)
+    if results:
+        return results
     
-    # Build API endpoint
-    endpoint = f"{TWELVEDATA_BASE_URL}/symbol_search"
+    key = query.strip().lower()
+    results = search_cache.get(key)
+    if results is None:
+        results = search_flights.do(key, _search_stock, query)
+        search_cache.put(key, results)
+    return results
+
+def refresh_symbol_index():
+    """
+    Download the list of stocks, save it to SYMBOL_INDEX_FILE and index it.
+    
+    Returns:
+        int: Number of symbols indexed
+    """
+    logger.debug("Refreshing the symbol index")
+    
+    response = twelvedata.get("/stocks", {"apikey": TWELVEDATA_API_KEY})
+    data = _loads(response.content)
+    if "data" not in data:
+        raise Exception(f"Failed to get the symbol list: {data.get('message', 'Unknown error')}")
+    
+    save_symbols(SYMBOL_INDEX_FILE, data["data"])
+    symbol_index.load(data["data"])
+    logger.info("Indexed %d symbols", len(symbol_index))
+    return len(symbol_index)
+
+_index_lock = threading.Lock()
+_index_loaded = False
+_index_refreshing = False
+_index_attempted = None
+
+def _ensure_symbol_index():
+    """Load the saved symbol list on first use, and refresh it in the background once stale."""
+    global _index_loaded, _index_refreshing, _index_attempted
+    
+    if not _index_loaded:
+        with _index_lock:
+            if not _index_loaded:
+                symbol_index.load_file(SYMBOL_INDEX_FILE)
+                _index_loaded = True
+    
+    age = symbol_index.age()
+    if SYMBOL_INDEX_REFRESH <= 0 or (age is not None and age < SYMBOL_INDEX_REFRESH):
+        return
+    
+    with _index_lock:
+        now = time.monotonic()
+        if _index_refreshing or (_index_attempted is not None and now - _index_attempted < SYMBOL_INDEX_RETRY):
+            return
+        _index_refreshing = True
+        _index_attempted = now
+    
+    threading.Thread(target=_refresh_symbol_index_background, daemon=True).start()
+
+def _refresh_symbol_index_background():
+    global _index_refreshing
+    try:
+        refresh_symbol_index()
+    except Exception as e:
+        logger.warning("Refreshing the symbol index failed: %s", e)
+    finally:
+        with _index_lock:
+            _index_refreshing = False
+
+def _search_stock(query):
+    logger.debug("Searching for stocks matching: %s", query)
     
     # Build parameters
     params = {
@@ -125,13 +491,12 @@ def search_stock(query):
     }
     
     try:
-        response = requests.get(endpoint, params=params)
-        response.raise_for_status()
+        response = twelvedata.get("/symbol_search", params)
         
-        data = response.json()
+        data = _loads(response.content)
         
         if "data" not in data:
-            logger.error(f"API response missing data: {data}")
+            logger.error("API response missing data: %s", data)
             return []
         
         # Extract relevant info
@@ -147,8 +512,8 @@ def search_stock(query):
         return results
         
     except requests.exceptions.RequestException as e:
-        logger.error(f"API request error: {str(e)}")
+        logger.error("API request error: %s", e)
         raise Exception(f"Error searching stocks: {str(e)}")
     except Exception as e:
-        logger.error(f"Error processing search results: {str(e)}")
+        logger.error("Error processing search results: %s", e)
         raise Exception(f"Failed to process search results: {str(e)}")
@@ -0,0 +1,278 @@
+import os
+import time
+import random
+import threading
+import logging
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.instrumentation import LOG_LEVEL, span
+
+# Configure logging
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a connection and for the response
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+
+# Kept-alive connections per host
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 16))
+
+# Retries of timeouts, connection errors and retryable statuses
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+
+# Backoff before retry n is drawn uniformly from [0, min(cap, base * 2**n)] seconds
+HTTP_BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", 0.5))
+HTTP_BACKOFF_CAP = float(os.environ.get("HTTP_BACKOFF_CAP", 8))
+
+# Longest a request may wait for rate limit credits before failing
+HTTP_MAX_THROTTLE_WAIT = float(os.environ.get("HTTP_MAX_THROTTLE_WAIT", 60))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TokenBucket:
+    """
+    Rate limiter refilled continuously at a number of tokens per minute.
+
+    The bucket holds at most one minute of tokens, so an idle client may
+    spend a full minute's allowance at once and is then held to the rate.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens=1):
+        """
+        Take tokens, going into debt if the bucket is short.
+
+        Reserving up front keeps concurrent callers in arrival order: each
+        waits for the tokens it took rather than racing for the refill.
+
+        Returns:
+            float: Seconds the caller must wait before using the tokens
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= tokens
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, tokens=1):
+        """Return tokens reserved for a request that was not sent."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+# Start of the error raised for requests a CreditMeter's limit refuses
+CREDIT_LIMIT_REACHED = "Credit limit reached"
+
+class CreditMeter:
+    """
+    Credits charged for the requests made while it is active, across threads.
+
+    With a limit, a request that would take the total past it is refused
+    before it is sent.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.credits = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def charge(self, credits):
+        """Count a request's credits, raising instead when they exceed the limit."""
+        with self._lock:
+            if self.limit is not None and self.credits + credits > self.limit:
+                self.refused += 1
+                raise Exception(f"{CREDIT_LIMIT_REACHED}: {self.credits} of {self.limit} credits spent")
+            self.credits += credits
+
+    def refund(self, credits):
+        """Return the credits of a request that was not sent."""
+        with self._lock:
+            self.credits -= credits
+
+class HttpClient:
+    """
+    Shared HTTP client for a rate-limited JSON API.
+
+    Requests go through one keep-alive session with explicit timeouts, are
+    throttled by a token bucket charged the credits each call costs, and are
+    retried with jittered exponential backoff on timeouts, connection errors
+    and retryable statuses, including rate limit errors returned in a 200
+    body. Credits charged, wait times and retries are counted for stats().
+    """
+
+    def __init__(self, base_url, credits_per_minute=0, max_retries=HTTP_MAX_RETRIES,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), pool_size=HTTP_POOL_SIZE):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(credits_per_minute) if credits_per_minute > 0 else None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.credits = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled = 0
+        self.throttle_wait = 0.0
+        self.max_throttle_wait = 0.0
+
+    def get(self, path, params=None, credits=1):
+        """
+        GET an endpoint of the API.
+
+        Args:
+            path (str): Endpoint path, e.g. '/time_series'
+            params (dict): Query parameters
+            credits (int): Rate limit credits the call costs
+
+        Returns:
+            requests.Response: The successful response, or the last one
+                received once retries are exhausted
+
+        Raises:
+            requests.exceptions.RequestException: On a status error or when
+                the last attempt failed to connect or timed out
+        """
+        url = f"{self.base_url}{path}"
+
+        for attempt in range(self.max_retries + 1):
+            meter = getattr(self._local, 'meter', None)
+            if meter is not None:
+                meter.charge(credits)
+
+            try:
+                self._throttle(credits)
+            except Exception:
+                if meter is not None:
+                    meter.refund(credits)
+                raise
+            with self._lock:
+                self.requests += 1
+                self.credits += credits
+
+            try:
+                with span('fetch'):
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    self._count('failures')
+                    raise
+                reason, retry_after = type(e).__name__, None
+            else:
+                if not self._retryable(response):
+                    if not response.ok:
+                        self._count('failures')
+                    response.raise_for_status()
+                    return response
+                if attempt == self.max_retries:
+                    self._count('failures')
+                    if response.status_code >= 400:
+                        response.raise_for_status()
+                    return response
+                reason, retry_after = response.status_code, response.headers.get('Retry-After')
+
+            delay = self._backoff(attempt, retry_after)
+            self._count('retries')
+            logger.warning("Retrying %s in %.2fs after %s (attempt %d of %d)",
+                           path, delay, reason, attempt + 1, self.max_retries)
+            time.sleep(delay)
+
+    @contextmanager
+    def metering(self, meter):
+        """
+        Charge the credits of requests made on this thread to a meter as well.
+
+        The client's own counter covers every caller; a meter isolates the
+        credits one piece of work spent. Work handed to other threads passes
+        the meter on with its own metering block.
+
+        Usage:
+            meter = CreditMeter()
+            with client.metering(meter):
+                ...
+        """
+        previous = getattr(self._local, 'meter', None)
+        self._local.meter = meter
+        try:
+            yield meter
+        finally:
+            self._local.meter = previous
+
+    def active_meter(self):
+        """Return the meter charged on this thread, if any."""
+        return getattr(self._local, 'meter', None)
+
+    def stats(self):
+        """Return request, retry and throttling counters."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'credits': self.credits,
+                'retries': self.retries,
+                'failures': self.failures,
+                'throttled': self.throttled,
+                'throttle_wait_ms': round(self.throttle_wait * 1000, 3),
+                'max_throttle_wait_ms': round(self.max_throttle_wait * 1000, 3),
+                'credits_per_minute': self.bucket.capacity if self.bucket else None
+            }
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _throttle(self, credits):
+        if self.bucket is None:
+            return
+
+        wait = self.bucket.reserve(credits)
+        if wait <= 0:
+            return
+        if wait > HTTP_MAX_THROTTLE_WAIT:
+            self.bucket.refund(credits)
+            self._count('failures')
+            raise Exception(f"Rate limit: {credits} credits would take {wait:.0f}s to become available")
+
+        with self._lock:
+            self.throttled += 1
+            self.throttle_wait += wait
+            self.max_throttle_wait = max(self.max_throttle_wait, wait)
+
+        logger.debug("Throttling request for %.2fs", wait)
+        with span('throttle'):
+            time.sleep(wait)
+
+    @staticmethod
+    def _retryable(response):
+        if response.status_code in RETRY_STATUSES:
+            return True
+        # TwelveData reports exhausted credits as a small 200 error body
+        content = response.content
+        return len(content) < 1024 and b'"code":429' in content.replace(b' ', b'')
+
+    @staticmethod
+    def _backoff(attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(HTTP_BACKOFF_CAP, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return random.uniform(0, min(HTTP_BACKOFF_CAP, HTTP_BACKOFF_BASE * 2 ** attempt))
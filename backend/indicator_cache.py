@@ -0,0 +1,126 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Memory budget for cached indicator arrays
+INDICATOR_CACHE_MB = float(os.environ.get("INDICATOR_CACHE_MB", 64))
+
+def _nbytes(value):
+    """Return the memory held by an indicator node value."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sum(_nbytes(item) for item in value)
+
+def _freeze(value):
+    """Mark cached arrays read-only since they are shared across requests."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    else:
+        for item in value:
+            _freeze(item)
+
+class IndicatorCache:
+    """
+    Process-wide LRU cache of indicator node values with a memory budget.
+
+    Keys are (data version, node kind, node arguments), where the data
+    version identifies the exact price history the node was computed on.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries over budget."""
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+
+        _freeze(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+            self._evict()
+
+    def resize(self, max_bytes):
+        """Change the memory budget, evicting entries if it shrank."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return cache counters and memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0
+            }
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+# Shared by every request handled by this process
+indicator_cache = IndicatorCache(int(INDICATOR_CACHE_MB * 1024 * 1024))
+
+def data_version(stock_data, prices):
+    """
+    Identify a price history for indicator caching.
+
+    Args:
+        stock_data (dict): Historical stock data
+        prices (np.ndarray): Closing prices as float64
+
+    Returns:
+        tuple: (ticker, interval, last bar date, bar count, content hash)
+    """
+    digest = hashlib.blake2b(prices.tobytes(), digest_size=16).hexdigest()
+    dates = stock_data.get('dates')
+    last_date = dates[-1] if dates is not None and len(dates) else None
+
+    return (
+        stock_data.get('ticker'),
+        stock_data.get('interval', '1day'),
+        last_date,
+        len(prices),
+        digest
+    )
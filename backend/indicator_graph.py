@@ -0,0 +1,274 @@
+import json
+from collections.abc import Mapping
+
+import numpy as np
+
+from backend.bar_store import write_columns, open_columns
+from backend.indicator_cache import indicator_cache
+from backend.indicators import as_price_array, nan_array, rolling_moments, sma, ema, rsi, macd_from_emas
+
+# Strategy parameters that feed indicators: name -> (default, type)
+INDICATOR_PARAMS = {
+    'ma_fast': (10, int),
+    'ma_slow': (50, int),
+    'rsi_period': (14, int),
+    'bb_period': (20, int),
+    'bb_std': (2, float),
+    'macd_fast': (12, int),
+    'macd_slow': (26, int),
+    'macd_signal': (9, int),
+}
+
+# Indicator series name -> (node kind, parameter names, output component)
+SERIES = {
+    'ma_fast': ('sma', ('ma_fast',), None),
+    'ma_slow': ('sma', ('ma_slow',), None),
+    'rsi': ('rsi', ('rsi_period',), None),
+    'bb_upper': ('bollinger', ('bb_period', 'bb_std'), 0),
+    'bb_middle': ('bollinger', ('bb_period', 'bb_std'), 1),
+    'bb_lower': ('bollinger', ('bb_period', 'bb_std'), 2),
+    'macd': ('macd', ('macd_fast', 'macd_slow', 'macd_signal'), 0),
+    'macd_signal': ('macd', ('macd_fast', 'macd_slow', 'macd_signal'), 1),
+    'macd_hist': ('macd', ('macd_fast', 'macd_slow', 'macd_signal'), 2),
+}
+
+# Series read by the entry/exit rules of each strategy type
+STRATEGY_INDICATORS = {
+    'ma_crossover': ('ma_fast', 'ma_slow'),
+    'rsi_oversold': ('rsi',),
+    'bollinger_bounce': ('bb_lower', 'bb_middle'),
+    'macd_crossover': ('macd_hist',),
+}
+
+def strategy_indicators(params):
+    """Return the indicator series needed by the params' strategy type."""
+    return STRATEGY_INDICATORS.get(params.get('strategy_type', 'ma_crossover'), ())
+
+def indicator_args(params, param_names):
+    """Resolve indicator parameters from strategy params, applying defaults and types."""
+    args = []
+    for name in param_names:
+        default, kind = INDICATOR_PARAMS[name]
+        args.append(kind(params.get(name, default)))
+    return tuple(args)
+
+def _shift(values):
+    """Shift a series one bar later, padding the first bar with NaN."""
+    shifted = nan_array(len(values))
+    shifted[1:] = values[:-1]
+    return shifted
+
+def _node_sma(graph, period):
+    return sma(graph.prices, period)
+
+def _node_ema(graph, period):
+    return ema(graph.prices, period)
+
+def _node_rsi(graph, period):
+    return rsi(graph.prices, period)
+
+def _node_rolling_std(graph, period):
+    prices = graph.prices
+    out = nan_array(len(prices))
+
+    if period <= 0 or len(prices) < period:
+        return out
+
+    means, variances = rolling_moments(prices, period, with_variance=True)
+    out[period - 1:] = np.sqrt(variances)
+
+    # The window means come for free, so share them with the SMA node
+    sma_values = nan_array(len(prices))
+    sma_values[period - 1:] = means
+    graph.seed('sma', (period,), sma_values)
+
+    return out
+
+def _node_bollinger(graph, period, std_dev):
+    # Bands are built from the window of bars preceding each bar
+    width = std_dev * _shift(graph.node('rolling_std', period))
+    middle = _shift(graph.node('sma', period))
+    return middle + width, middle, middle - width
+
+def _node_macd(graph, fast_period, slow_period, signal_period):
+    if len(graph.prices) <= slow_period + signal_period or signal_period <= 0:
+        length = len(graph.prices)
+        return nan_array(length), nan_array(length), nan_array(length)
+
+    return macd_from_emas(
+        graph.node('ema', fast_period),
+        graph.node('ema', slow_period),
+        slow_period,
+        signal_period
+    )
+
+NODES = {
+    'sma': _node_sma,
+    'ema': _node_ema,
+    'rsi': _node_rsi,
+    'rolling_std': _node_rolling_std,
+    'bollinger': _node_bollinger,
+    'macd': _node_macd,
+}
+
+class IndicatorGraph(Mapping):
+    """
+    Lazily evaluated indicator series for one price history.
+
+    Series are computed on first access and every intermediate node (an SMA,
+    an EMA, a rolling standard deviation) is computed at most once, so series
+    that share a subexpression - e.g. both MACD EMAs across parameter sets, or
+    an SMA used as both ma_fast and the Bollinger middle band - reuse it.
+
+    When a data version is given, nodes are also looked up in and stored to
+    the process-wide indicator cache so later requests on the same history
+    skip the computation.
+    """
+
+    # Bars of history preceding prices[0] that the series were computed over
+    offset = 0
+
+    def __init__(self, prices, params, version=None, cache=indicator_cache):
+        self.prices = as_price_array(prices)
+        self.params = params
+        self.version = version
+        self.cache = cache if version is not None else None
+        self._nodes = {}
+
+    def node(self, kind, *args):
+        """Return the value of an indicator node, computing it if needed."""
+        key = (kind, args)
+        if key in self._nodes:
+            return self._nodes[key]
+
+        value = self.cache.get((self.version,) + key) if self.cache is not None else None
+        if value is None:
+            value = NODES[kind](self, *args)
+            if self.cache is not None:
+                self.cache.put((self.version,) + key, value)
+
+        self._nodes[key] = value
+        return value
+
+    def for_params(self, params):
+        """Return a graph for other strategy params that shares this graph's nodes."""
+        graph = IndicatorGraph(self.prices, params)
+        graph.version = self.version
+        graph.cache = self.cache
+        graph._nodes = self._nodes
+        return graph
+
+    def window(self, start, stop):
+        """Return a graph for bars [start, stop) whose series are views of this graph's."""
+        return IndicatorWindow(self, start, stop, self.params)
+
+    def seed(self, kind, args, value):
+        """Record a node value computed as a by-product of another node."""
+        key = (kind, args)
+        if key not in self._nodes:
+            self._nodes[key] = value
+            if self.cache is not None:
+                self.cache.put((self.version,) + key, value)
+
+    def compute(self, names):
+        """Return a plain dict with the requested series."""
+        return {name: self[name] for name in names}
+
+    def __getitem__(self, name):
+        kind, param_names, component = SERIES[name]
+        value = self.node(kind, *indicator_args(self.params, param_names))
+        return value if component is None else value[component]
+
+    def __iter__(self):
+        return iter(SERIES)
+
+    def __len__(self):
+        return len(SERIES)
+
+def _slice(value, start, stop):
+    if isinstance(value, tuple):
+        return tuple(item[start:stop] for item in value)
+    return value[start:stop]
+
+class IndicatorWindow(IndicatorGraph):
+    """
+    Indicator graph for a contiguous window of a longer price history.
+
+    Nodes are computed once on the full history and sliced, so windows that
+    overlap (walk-forward folds, truncated histories) share one copy of each
+    series, and every series is already warmed up at the window's first bar.
+    """
+
+    def __init__(self, parent, start, stop, params):
+        self.parent = parent
+        self.start = start
+        self.stop = stop
+        self.offset = start
+        self.prices = parent.prices[start:stop]
+        self.params = params
+        self.version = None
+        self.cache = None
+        self._nodes = {}
+
+    def node(self, kind, *args):
+        """Return the window's slice of the parent graph's node."""
+        key = (kind, args)
+        if key not in self._nodes:
+            self._nodes[key] = _slice(self.parent.node(kind, *args), self.start, self.stop)
+        return self._nodes[key]
+
+    def for_params(self, params):
+        """Return a window over the same bars for other strategy params."""
+        window = IndicatorWindow(self.parent, self.start, self.stop, params)
+        window._nodes = self._nodes
+        return window
+
+    def window(self, start, stop):
+        """Return a narrower window, sliced directly from the parent graph."""
+        return IndicatorWindow(self.parent, self.start + start, self.start + stop, self.params)
+
+    def seed(self, kind, args, value):
+        """Windows never compute nodes themselves, so there is nothing to seed."""
+
+def save_nodes(graph, path):
+    """
+    Store every node a graph has computed, for open_graph in other processes.
+
+    Args:
+        graph (IndicatorGraph): A full-history graph (not a window)
+        path (str): Directory to write
+    """
+    columns = {}
+    for (kind, args), value in graph._nodes.items():
+        if isinstance(value, tuple):
+            for component, item in enumerate(value):
+                columns[json.dumps([kind, list(args), component])] = item
+        else:
+            columns[json.dumps([kind, list(args), None])] = value
+    write_columns(path, columns)
+
+def open_graph(path, prices, params=None):
+    """
+    Return a graph over prices whose nodes are memory-mapped from save_nodes output.
+
+    Processes opening the same path share one copy of the stored series;
+    nodes that were not stored are computed on demand as usual.
+
+    Args:
+        path (str): Directory written by save_nodes
+        prices (list or np.ndarray): The prices the stored graph was built on
+        params (dict): Strategy parameters for the graph
+    """
+    graph = IndicatorGraph(prices, params or {})
+    components = {}
+    for name, values in open_columns(path).items():
+        kind, args, component = json.loads(name)
+        key = (kind, tuple(args))
+        if component is None:
+            graph._nodes[key] = values
+        else:
+            components.setdefault(key, {})[component] = values
+
+    for key, items in components.items():
+        graph._nodes[key] = tuple(items[component] for component in range(len(items)))
+    return graph
@@ -0,0 +1,215 @@
+import numpy as np
+
+from backend.kernels import native, recursive_filter_native
+
+# Number of bars processed per block by the rolling-window and recursive
+# kernels. Each block re-anchors its running sums, which keeps the
+# floating point error independent of the total history length.
+BLOCK_SIZE = 512
+
+def as_price_array(prices):
+    """Return prices as a contiguous float64 array (no copy if already one)."""
+    return np.ascontiguousarray(prices, dtype=np.float64)
+
+def nan_array(length):
+    """Return a float64 array of the given length filled with NaN."""
+    return np.full(length, np.nan)
+
+def recursive_filter(values, decay, gain, initial):
+    """
+    Apply the first-order recursion y[k] = decay * y[k-1] + gain * values[k].
+
+    The recursion is evaluated in closed form one block at a time, so the work
+    is done by NumPy instead of a Python loop over every bar. With the numba
+    kernel backend a compiled loop evaluates it bar by bar instead.
+
+    Args:
+        values (np.ndarray): Input series
+        decay (float): Weight of the previous output (0 <= decay < 1)
+        gain (float): Weight of the current input
+        initial (float): Output value preceding values[0]
+
+    Returns:
+        np.ndarray: Filtered series, same length as values
+    """
+    values = as_price_array(values)
+    out = np.empty(len(values))
+
+    if len(values) == 0:
+        return out
+
+    if native():
+        return recursive_filter_native(values, decay, gain, initial)
+
+    if decay <= 0:
+        out[:] = gain * values
+        return out
+
+    # Keep decay ** -block representable in a float64
+    block = int(min(BLOCK_SIZE, max(1, 600 / -np.log(decay))))
+    powers = decay ** np.arange(1, block + 1)
+    state = initial
+
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        scale = powers[:len(chunk)]
+        filtered = scale * (state + gain * np.cumsum(chunk / scale))
+        out[start:start + len(chunk)] = filtered
+        state = filtered[-1]
+
+    return out
+
+def rolling_moments(values, period, with_variance=False):
+    """
+    Calculate the mean (and optionally population variance) of every full window.
+
+    Args:
+        values (np.ndarray): Input series
+        period (int): Window length
+        with_variance (bool): Whether to also compute the variance
+
+    Returns:
+        tuple: (means, variances) for the windows ending at index period-1 onwards;
+            variances is None unless requested
+    """
+    count = len(values) - period + 1
+    means = np.empty(count)
+    variances = np.empty(count) if with_variance else None
+
+    for start in range(0, count, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, count)
+        window = values[start:stop + period - 1]
+
+        # Anchor the block at its first value so running sums stay small
+        anchor = window[0]
+        shifted = window - anchor
+
+        sums = np.concatenate(([0.0], np.cumsum(shifted)))
+        window_means = (sums[period:] - sums[:-period]) / period
+        means[start:stop] = window_means + anchor
+
+        if with_variance:
+            squares = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+            window_var = (squares[period:] - squares[:-period]) / period - window_means ** 2
+            variances[start:stop] = np.maximum(window_var, 0.0)
+
+    return means, variances
+
+def sma(prices, period):
+    """Calculate a simple moving average over the window ending at each bar."""
+    prices = as_price_array(prices)
+    period = int(period)
+    out = nan_array(len(prices))
+
+    if period <= 0 or len(prices) < period:
+        return out
+
+    out[period - 1:], _ = rolling_moments(prices, period)
+    return out
+
+def ema(prices, period):
+    """Calculate an exponential moving average seeded with the first SMA."""
+    prices = as_price_array(prices)
+    period = int(period)
+    out = nan_array(len(prices))
+
+    if period <= 0 or len(prices) < period:
+        return out
+
+    seed = prices[:period].sum() / period
+    out[period - 1] = seed
+
+    multiplier = 2 / (period + 1)
+    out[period:] = recursive_filter(prices[period:], 1 - multiplier, multiplier, seed)
+
+    return out
+
+def rsi(prices, period=14):
+    """Calculate the Relative Strength Index with Wilder smoothing."""
+    prices = as_price_array(prices)
+    period = int(period)
+    out = nan_array(len(prices))
+
+    if period <= 0 or len(prices) <= period:
+        return out
+
+    deltas = np.diff(prices)
+    gains = np.maximum(deltas, 0.0)
+    losses = np.maximum(-deltas, 0.0)
+
+    # The first smoothed value re-applies the last bar of the seed window
+    decay = (period - 1) / period
+    avg_gain = recursive_filter(gains[period - 1:], decay, 1 / period, gains[:period].sum() / period)
+    avg_loss = recursive_filter(losses[period - 1:], decay, 1 / period, losses[:period].sum() / period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[period:] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+
+    return out
+
+def bollinger_bands(prices, period=20, std_dev=2):
+    """
+    Calculate Bollinger Bands over the window of bars preceding each bar.
+
+    Returns:
+        tuple: (upper, middle, lower) arrays
+    """
+    prices = as_price_array(prices)
+    period = int(period)
+
+    if period <= 0 or len(prices) <= period:
+        return nan_array(len(prices)), nan_array(len(prices)), nan_array(len(prices))
+
+    means, variances = rolling_moments(prices[:-1], period, with_variance=True)
+    width = std_dev * np.sqrt(variances)
+
+    middle = nan_array(len(prices))
+    upper = nan_array(len(prices))
+    lower = nan_array(len(prices))
+    middle[period:] = means
+    upper[period:] = means + width
+    lower[period:] = means - width
+
+    return upper, middle, lower
+
+def macd(prices, fast_period=12, slow_period=26, signal_period=9):
+    """
+    Calculate the MACD line, its signal line and the histogram.
+
+    Returns:
+        tuple: (macd, signal, histogram) arrays
+    """
+    prices = as_price_array(prices)
+
+    if len(prices) <= int(slow_period) + int(signal_period) or int(signal_period) <= 0:
+        return nan_array(len(prices)), nan_array(len(prices)), nan_array(len(prices))
+
+    return macd_from_emas(ema(prices, fast_period), ema(prices, slow_period), slow_period, signal_period)
+
+def macd_from_emas(ema_fast, ema_slow, slow_period=26, signal_period=9):
+    """
+    Calculate MACD from precomputed fast and slow EMAs.
+
+    Returns:
+        tuple: (macd, signal, histogram) arrays
+    """
+    length = len(ema_slow)
+    slow_period = int(slow_period)
+    signal_period = int(signal_period)
+
+    if length <= slow_period + signal_period or signal_period <= 0:
+        return nan_array(length), nan_array(length), nan_array(length)
+
+    macd_line = nan_array(length)
+    macd_line[slow_period:] = ema_fast[slow_period:] - ema_slow[slow_period:]
+
+    # Signal line is an EMA of the MACD line seeded with its first SMA
+    first_signal = slow_period + signal_period - 1
+    seed = macd_line[slow_period:first_signal + 1].sum() / signal_period
+    alpha = 2 / (signal_period + 1)
+
+    signal_line = nan_array(length)
+    signal_line[first_signal] = seed
+    signal_line[first_signal + 1:] = recursive_filter(macd_line[first_signal + 1:], 1 - alpha, alpha, seed)
+
+    return macd_line, signal_line, macd_line - signal_line
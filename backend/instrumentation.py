@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+
+# Log level for every module; DEBUG formats a message on every call, so it
+# is opt-in rather than the default
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# Record stage timings for every request, not only those asking for them
+TIMINGS_ENABLED = os.environ.get("TIMINGS_ENABLED", "").lower() in ("1", "true", "yes")
+
+# Spans kept individually per trace; later spans only count towards totals
+MAX_TRACE_SPANS = 200
+
+_local = threading.local()
+
+class _NullSpan:
+    """Span returned when no trace is active; entering and leaving it does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.record(self.name, self.start, time.perf_counter())
+        return False
+
+class Trace:
+    """
+    Stage timings recorded while handling one request.
+
+    Spans are kept in the order they finish with their start offset from the
+    beginning of the trace; per-stage totals cover every span, including
+    those past MAX_TRACE_SPANS.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.totals = {}
+
+    def record(self, name, start, end):
+        """Add a finished span."""
+        duration = end - start
+        if len(self.spans) < MAX_TRACE_SPANS:
+            self.spans.append((name, start - self.started, duration))
+
+        count, total = self.totals.get(name, (0, 0.0))
+        self.totals[name] = (count + 1, total + duration)
+
+    def summary(self):
+        """Return the trace in milliseconds as a JSON-compatible dict."""
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'stages': {
+                name: {'count': count, 'ms': round(total * 1000, 3)}
+                for name, (count, total) in self.totals.items()
+            },
+            'spans': [
+                {'name': name, 'start_ms': round(offset * 1000, 3), 'ms': round(duration * 1000, 3)}
+                for name, offset, duration in self.spans
+            ]
+        }
+
+def span(name):
+    """
+    Time a block as a named stage of the current trace.
+
+    Without an active trace this returns a shared no-op context manager, so
+    instrumented code pays one thread-local lookup.
+
+    Usage:
+        with span('indicators'):
+            ...
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return NULL_SPAN
+    return _Span(trace, name)
+
+def start_trace():
+    """Start recording spans on the current thread."""
+    _local.trace = Trace()
+    return _local.trace
+
+def finish_trace():
+    """Stop recording on the current thread and return the trace, if any."""
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    return trace
+
+class RouteTimings:
+    """Per-route aggregate of request traces: request count and stage totals."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, summary):
+        """Fold a trace summary into the route's totals."""
+        with self._lock:
+            entry = self._routes.setdefault(route, {'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'stages': {}})
+            entry['requests'] += 1
+            entry['total_ms'] += summary['total_ms']
+            entry['max_ms'] = max(entry['max_ms'], summary['total_ms'])
+
+            for name, stage in summary['stages'].items():
+                totals = entry['stages'].setdefault(name, {'count': 0, 'ms': 0.0, 'max_ms': 0.0})
+                totals['count'] += stage['count']
+                totals['ms'] += stage['ms']
+                totals['max_ms'] = max(totals['max_ms'], stage['ms'])
+
+    def stats(self):
+        """Return per-route request and stage timings with per-request means."""
+        with self._lock:
+            stats = {}
+            for route, entry in self._routes.items():
+                requests = entry['requests']
+                stats[route] = {
+                    'requests': requests,
+                    'mean_ms': round(entry['total_ms'] / requests, 3),
+                    'max_ms': round(entry['max_ms'], 3),
+                    'stages': {
+                        name: {
+                            'count': totals['count'],
+                            'mean_ms': round(totals['ms'] / requests, 3),
+                            'max_ms': round(totals['max_ms'], 3),
+                            # Share of the route's time spent in the stage
+                            'share': round(totals['ms'] / entry['total_ms'], 4) if entry['total_ms'] else 0
+                        }
+                        for name, totals in entry['stages'].items()
+                    }
+                }
+            return stats
+
+    def clear(self):
+        """Drop all recorded timings."""
+        with self._lock:
+            self._routes.clear()
+
+# Shared by every request handled by this process
+route_timings = RouteTimings()
@@ -3,8 +3,10 @@ import json
 import logging
 from openai import OpenAI
 
+from backend.instrumentation import LOG_LEVEL, span
+
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 # Initialize OpenAI client
@@ -23,7 +25,7 @@ def parse_user_prompt(prompt):
     Returns:
         dict: Structured fields extracted from the prompt
     """
-    logger.debug(f"Parsing user prompt: {prompt}")
+    logger.debug("Parsing user prompt: %s", prompt)
     
     system_message = """
     You are an expert financial analyst and trading strategy specialist.
@@ -40,20 +42,21 @@ def parse_user_prompt(prompt):
     """
     
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
+        with span('llm'):
+            response = openai.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
         
         parsed_intent = json.loads(response.choices[0].message.content)
-        logger.debug(f"Parsed intent: {parsed_intent}")
+        logger.debug("Parsed intent: %s", parsed_intent)
         
         return parsed_intent
         
     except Exception as e:
-        logger.error(f"Error parsing user prompt: {str(e)}")
+        logger.error("Error parsing user prompt: %s", e)
         raise Exception(f"Failed to parse user prompt: {str(e)}")
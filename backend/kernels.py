@@ -0,0 +1,161 @@
+import os
+import logging
+
+import numpy as np
+
+from backend.instrumentation import LOG_LEVEL
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Configure logging
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Implementation of the sequential kernels (the position state machine and
+# the EMA/RSI recursion): 'numba' compiles them to native loops, 'numpy'
+# uses the vectorized code, 'auto' picks numba when it is installed
+KERNEL_BACKEND = os.environ.get("KERNEL_BACKEND", "auto").lower()
+
+BACKENDS = ('auto', 'numba', 'numpy')
+
+# Marks a disabled holding period, and the exit bar of an open position
+DISABLED = -1
+
+def _recursive_loop(values, decay, gain, initial):
+    out = np.empty(len(values))
+    state = initial
+    for k in range(len(values)):
+        state = decay * state + gain * values[k]
+        out[k] = state
+    return out
+
+def _simulate_loop(prices, entries, exits, start, stop_factor, target_factor, max_hold, trailing_factor):
+    length = len(prices)
+    entry_bars = np.empty(length, dtype=np.int64)
+    exit_bars = np.empty(length, dtype=np.int64)
+    count = 0
+    bar = start
+
+    while bar < length:
+        # Flat: wait for the next entry signal
+        while bar < length and not entries[bar]:
+            bar += 1
+        if bar >= length:
+            break
+
+        entry = bar
+        entry_price = prices[entry]
+        stop_price = entry_price * stop_factor
+        target_price = entry_price * target_factor
+        trailing_high = entry_price
+        exit_bar = DISABLED
+
+        # Long: the strategy exit, a risk exit or the holding period closes it
+        for k in range(entry + 1, length):
+            price = prices[k]
+            if price > trailing_high:
+                trailing_high = price
+
+            if exits[k] or (max_hold != DISABLED and k - entry >= max_hold):
+                exit_bar = k
+                break
+            if price < stop_price or price > target_price:
+                exit_bar = k
+                break
+            if price < trailing_high * trailing_factor:
+                exit_bar = k
+                break
+
+        entry_bars[count] = entry
+        exit_bars[count] = exit_bar
+        count += 1
+
+        if exit_bar == DISABLED:
+            break
+        bar = exit_bar + 1
+
+    return entry_bars[:count], exit_bars[:count]
+
+if numba is not None:
+    _recursive_native = numba.njit(cache=True, nogil=True)(_recursive_loop)
+    _simulate_native = numba.njit(cache=True, nogil=True)(_simulate_loop)
+else:
+    _recursive_native = _simulate_native = None
+
+def resolve_backend(name):
+    """
+    Turn a configured backend name into the one used.
+
+    Raises:
+        Exception: For an unknown name, or 'numba' when it is not installed
+    """
+    name = (name or 'auto').lower()
+    if name not in BACKENDS:
+        raise Exception(f"Unknown kernel backend: {name} (expected one of {', '.join(BACKENDS)})")
+    if name == 'auto':
+        return 'numba' if numba is not None else 'numpy'
+    if name == 'numba' and numba is None:
+        raise Exception("Kernel backend 'numba' requested but numba is not installed")
+    return name
+
+def _configured_backend():
+    try:
+        return resolve_backend(KERNEL_BACKEND)
+    except Exception as e:
+        logger.warning("%s; using the numpy kernels", e)
+        return 'numpy'
+
+_backend = _configured_backend()
+
+def get_backend():
+    """Return the kernel backend in use: 'numba' or 'numpy'."""
+    return _backend
+
+def set_backend(name):
+    """
+    Switch the kernel backend for this process.
+
+    Cached indicator values are not invalidated; clear the indicator cache
+    when comparing backends.
+
+    Returns:
+        str: The previous backend
+    """
+    global _backend
+    previous = _backend
+    _backend = resolve_backend(name)
+    return previous
+
+def native():
+    """True when the compiled kernels should be used."""
+    return _backend == 'numba'
+
+def recursive_filter_native(values, decay, gain, initial):
+    """Compiled y[k] = decay * y[k-1] + gain * values[k], one bar at a time."""
+    return _recursive_native(values, float(decay), float(gain), float(initial))
+
+def simulate_native(prices, entries, exits, start, stop_factor, target_factor, max_hold, trailing_factor):
+    """
+    Compiled position state machine.
+
+    Args:
+        prices (np.ndarray): Historical prices
+        entries (np.ndarray): Boolean entry mask
+        exits (np.ndarray): Boolean strategy exit mask
+        start (int): First bar on which trading is allowed
+        stop_factor (float): Stop price as a fraction of the entry price
+        target_factor (float): Target price as a fraction of the entry price
+        max_hold (int): Holding period in bars, DISABLED for none
+        trailing_factor (float): Trailing stop as a fraction of the high, 0 for none
+
+    Returns:
+        tuple: (entry bars, exit bars) int64 arrays; the exit bar is
+            DISABLED for a position still open on the last bar
+    """
+    return _simulate_native(
+        prices, np.ascontiguousarray(entries, dtype=np.bool_), np.ascontiguousarray(exits, dtype=np.bool_),
+        int(start), float(stop_factor), float(target_factor), int(max_hold), float(trailing_factor)
+    )
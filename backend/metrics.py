@@ -0,0 +1,193 @@
+import numpy as np
+
+# Bars per year used to annualize daily results
+TRADING_DAYS = 252
+
+# Regular session minutes per trading day, used for intraday intervals
+SESSION_MINUTES = 390
+
+# Bars per year of every TwelveData interval
+PERIODS_PER_YEAR = {
+    '1min': TRADING_DAYS * SESSION_MINUTES,
+    '5min': TRADING_DAYS * SESSION_MINUTES / 5,
+    '15min': TRADING_DAYS * SESSION_MINUTES / 15,
+    '30min': TRADING_DAYS * SESSION_MINUTES / 30,
+    '45min': TRADING_DAYS * SESSION_MINUTES / 45,
+    '1h': TRADING_DAYS * SESSION_MINUTES / 60,
+    '2h': TRADING_DAYS * SESSION_MINUTES / 120,
+    '4h': TRADING_DAYS * SESSION_MINUTES / 240,
+    '8h': TRADING_DAYS,
+    '1day': TRADING_DAYS,
+    '1week': 52,
+    '1month': 12,
+}
+
+def periods_per_year(interval):
+    """Return the bars per year of a data interval (daily when unknown)."""
+    return PERIODS_PER_YEAR.get(interval or '1day', TRADING_DAYS)
+
+# Equity curves are (bars,) for one run or (runs, bars) for a batch; bars are
+# always the last axis and every statistic reduces over it.
+
+def bar_returns(values):
+    """Return the simple return of every bar after the first."""
+    values = np.asarray(values, dtype=np.float64)
+    return values[..., 1:] / values[..., :-1] - 1
+
+def drawdowns(values):
+    """Return the fractional drop from the running maximum at every bar."""
+    values = np.asarray(values, dtype=np.float64)
+    peaks = np.maximum.accumulate(values, axis=-1)
+    return (peaks - values) / peaks
+
+def _ratio(numerator, denominator):
+    """Divide where the denominator is positive, 0 elsewhere."""
+    numerator, denominator = np.broadcast_arrays(numerator, denominator)
+    out = np.zeros(numerator.shape)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+def equity_metrics(values, periods_per_year=TRADING_DAYS):
+    """
+    Calculate return and risk statistics of equity curves in one pass.
+
+    Ratios whose denominator is zero (a flat curve, no drawdown) are 0.
+
+    Args:
+        values (np.ndarray): Equity curve (bars,) or batch of curves (runs, bars)
+        periods_per_year (float): Bars per year used to annualize
+
+    Returns:
+        dict: Statistic name -> float for one curve or array of shape (runs,);
+            returns, CAGR, volatility and drawdown are percentages
+    """
+    values = np.asarray(values, dtype=np.float64)
+    returns = bar_returns(values)
+
+    growth = values[..., -1] / values[..., 0]
+    years = values.shape[-1] / periods_per_year
+    with np.errstate(invalid='ignore'):
+        cagr = growth ** (1 / years) - 1
+
+    mean = returns.mean(axis=-1)
+    std = returns.std(axis=-1)
+    downside = np.sqrt((np.minimum(returns, 0.0) ** 2).mean(axis=-1))
+    max_drawdown = drawdowns(values).max(axis=-1)
+    annualizer = np.sqrt(periods_per_year)
+
+    stats = {
+        'total_return': (growth - 1) * 100,
+        'cagr': cagr * 100,
+        'sharpe_ratio': _ratio(mean, std) * annualizer,
+        'sortino_ratio': _ratio(mean, downside) * annualizer,
+        'calmar_ratio': _ratio(cagr, max_drawdown),
+        'volatility': std * annualizer * 100,
+        'max_drawdown': max_drawdown * 100,
+    }
+
+    if values.ndim == 1:
+        return {name: float(value) for name, value in stats.items()}
+    return stats
+
+def position_arrays(positions, prices, position_size=1.0):
+    """
+    Turn (entry_index, exit_index) pairs into per-trade arrays.
+
+    Returns:
+        tuple: (entry prices, exit prices with NaN for an open position, shares)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    entries = np.fromiter((entry for entry, _ in positions), dtype=np.int64, count=len(positions))
+    exits = np.fromiter((-1 if exit_bar is None else exit_bar for _, exit_bar in positions),
+                        dtype=np.int64, count=len(positions))
+
+    entry_prices = prices[entries]
+    exit_prices = np.where(exits >= 0, prices[exits], np.nan)
+    return entry_prices, exit_prices, position_size / entry_prices
+
+def trade_arrays(trades):
+    """
+    Pair the entry/exit records of a trade log into per-trade arrays.
+
+    Returns:
+        tuple: (entry prices, exit prices with NaN for an open position, shares)
+    """
+    entry_prices = []
+    exit_prices = []
+    shares = []
+
+    for trade in trades:
+        if trade['type'] == 'entry':
+            entry_prices.append(trade['price'])
+            exit_prices.append(np.nan)
+            shares.append(trade['shares'])
+        elif entry_prices:
+            exit_prices[-1] = trade['price']
+
+    return (np.asarray(entry_prices, dtype=np.float64), np.asarray(exit_prices, dtype=np.float64),
+            np.asarray(shares, dtype=np.float64))
+
+def trade_metrics(entry_prices, exit_prices, shares):
+    """
+    Calculate trade-level statistics.
+
+    Args:
+        entry_prices (np.ndarray): Entry price of every trade
+        exit_prices (np.ndarray): Exit price, NaN for a position still open
+        shares (np.ndarray): Shares bought per trade
+
+    Returns:
+        dict: Trade count, win rate (over all entries), profit factor (None
+            when there are winning but no losing trades), average, best and
+            worst closed trade return in percent, and total P&L as a
+            percentage of starting capital
+    """
+    entry_prices = np.asarray(entry_prices, dtype=np.float64)
+    exit_prices = np.asarray(exit_prices, dtype=np.float64)
+    closed = ~np.isnan(exit_prices)
+
+    pnl = (shares * (exit_prices - entry_prices))[closed]
+    trade_returns = (exit_prices[closed] / entry_prices[closed] - 1) * 100
+
+    gross_profit = pnl[pnl > 0].sum()
+    gross_loss = -pnl[pnl < 0].sum()
+    if gross_loss > 0:
+        profit_factor = float(gross_profit / gross_loss)
+    else:
+        profit_factor = None if gross_profit > 0 else 0.0
+
+    num_trades = len(entry_prices)
+    has_closed = len(trade_returns) > 0
+
+    return {
+        'num_trades': num_trades,
+        'win_rate': float((pnl > 0).sum() / num_trades * 100) if num_trades else 0.0,
+        'profit_factor': profit_factor,
+        'avg_trade_return': float(trade_returns.mean()) if has_closed else 0.0,
+        'best_trade': float(trade_returns.max()) if has_closed else 0.0,
+        'worst_trade': float(trade_returns.min()) if has_closed else 0.0,
+        'total_pnl': float(pnl.sum() * 100),
+    }
+
+def exposure(positions, length):
+    """Return the percentage of bars on which a position is held."""
+    if length == 0:
+        return 0.0
+    held = sum((length if exit_bar is None else exit_bar) - entry for entry, exit_bar in positions)
+    return held / length * 100
+
+def empty_metrics():
+    """Return the metrics reported for a history too short to measure."""
+    names = (
+        'total_return', 'cagr', 'sharpe_ratio', 'sortino_ratio', 'calmar_ratio', 'volatility',
+        'max_drawdown', 'num_trades', 'win_rate', 'profit_factor', 'avg_trade_return',
+        'best_trade', 'worst_trade', 'total_pnl', 'exposure'
+    )
+    return {name: 0 for name in names}
+
+def round_metrics(metrics):
+    """Round float metrics to two decimals for the response."""
+    return {
+        name: round(float(value), 2) if isinstance(value, (float, np.floating)) else value
+        for name, value in metrics.items()
+    }
@@ -0,0 +1,638 @@
+import os
+import math
+import time
+import random
+import logging
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+
+from backend.backtester import backtest_data, run_backtest_batch
+from backend.indicator_graph import INDICATOR_PARAMS, SERIES, STRATEGY_INDICATORS
+from backend.simulation import warmup_bars
+from backend.worker_pool import WORKER_PROCESSES, worker_pool
+from backend.instrumentation import LOG_LEVEL
+
+# Configure logging
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Optimization goal -> (metric key, whether larger values are better)
+OPTIMIZATION_GOALS = {
+    'sharpe': ('sharpe_ratio', True),
+    'return': ('total_return', True),
+    'drawdown': ('max_drawdown', False),
+}
+
+# Parameters every strategy type reads
+COMMON_PARAMS = (
+    'ma_fast', 'ma_slow', 'stop_loss_pct', 'take_profit_pct',
+    'max_hold_days', 'trailing_stop_pct', 'position_size'
+)
+
+# Threshold parameters read by each strategy type's rules
+STRATEGY_LEVEL_PARAMS = {
+    'rsi_oversold': ('rsi_oversold', 'rsi_overbought'),
+}
+
+# Parameter pairs whose first value must stay below the second; inverted
+# crossovers trade the opposite signal and are never searched
+ORDERED_PARAMS = (('ma_fast', 'ma_slow'), ('macd_fast', 'macd_slow'))
+
+# Search space used when the request does not supply the strategy's schema
+DEFAULT_PARAMETER_SPACE = {
+    'ma_fast': {'default': 10, 'min': 2, 'max': 50, 'step': 1},
+    'ma_slow': {'default': 50, 'min': 10, 'max': 200, 'step': 1},
+    'rsi_period': {'default': 14, 'min': 2, 'max': 30, 'step': 1},
+    'rsi_oversold': {'default': 30, 'min': 10, 'max': 40, 'step': 1},
+    'rsi_overbought': {'default': 70, 'min': 60, 'max': 90, 'step': 1},
+    'stop_loss_pct': {'default': 5, 'min': 1, 'max': 20, 'step': 0.5},
+    'take_profit_pct': {'default': 10, 'min': 2, 'max': 50, 'step': 0.5},
+}
+
+# Default evaluation and wall clock budgets
+DEFAULT_MAX_EVALS = int(os.environ.get("OPTIMIZER_MAX_EVALS", 2000))
+DEFAULT_TIME_BUDGET = float(os.environ.get("OPTIMIZER_TIME_BUDGET", 20))
+
+# Largest budgets a request may ask for; larger requests are clamped
+MAX_EVALS_LIMIT = int(os.environ.get("OPTIMIZER_MAX_EVALS_LIMIT", 20000))
+MAX_TIME_BUDGET = float(os.environ.get("OPTIMIZER_MAX_TIME_BUDGET", 120))
+
+# Most values a single parameter's min/max/step may expand to
+MAX_PARAMETER_VALUES = int(os.environ.get("OPTIMIZER_MAX_PARAMETER_VALUES", 1000))
+
+# Parameter sets sent to a worker process at a time, and evaluated between
+# checks of the deadline
+CHUNK_SIZE = 64
+DEADLINE_CHECK = 8
+
+# Successive halving: fraction of the history each rung is evaluated on and
+# the share of candidates (1 / eta) promoted to the next rung
+HALVING_RUNGS = (0.25, 0.5, 1.0)
+HALVING_ETA = 3
+
+# Truncated rungs shorter than this are skipped as too few trades fire on them
+MIN_RUNG_BARS = 250
+
+# Adaptive search: candidates started per round, rounds without improvement
+# before stopping, and the relative gain that counts as an improvement
+ADAPTIVE_BATCH = 27
+ADAPTIVE_PATIENCE = 3
+ADAPTIVE_MIN_IMPROVEMENT = 1e-3
+
+# Surrogate: unevaluated points scored per proposal, per candidate, and the
+# weight given to prediction uncertainty
+SURROGATE_POOL = 20
+SURROGATE_EXPLORATION = 1.5
+
+def relevant_parameters(strategy_params):
+    """Return the parameter names that can change the strategy's backtest."""
+    strategy_type = strategy_params.get('strategy_type', 'ma_crossover')
+
+    names = set(COMMON_PARAMS)
+    names.update(STRATEGY_LEVEL_PARAMS.get(strategy_type, ()))
+    for series in STRATEGY_INDICATORS.get(strategy_type, ()):
+        names.update(SERIES[series][1])
+
+    return names
+
+def parameter_values(spec):
+    """
+    Expand a parameter schema entry into the list of values to search.
+
+    Args:
+        spec (dict): Parameter schema with min, max and step
+
+    Returns:
+        list: Values from min to max in steps of step
+
+    Raises:
+        Exception: For a non-positive step, or more than MAX_PARAMETER_VALUES values
+    """
+    low, high = spec['min'], spec['max']
+    step = spec.get('step') or 1
+    if step <= 0:
+        raise Exception(f"Parameter step must be positive, got {step}")
+    integral = all(float(v).is_integer() for v in (low, high, step))
+
+    count = int(math.floor((high - low) / step + 1e-9)) + 1
+    if count > MAX_PARAMETER_VALUES:
+        raise Exception(f"Parameter range {low} to {high} in steps of {step} has {count} values "
+                        f"(max {MAX_PARAMETER_VALUES})")
+    values = [low + i * step for i in range(max(count, 1))]
+
+    if integral:
+        return [int(round(v)) for v in values]
+    return [round(v, 10) for v in values]
+
+def build_search_space(parameter_space, strategy_params):
+    """
+    Turn a parameter schema into {name: values}, keeping parameters that matter.
+
+    Returns:
+        tuple: (search space dict, list of ignored parameter names)
+
+    Raises:
+        Exception: When a parameter expands to too many values
+    """
+    relevant = relevant_parameters(strategy_params)
+    space = {}
+    ignored = []
+
+    for name, spec in (parameter_space or {}).items():
+        if not isinstance(spec, dict) or 'min' not in spec or 'max' not in spec:
+            continue
+        if name not in relevant:
+            ignored.append(name)
+            continue
+        try:
+            space[name] = parameter_values(spec)
+        except Exception as e:
+            raise Exception(f"{name}: {e}")
+
+    return space, ignored
+
+def grid_size(space):
+    """Return the number of combinations in a search space."""
+    return math.prod(len(values) for values in space.values())
+
+def _fixed_value(name, strategy_params):
+    return strategy_params.get(name, INDICATOR_PARAMS[name][0])
+
+def is_ordered(point, strategy_params):
+    """
+    Check that a grid point keeps every ORDERED_PARAMS pair in order.
+
+    Parameters the point does not set take their value from strategy_params.
+    Pairs the search space does not touch are not checked.
+    """
+    for fast, slow in ORDERED_PARAMS:
+        if fast in point or slow in point:
+            fast_value = point.get(fast, _fixed_value(fast, strategy_params))
+            slow_value = point.get(slow, _fixed_value(slow, strategy_params))
+            if fast_value >= slow_value:
+                return False
+    return True
+
+def ordered_grid_size(space, strategy_params):
+    """Return the number of combinations in a search space that pass is_ordered."""
+    size = grid_size(space)
+    for fast, slow in ORDERED_PARAMS:
+        if fast not in space and slow not in space:
+            continue
+
+        fast_values = space.get(fast, [_fixed_value(fast, strategy_params)])
+        slow_values = sorted(space.get(slow, [_fixed_value(slow, strategy_params)]))
+        pairs = sum(len(slow_values) - bisect_right(slow_values, value) for value in fast_values)
+
+        size = size // (len(fast_values) * len(slow_values)) * pairs
+    return size
+
+def grid_point(space, index):
+    """Decode the index-th combination of the search space grid."""
+    point = {}
+    for name, values in space.items():
+        index, digit = divmod(index, len(values))
+        point[name] = values[digit]
+    return point
+
+def candidate_parameters(space, method, max_evals, rng, strategy_params=None):
+    """
+    Choose the grid points to evaluate.
+
+    The full grid is used when it fits the evaluation budget and the method
+    is grid search; otherwise distinct grid points are sampled at random.
+    Points with an inverted ORDERED_PARAMS pair are left out either way.
+
+    Returns:
+        tuple: (list of grid points, method used: 'grid' or 'random')
+    """
+    strategy_params = strategy_params or {}
+    size = grid_size(space)
+    valid = ordered_grid_size(space, strategy_params)
+
+    def accept(index):
+        return is_ordered(grid_point(space, index), strategy_params)
+
+    if method == 'grid' and valid <= max_evals:
+        indices = [index for index in range(size) if accept(index)]
+        used = 'grid'
+    else:
+        indices = sample_unseen(size, set(), max_evals, rng, accept, valid)
+        used = 'random'
+
+    return [grid_point(space, index) for index in indices], used
+
+def grid_coordinates(space, params):
+    """Return params' position in the search space grid, scaled to [0, 1] per parameter."""
+    coordinates = []
+    for name, values in space.items():
+        digit = values.index(params[name])
+        coordinates.append(digit / (len(values) - 1) if len(values) > 1 else 0.0)
+    return coordinates
+
+def sample_unseen(size, seen, count, rng, accept=None, available=None):
+    """
+    Sample up to count distinct grid indices below size that are not in seen.
+
+    Args:
+        accept (callable): Rejects indices for which it returns False
+        available (int): Number of indices accept passes (size without accept);
+            seen must only hold accepted indices
+    """
+    remaining = (size if available is None else available) - len(seen)
+    count = min(count, remaining)
+
+    # Enumerate once the unseen points are scarce; seen is bounded by the
+    # evaluation budget, so the grid is small whenever this happens
+    if remaining <= count * 4:
+        unseen = [index for index in range(size) if index not in seen and (accept is None or accept(index))]
+        return rng.sample(unseen, count)
+
+    chosen = []
+    picked = set()
+    while len(chosen) < count:
+        index = rng.randrange(size)
+        if index not in seen and index not in picked:
+            picked.add(index)
+            if accept is None or accept(index):
+                chosen.append(index)
+    return chosen
+
+def truncate_history(stock_data, fraction):
+    """Return stock data restricted to the most recent fraction of its bars."""
+    keep = max(1, math.ceil(len(stock_data['prices']) * fraction))
+    return {
+        'ticker': stock_data.get('ticker'),
+        'interval': stock_data.get('interval'),
+        'dates': stock_data['dates'][-keep:],
+        'prices': stock_data['prices'][-keep:]
+    }
+
+class Surrogate:
+    """
+    Gaussian process regression over normalized grid coordinates.
+
+    Predicts the score of grid points that have not been backtested together
+    with the uncertainty of the prediction, so the adaptive search can favour
+    points that either look good or sit in unexplored parts of the space.
+    """
+
+    def __init__(self, length_scale=0.2, noise=1e-2):
+        self.length_scale = length_scale
+        self.noise = noise
+
+    def _kernel(self, a, b):
+        distances = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=-1)
+        return np.exp(-distances / (2 * self.length_scale ** 2))
+
+    def fit(self, points, scores):
+        """Fit the model to evaluated points and their scores."""
+        self.points = np.asarray(points, dtype=np.float64)
+        scores = np.asarray(scores, dtype=np.float64)
+
+        self.offset = scores.mean()
+        self.scale = scores.std() or 1.0
+
+        kernel = self._kernel(self.points, self.points) + self.noise * np.eye(len(self.points))
+        self.factor = np.linalg.cholesky(kernel)
+        targets = (scores - self.offset) / self.scale
+        self.weights = np.linalg.solve(self.factor.T, np.linalg.solve(self.factor, targets))
+        return self
+
+    def predict(self, points):
+        """Return the predicted score and its standard deviation for each point."""
+        cross = self._kernel(np.asarray(points, dtype=np.float64), self.points)
+        mean = cross @ self.weights
+
+        projected = np.linalg.solve(self.factor, cross.T)
+        variance = np.clip(1 - (projected ** 2).sum(axis=0), 0, None)
+
+        return mean * self.scale + self.offset, np.sqrt(variance) * self.scale
+
+def score_metrics(metrics, goal):
+    """Return a score where larger is better, or None if the metric is undefined."""
+    key, maximize = OPTIMIZATION_GOALS[goal]
+    value = metrics.get(key)
+
+    if value is None or value != value:
+        return None
+    return value if maximize else -value
+
+def _rank_key(item, goal):
+    score = score_metrics(item[1], goal)
+    return (score is not None, score if score is not None else 0, item[1].get('total_return', 0))
+
+def evaluate_parameter_sets(stock_data, param_sets, graph=None, stop_at=None):
+    """
+    Backtest parameter sets on stock data and return their metrics.
+
+    Args:
+        stop_at (float): Epoch time after which no further sets are started;
+            the metrics of the sets evaluated so far are returned, in order
+    """
+    if stop_at is None:
+        batch = run_backtest_batch(stock_data, param_sets, graph=graph)
+        return [result['metrics'] for result in batch['results']]
+
+    metrics = []
+    for i in range(0, len(param_sets), DEADLINE_CHECK):
+        if time.time() > stop_at:
+            break
+        batch = run_backtest_batch(stock_data, param_sets[i:i + DEADLINE_CHECK], graph=graph)
+        metrics.extend(result['metrics'] for result in batch['results'])
+    return metrics
+
+def _evaluate(stock_data, param_sets, workers, deadline, graph=None):
+    """
+    Evaluate parameter sets in chunks, spreading them over worker processes.
+
+    At most workers chunks are in flight on the shared worker pool. Once
+    the deadline passes no more chunks are submitted, queued ones are
+    cancelled and running ones stop after their current few sets; their
+    unfinished sets are dropped from the results. A precomputed indicator
+    graph lives in this process, so sets evaluated against one are run here.
+
+    Returns:
+        list: (params, metrics) pairs for every evaluated set
+    """
+    size = min(CHUNK_SIZE, max(1, math.ceil(len(param_sets) / workers)))
+    chunks = [param_sets[i:i + size] for i in range(0, len(param_sets), size)]
+    evaluated = []
+
+    if workers <= 1 or len(chunks) <= 1 or graph is not None:
+        for chunk in chunks:
+            if time.monotonic() > deadline:
+                break
+            evaluated.extend(zip(chunk, evaluate_parameter_sets(stock_data, chunk, graph)))
+        return evaluated
+
+    stock_data = backtest_data(stock_data)
+
+    pool = worker_pool()
+    pending = {}
+    queue = iter(chunks)
+
+    # Worker processes cannot read this process's monotonic clock
+    stop_at = time.time() + (deadline - time.monotonic())
+
+    def submit():
+        chunk = next(queue, None)
+        if chunk is not None:
+            pending[pool.submit(evaluate_parameter_sets, stock_data, chunk, None, stop_at)] = chunk
+
+    for _ in range(min(workers, WORKER_PROCESSES)):
+        submit()
+
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            chunk = pending.pop(future)
+            evaluated.extend(zip(chunk, future.result()))
+            submit()
+
+    for future in pending:
+        future.cancel()
+
+    return evaluated
+
+def halving_rungs(stock_data, space, strategy_params):
+    """
+    Choose the history fractions used by successive halving.
+
+    A truncated rung is kept only if it leaves MIN_RUNG_BARS bars and at
+    least twice the longest warm-up in the search space.
+    """
+    longest = {
+        name: max(space.get(name, [strategy_params.get(name, default)]))
+        for name, default in (('ma_fast', 10), ('ma_slow', 50))
+    }
+    minimum = max(MIN_RUNG_BARS, 2 * warmup_bars(longest))
+    count = len(stock_data['prices'])
+
+    return [fraction for fraction in HALVING_RUNGS if fraction >= 1 or count * fraction >= minimum]
+
+def successive_halving(stock_data, param_sets, rungs, goal, workers, deadline, graph=None):
+    """
+    Evaluate candidates on growing slices of history, keeping the best 1 / eta each time.
+
+    Returns:
+        tuple: (full history (params, metrics) pairs, backtests run per rung)
+    """
+    counts = []
+    evaluated = []
+
+    for fraction in rungs:
+        data, window = stock_data, graph
+        if fraction < 1:
+            data = truncate_history(stock_data, fraction)
+            if graph is not None:
+                count = len(stock_data['prices'])
+                window = graph.window(count - len(data['prices']), count)
+
+        evaluated = _evaluate(data, param_sets, workers, deadline, window)
+        counts.append(len(evaluated))
+
+        if fraction >= 1 or not evaluated:
+            break
+
+        ranked = sorted(evaluated, key=lambda item: _rank_key(item, goal), reverse=True)
+        param_sets = [params for params, _ in ranked[:max(1, math.ceil(len(ranked) / HALVING_ETA))]]
+
+    return (evaluated if rungs and rungs[-1] >= 1 else []), counts
+
+def adaptive_search(stock_data, strategy_params, space, goal, max_evals, workers, deadline, rng, graph=None):
+    """
+    Search a large parameter space with successive halving and a surrogate model.
+
+    Each round starts a batch of candidates, prunes them by successive halving
+    on truncated histories, and adds the survivors' full history scores to a
+    Gaussian process surrogate that picks the next batch. The first round is
+    sampled at random. The search stops when the evaluation budget (counted in
+    full history backtests) or the deadline runs out, the grid is exhausted,
+    or the best score has not improved for ADAPTIVE_PATIENCE rounds.
+
+    Returns:
+        tuple: (full history (params, metrics) pairs, search statistics dict)
+    """
+    size = grid_size(space)
+    valid = ordered_grid_size(space, strategy_params)
+    rungs = halving_rungs(stock_data, space, strategy_params)
+
+    def accept(index):
+        return is_ordered(grid_point(space, index), strategy_params)
+
+    evaluated = []
+    seen = set()
+    points = []
+    scores = []
+    rung_counts = [0] * len(rungs)
+    cost = 0.0
+    best = None
+    stale = 0
+    rounds = 0
+    stopped_early = False
+
+    while cost < max_evals and len(seen) < valid and time.monotonic() < deadline:
+        batch = ADAPTIVE_BATCH * (HALVING_ETA if rounds == 0 else 1)
+        batch = max(1, min(batch, int((max_evals - cost) / sum(rungs))))
+
+        if len(points) < 2:
+            indices = sample_unseen(size, seen, batch, rng, accept, valid)
+        else:
+            pool = sample_unseen(size, seen, batch * SURROGATE_POOL, rng, accept, valid)
+            pool_params = [grid_point(space, index) for index in pool]
+            mean, std = Surrogate().fit(points, scores).predict(
+                [grid_coordinates(space, params) for params in pool_params]
+            )
+            order = np.argsort(-(mean + SURROGATE_EXPLORATION * std))
+            indices = [pool[i] for i in order[:batch]]
+
+        seen.update(indices)
+        param_sets = []
+        for index in indices:
+            params = dict(strategy_params)
+            params.update(grid_point(space, index))
+            param_sets.append(params)
+
+        found, counts = successive_halving(stock_data, param_sets, rungs, goal, workers, deadline, graph)
+        for rung, count in enumerate(counts):
+            rung_counts[rung] += count
+            cost += count * rungs[rung]
+        rounds += 1
+
+        for params, metrics in found:
+            evaluated.append((params, metrics))
+            points.append(grid_coordinates(space, params))
+            scores.append(score_metrics(metrics, goal))
+
+        # Undefined scores count as the worst seen so the surrogate avoids them
+        defined = [score for score in scores if score is not None]
+        floor = min(defined) if defined else 0.0
+        scores = [score if score is not None else floor for score in scores]
+
+        round_best = max(defined) if defined else None
+        if round_best is not None and (best is None or round_best - best > ADAPTIVE_MIN_IMPROVEMENT * max(1.0, abs(best))):
+            best = round_best
+            stale = 0
+        else:
+            stale += 1
+            if stale >= ADAPTIVE_PATIENCE:
+                stopped_early = True
+                break
+
+    return evaluated, {
+        'rounds': rounds,
+        'rung_fractions': rungs,
+        'rung_evaluations': rung_counts,
+        'equivalent_evaluations': round(cost, 2),
+        'stopped_early': stopped_early
+    }
+
+def optimize_parameters(stock_data, strategy_params, parameter_space=None, optimization_goal='sharpe',
+                        method='grid', max_evals=None, time_budget=None, workers=None, top_n=10, seed=None,
+                        graph=None):
+    """
+    Search strategy parameters by running backtests.
+
+    Args:
+        stock_data (dict): Historical stock data
+        strategy_params (dict): Current strategy parameters; searched
+            parameters override these
+        parameter_space (dict): Parameter schema as produced by
+            generate_strategies ({name: {default, min, max, step}})
+        optimization_goal (str): Metric to optimize for (sharpe, return, drawdown)
+        method (str): 'grid', 'random' or 'adaptive' (successive halving
+            guided by a surrogate model, for large spaces)
+        max_evals (int): Maximum number of parameter sets to backtest, at
+            most MAX_EVALS_LIMIT; for adaptive search, backtests on truncated
+            histories count in proportion to their length
+        time_budget (float): Wall clock budget in seconds, at most MAX_TIME_BUDGET
+        workers (int): Worker processes to use at most (defaults to WORKER_PROCESSES)
+        top_n (int): Size of the returned leaderboard
+        seed (int): Random seed for sampling
+        graph (IndicatorGraph): Indicators already built for the stock data's
+            prices; backtests then run in this process
+
+    Returns:
+        dict: Best parameters, their metrics and the leaderboard; 'method'
+            is the method actually used, 'random' when a grid larger than
+            max_evals was sampled (flagged by 'grid_truncated')
+    """
+    if optimization_goal not in OPTIMIZATION_GOALS:
+        raise Exception(f"Unknown optimization goal: {optimization_goal}")
+    if method not in ('grid', 'random', 'adaptive'):
+        raise Exception(f"Unknown optimization method: {method}")
+
+    max_evals = max(1, min(int(max_evals or DEFAULT_MAX_EVALS), MAX_EVALS_LIMIT))
+    time_budget = min(float(time_budget or DEFAULT_TIME_BUDGET), MAX_TIME_BUDGET)
+    workers = int(workers or WORKER_PROCESSES)
+
+    started = time.monotonic()
+    deadline = started + time_budget
+
+    space, ignored = build_search_space(parameter_space or DEFAULT_PARAMETER_SPACE, strategy_params)
+    valid = ordered_grid_size(space, strategy_params)
+    if not valid:
+        pairs = ", ".join(f"{fast} < {slow}" for fast, slow in ORDERED_PARAMS if fast in space or slow in space)
+        raise Exception(f"Parameter space has no combinations with {pairs}")
+    logger.debug("Optimizing %s for %s (%s grid points)", sorted(space), optimization_goal, valid)
+
+    rng = random.Random(seed)
+    search = {}
+
+    # The current parameters are always evaluated so the gain is visible
+    baseline = dict(strategy_params)
+    used = method
+
+    if method == 'adaptive':
+        evaluated = _evaluate(stock_data, [baseline], workers, deadline, graph)
+        found, search = adaptive_search(
+            stock_data, strategy_params, space, optimization_goal, max_evals, workers, deadline, rng, graph
+        )
+        evaluated.extend(found)
+        backtests = len(evaluated) - len(found) + sum(search['rung_evaluations'])
+        equivalent = len(evaluated) - len(found) + search['equivalent_evaluations']
+    else:
+        param_sets = [baseline]
+        points, used = candidate_parameters(space, method, max_evals, rng, strategy_params)
+        for point in points:
+            params = dict(strategy_params)
+            params.update(point)
+            param_sets.append(params)
+
+        evaluated = _evaluate(stock_data, param_sets, workers, deadline, graph)
+        backtests = equivalent = len(evaluated)
+
+    if not evaluated:
+        raise Exception("Optimization time budget exhausted before any backtest finished")
+
+    ranked = sorted(evaluated, key=lambda item: _rank_key(item, optimization_goal), reverse=True)
+    best_params, best_metrics = ranked[0]
+    baseline_metrics = next((metrics for params, metrics in evaluated if params is baseline), None)
+
+    return {
+        'goal': optimization_goal,
+        'method': used,
+        'grid_truncated': method == 'grid' and used != 'grid',
+        'best_params': best_params,
+        'best_metrics': best_metrics,
+        'baseline_metrics': baseline_metrics,
+        'leaderboard': [
+            {'params': params, 'metrics': metrics, 'score': score_metrics(metrics, optimization_goal)}
+            for params, metrics in ranked[:top_n]
+        ],
+        'evaluations': backtests,
+        'equivalent_evaluations': round(equivalent, 2),
+        'evaluations_saved': max(0, round(valid - equivalent)),
+        'search_space_size': valid,
+        'searched_parameters': sorted(space),
+        'ignored_parameters': ignored,
+        'search': search,
+        'elapsed': round(time.monotonic() - started, 3)
+    }
@@ -0,0 +1,188 @@
+import os
+import base64
+
+import numpy as np
+
+from backend.bars import DateColumn
+
+# Defaults for compact responses: points kept per curve and decimals kept
+DEFAULT_MAX_POINTS = int(os.environ.get("RESPONSE_MAX_POINTS", 1000))
+DEFAULT_PRECISION = int(os.environ.get("RESPONSE_PRECISION", 4))
+
+# Equity curves that are downsampled, sharing one set of bar indices
+CURVE_KEYS = ('portfolio_values', 'buy_hold_values', 'out_of_sample_values')
+
+# Numeric trade fields and the decimals they keep
+TRADE_PRECISION = {'price': 4, 'shares': 6, 'value': 6}
+
+ENCODINGS = ('json', 'columnar')
+DTYPES = {'float64': np.float64, 'float32': np.float32}
+
+def lttb_indices(values, threshold):
+    """
+    Choose the points of a curve to keep with largest-triangle-three-buckets.
+
+    The first and last points are always kept. The rest of the curve is cut
+    into threshold - 2 buckets and from each one the point forming the
+    largest triangle with the previously kept point and the average of the
+    next bucket is kept, which preserves peaks, troughs and the overall shape.
+
+    Args:
+        values (np.ndarray): Curve values, one per bar
+        threshold (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points
+    """
+    values = np.asarray(values, dtype=np.float64)
+    length = len(values)
+
+    if threshold >= length or threshold < 3:
+        return np.arange(length) if threshold >= length else np.array([0, length - 1])[:max(threshold, 0)]
+
+    # Bucket boundaries for the points between the first and the last
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    positions = np.arange(length, dtype=np.float64)
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_stop = stop, edges[bucket + 2] if bucket + 2 < len(edges) else length
+        next_x = positions[next_start:next_stop].mean()
+        next_y = values[next_start:next_stop].mean()
+
+        xs = positions[start:stop]
+        ys = values[start:stop]
+        areas = np.abs(
+            (previous - next_x) * (ys - values[previous]) - (previous - xs) * (next_y - values[previous])
+        )
+
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return selected
+
+def curve_indices(curves, max_points):
+    """
+    Choose bar indices shared by several curves of the same length.
+
+    Each curve gets an equal share of max_points through LTTB and the union
+    is used, so every curve is sampled on the same bars and stays aligned
+    with the dates.
+    """
+    length = len(curves[0])
+    if max_points is None or length <= max_points:
+        return np.arange(length)
+
+    share = max(3, max_points // len(curves))
+    return np.unique(np.concatenate([lttb_indices(curve, share) for curve in curves]))
+
+def encode_column(values, dtype):
+    """Pack a numeric column as base64 of its little-endian bytes."""
+    array = np.ascontiguousarray(values, dtype=np.dtype(DTYPES[dtype]).newbyteorder('<'))
+    return base64.b64encode(array.tobytes()).decode('ascii')
+
+def _round_trades(trades):
+    rounded = []
+    for trade in trades:
+        trade = dict(trade)
+        for field, places in TRADE_PRECISION.items():
+            if isinstance(trade.get(field), float):
+                trade[field] = round(trade[field], places)
+        rounded.append(trade)
+    return rounded
+
+def _trade_columns(trades, dtype):
+    columns = {
+        'type': [trade['type'] for trade in trades],
+        'date': [trade['date'] for trade in trades],
+    }
+    for field in TRADE_PRECISION:
+        columns[field] = encode_column([trade[field] for trade in trades], dtype)
+    return columns
+
+def compact_results(results, max_points=None, precision=None, dtype='float64', encoding='json',
+                    full_resolution=False, dates=None, dates_key='dates'):
+    """
+    Shrink a backtest style response for transport.
+
+    Equity curves are downsampled with LTTB onto shared bar indices and
+    rounded, and trade fields are rounded. With the columnar encoding the
+    curves and the numeric trade fields are sent as base64 packed float
+    arrays instead of JSON numbers, and trades become a dict of columns.
+
+    Args:
+        results (dict): Response with any of the CURVE_KEYS curves and trades
+        max_points (int): Points kept per response curve
+        precision (int): Decimals kept for curve values in JSON
+        dtype (str): 'float64' or 'float32' for columnar curve values
+        encoding (str): 'json' or 'columnar'
+        full_resolution (bool): Keep every bar (rounding and encoding still apply)
+        dates (list): Bar dates of the curves, sampled alongside them
+        dates_key (str): Response key the sampled dates are stored under
+
+    Returns:
+        dict: The response with compacted curves; a 'curves' entry describes
+            the sampling ('points', 'total_points', 'encoding', 'dtype')
+    """
+    if encoding not in ENCODINGS:
+        raise Exception(f"Unknown response encoding: {encoding}")
+    if dtype not in DTYPES:
+        raise Exception(f"Unknown response dtype: {dtype}")
+
+    max_points = None if full_resolution else int(max_points or DEFAULT_MAX_POINTS)
+    precision = DEFAULT_PRECISION if precision is None else int(precision)
+
+    compact = dict(results)
+    keys = [key for key in CURVE_KEYS if isinstance(results.get(key), (list, np.ndarray)) and len(results[key])]
+
+    if keys:
+        curves = {key: np.asarray(results[key], dtype=np.float64) for key in keys}
+        total = len(curves[keys[0]])
+        same_length = [key for key in keys if len(curves[key]) == total]
+        indices = curve_indices([curves[key] for key in same_length], max_points)
+
+        for key in keys:
+            sampled = curves[key][indices] if key in same_length else curves[key]
+            if encoding == 'columnar':
+                compact[key] = encode_column(sampled, dtype)
+            else:
+                compact[key] = np.round(sampled, precision).tolist()
+
+        if dates is not None and len(dates) == total:
+            # Columnar dates are formatted in one pass
+            if isinstance(dates, DateColumn):
+                compact[dates_key] = dates.take(indices)
+            else:
+                compact[dates_key] = [dates[i] for i in indices]
+
+        compact['curves'] = {
+            'encoding': encoding,
+            'dtype': dtype if encoding == 'columnar' else None,
+            'points': len(indices),
+            'total_points': total
+        }
+
+    for key in ('trades', 'out_of_sample_trades'):
+        if isinstance(results.get(key), list):
+            if encoding == 'columnar':
+                compact[key] = _trade_columns(results[key], dtype)
+            else:
+                compact[key] = _round_trades(results[key])
+
+    return compact
+
+def payload_options(data):
+    """Read the compact response options from a request's JSON body."""
+    return {
+        'max_points': data.get('max_points'),
+        'precision': data.get('precision'),
+        'dtype': data.get('dtype', 'float64'),
+        'encoding': data.get('encoding', 'json'),
+        'full_resolution': bool(data.get('full_resolution', False)),
+    }
@@ -0,0 +1,426 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from backend.backtester import calculate_indicators
+from backend.data_fetcher import get_stock_data_many, twelvedata, TWELVEDATA_BATCH_SIZE
+from backend.http_client import CREDIT_LIMIT_REACHED, CreditMeter
+from backend.indicator_cache import data_version
+from backend.indicator_graph import strategy_indicators
+from backend.indicators import as_price_array
+from backend.instrumentation import LOG_LEVEL
+
+# Configure logging
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Run the prefetch scheduler in the app process
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "0").lower() in ('1', 'true', 'yes')
+
+# Record requested tickers for a sidecar worker (always on with PREFETCH_ENABLED)
+PREFETCH_RECORD = PREFETCH_ENABLED or os.environ.get("PREFETCH_RECORD", "0").lower() in ('1', 'true', 'yes')
+
+# Local hours in which prefetching runs, e.g. "0-9,17-24"
+PREFETCH_HOURS = os.environ.get("PREFETCH_HOURS", "4-9")
+
+# Seconds between prefetch passes
+PREFETCH_INTERVAL = int(os.environ.get("PREFETCH_INTERVAL", 900))
+
+# API credits prefetching may spend per day
+PREFETCH_CREDITS = int(os.environ.get("PREFETCH_CREDITS", 200))
+
+# Most popular tickers kept warm
+PREFETCH_MAX_TICKERS = int(os.environ.get("PREFETCH_MAX_TICKERS", 50))
+
+# Also compute the indicators of recently requested and saved strategies
+PREFETCH_INDICATORS = os.environ.get("PREFETCH_INDICATORS", "1").lower() in ('1', 'true', 'yes')
+
+# Requested tickers, saved so restarts and a sidecar worker see them
+PREFETCH_STATE_FILE = os.environ.get("PREFETCH_STATE_FILE", os.path.join("data", "requested_tickers.json"))
+
+# Lock held by the one process that prefetches, and the credits it spent today
+PREFETCH_LOCK_FILE = os.environ.get("PREFETCH_LOCK_FILE", os.path.join("data", "prefetch.lock"))
+PREFETCH_BUDGET_FILE = os.environ.get("PREFETCH_BUDGET_FILE", os.path.join("data", "prefetch_budget.json"))
+
+USER_STRATEGIES_FILE = os.path.join("data", "user_strategies.json")
+
+# History the app's routes request
+PREFETCH_YEARS = 5
+
+# Strategy params remembered per ticker, and seconds between state saves
+RECENT_PARAMS = 3
+SAVE_INTERVAL = 60
+
+def parse_hours(spec):
+    """Turn "0-9,17-24" into the set of hours (0-23) it covers."""
+    hours = set()
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        start, _, stop = item.partition('-')
+        start = int(start)
+        stop = int(stop) if stop.strip() else start + 1
+        hours.update(hour % 24 for hour in range(start, stop))
+    return hours
+
+def merge_requested(requested, pending):
+    """
+    Add request counts recorded since the last save to the saved ones.
+
+    Args:
+        requested (dict): Ticker -> {'count', 'last', 'params'}, as saved
+        pending (dict): Unsaved entries of the same form
+
+    Returns:
+        dict: A new dict with the counts summed and the most recent params kept
+    """
+    merged = {ticker: dict(entry) for ticker, entry in requested.items()}
+    for ticker, delta in pending.items():
+        entry = merged.setdefault(ticker, {'count': 0, 'params': []})
+        entry['count'] += delta['count']
+        entry['last'] = max(entry.get('last', 0), delta.get('last', 0))
+        params = [p for p in entry['params'] if p not in delta['params']] + delta['params']
+        entry['params'] = params[-RECENT_PARAMS:]
+    return merged
+
+def saved_strategy_tickers(path=USER_STRATEGIES_FILE):
+    """
+    Read the tickers of every user's saved strategies.
+
+    Returns:
+        dict: Ticker -> list of the saved strategies' parameters
+    """
+    try:
+        with open(path) as f:
+            user_strategies = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+    tickers = {}
+    for strategies in user_strategies.values():
+        for strategy in strategies:
+            ticker = (strategy.get('ticker') or '').upper()
+            if ticker:
+                tickers.setdefault(ticker, []).append(strategy.get('parameters') or {})
+    return tickers
+
+class PrefetchScheduler:
+    """
+    Keeps the bar cache warm for popular and saved tickers.
+
+    Tickers requested through the backtest and optimize routes are counted
+    as they arrive and periodically added to the counts in the state file,
+    which is re-read whenever another process has changed it, so several
+    app processes and a sidecar worker share one ranking. Together with the
+    tickers of saved strategies they are ranked, and during off-peak hours
+    the most popular are fetched in batches so the bar cache holds their
+    latest bars and the first request of the day only needs an incremental
+    refresh, or none.
+
+    Only the process holding the lock file prefetches, however many app
+    workers start a scheduler. It keeps the credits spent today in the
+    budget file, so restarts and a new lock holder continue from the same
+    total, and no request is sent past the daily budget. Optionally the indicators of each ticker's
+    recent and saved strategies are computed into the indicator cache; they
+    are reused as long as the history is unchanged when the request comes.
+    """
+
+    def __init__(self, hours=PREFETCH_HOURS, interval=PREFETCH_INTERVAL, credits=PREFETCH_CREDITS,
+                 max_tickers=PREFETCH_MAX_TICKERS, indicators=PREFETCH_INDICATORS,
+                 state_file=PREFETCH_STATE_FILE, strategies_file=USER_STRATEGIES_FILE,
+                 recording=PREFETCH_RECORD, lock_file=PREFETCH_LOCK_FILE, budget_file=PREFETCH_BUDGET_FILE):
+        self.hours = parse_hours(hours)
+        self.interval = interval
+        self.credits = credits
+        self.max_tickers = max_tickers
+        self.indicators = indicators
+        self.state_file = state_file
+        self.strategies_file = strategies_file
+        self.recording = recording
+        self.lock_file = lock_file
+        self.budget_file = budget_file
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._requested = {}
+        self._state_mtime = None
+        self._pending = {}
+        self._saved_at = 0.0
+        self._leader_file = None
+
+        self.budget_day = None
+        self.credits_spent = 0
+        self.runs = 0
+        self.prefetched = 0
+        self.failed = 0
+        self.indicator_sets = 0
+        self.last_run = None
+
+    def record(self, ticker, strategy_params=None):
+        """
+        Count a request for a ticker and remember the strategy it ran.
+
+        Does nothing unless recording is on (PREFETCH_ENABLED or
+        PREFETCH_RECORD), so the state file is only written when something
+        prefetches from it.
+        """
+        ticker = str(ticker or '').upper()
+        if not self.recording or not ticker:
+            return
+
+        with self._lock:
+            entry = self._pending.setdefault(ticker, {'count': 0, 'params': []})
+            entry['count'] += 1
+            entry['last'] = time.time()
+            if strategy_params and strategy_params not in entry['params']:
+                entry['params'] = (entry['params'] + [strategy_params])[-RECENT_PARAMS:]
+
+            if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+                self._flush()
+
+    def flush(self):
+        """Add the requests recorded since the last save to the state file."""
+        with self._lock:
+            self._flush()
+
+    def tickers(self):
+        """
+        Rank the tickers to keep warm.
+
+        Returns:
+            list: (ticker, strategy params list) pairs, most popular first
+        """
+        with self._lock:
+            requested = merge_requested(self._load_requested(), self._pending)
+
+        saved = saved_strategy_tickers(self.strategies_file)
+        scores = {}
+        params = {}
+        for ticker, entry in requested.items():
+            scores[ticker] = entry['count']
+            params[ticker] = list(entry['params'])
+        for ticker, strategies in saved.items():
+            scores[ticker] = scores.get(ticker, 0) + len(strategies)
+            params.setdefault(ticker, []).extend(p for p in strategies if p not in params[ticker])
+
+        ranked = sorted(scores, key=lambda ticker: (-scores[ticker], ticker))[:self.max_tickers]
+        return [(ticker, params[ticker]) for ticker in ranked]
+
+    def off_peak(self, now=None):
+        """True during the configured prefetch hours."""
+        return (now or datetime.now()).hour in self.hours
+
+    def leader(self):
+        """Hold the lock file, taking it if no other process does; True while held."""
+        if self._leader_file is not None:
+            return True
+        if fcntl is None:
+            logger.warning("File locks are unavailable; every process prefetches with its own budget")
+            self._leader_file = True
+            return True
+
+        directory = os.path.dirname(self.lock_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.lock_file, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+
+        # Kept open for the life of the process; the lock goes with it
+        self._leader_file = f
+        logger.info("Prefetching from process %d", os.getpid())
+        return True
+
+    def run_once(self, force=False):
+        """
+        Prefetch the ranked tickers if it is off-peak and credits remain.
+
+        Args:
+            force (bool): Run outside the prefetch hours
+
+        Returns:
+            dict: Tickers prefetched and failed, and credits spent, or None
+                when nothing ran (outside the hours, or another process
+                holds the prefetch lock)
+        """
+        if not force and not self.off_peak():
+            return None
+        if not self.leader():
+            logger.debug("Another process is prefetching")
+            return None
+
+        today = datetime.now().date().isoformat()
+        budget = self._load_budget()
+        with self._lock:
+            self.budget_day = today
+            self.credits_spent = budget['credits'] if budget.get('day') == today else 0
+
+        tickers = self.tickers()
+        prefetched = []
+        failed = {}
+        spent = 0
+        position = 0
+
+        while position < len(tickers):
+            remaining = self.credits - self.credits_spent - spent
+            if remaining <= 0:
+                logger.debug("Prefetch credit budget of %d spent", self.credits)
+                break
+
+            # Every ticker may cost a credit; cached ones cost none
+            batch = dict(tickers[position:position + max(1, min(TWELVEDATA_BATCH_SIZE, remaining))])
+            position += len(batch)
+
+            # Only this pass's requests count, not those of concurrent users,
+            # and none is sent past the budget
+            meter = CreditMeter(limit=remaining)
+            with twelvedata.metering(meter):
+                results, errors = get_stock_data_many(list(batch), years=PREFETCH_YEARS)
+            spent += meter.credits
+            self._save_budget(today, self.credits_spent + spent)
+
+            failed.update((ticker, error) for ticker, error in errors.items() if CREDIT_LIMIT_REACHED not in error)
+            for ticker, stock_data in results.items():
+                prefetched.append(ticker)
+                if self.indicators:
+                    self._compute_indicators(stock_data, batch[ticker])
+
+        with self._lock:
+            self.credits_spent += spent
+            self.runs += 1
+            self.prefetched += len(prefetched)
+            self.failed += len(failed)
+            self.last_run = datetime.now().isoformat()
+
+        if failed:
+            logger.warning("Prefetch failed for %s", ", ".join(failed))
+        logger.debug("Prefetched %d tickers for %d credits", len(prefetched), spent)
+        return {'prefetched': prefetched, 'failed': failed, 'credits': spent}
+
+    def start(self):
+        """Run prefetch passes every interval on a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='prefetch', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after its current pass."""
+        self._stop.set()
+
+    def stats(self):
+        """Return prefetch counters and the credits left today."""
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'leader': self._leader_file is not None,
+                'tracked_tickers': len(set(self._requested) | set(self._pending)),
+                'runs': self.runs,
+                'prefetched': self.prefetched,
+                'failed': self.failed,
+                'indicator_sets': self.indicator_sets,
+                'credits_spent_today': self.credits_spent,
+                'credit_budget': self.credits,
+                'last_run': self.last_run
+            }
+
+    def run_forever(self):
+        """Run a prefetch pass every interval until stop() is called."""
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("Prefetch pass failed: %s", e)
+
+    def _compute_indicators(self, stock_data, param_sets):
+        prices = as_price_array(stock_data['prices'])
+        version = data_version(stock_data, prices)
+        for params in param_sets:
+            try:
+                calculate_indicators(prices, params, version).compute(strategy_indicators(params))
+            except Exception as e:
+                logger.debug("Skipping indicators for %s: %s", params, e)
+                continue
+            with self._lock:
+                self.indicator_sets += 1
+
+    def _load_budget(self):
+        try:
+            with open(self.budget_file) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_budget(self, day, credits):
+        try:
+            temporary = self.budget_file + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump({'day': day, 'credits': credits}, f)
+            os.replace(temporary, self.budget_file)
+        except OSError as e:
+            logger.warning("Could not save the prefetch budget: %s", e)
+
+    def _load_requested(self):
+        # Called with the lock held; re-reads the file when another process saved it
+        try:
+            mtime = os.stat(self.state_file).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        if mtime != self._state_mtime:
+            try:
+                with open(self.state_file) as f:
+                    self._requested = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._requested = {}
+            self._state_mtime = mtime
+        return self._requested
+
+    def _flush(self):
+        # Called with the lock held; merges into the latest saved counts so
+        # other processes' requests are kept
+        self._saved_at = time.monotonic()
+        if not self._pending:
+            return
+
+        requested = merge_requested(self._load_requested(), self._pending)
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = f"{self.state_file}.{os.getpid()}.tmp"
+            with open(temporary, 'w') as f:
+                json.dump(requested, f)
+            os.replace(temporary, self.state_file)
+        except OSError as e:
+            logger.warning("Could not save requested tickers: %s", e)
+            return
+
+        self._requested = requested
+        self._state_mtime = os.stat(self.state_file).st_mtime_ns
+        self._pending = {}
+
+# Shared by every request handled by this process
+prefetch_scheduler = PrefetchScheduler()
+
+if __name__ == '__main__':
+    # Sidecar worker: warms the shared on-disk bar cache from its own process
+    logger.info("Prefetching in hours %s every %ss", PREFETCH_HOURS, PREFETCH_INTERVAL)
+    try:
+        prefetch_scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
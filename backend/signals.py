@@ -0,0 +1,153 @@
+import numpy as np
+
+from backend.indicator_graph import strategy_indicators
+
+# Threshold parameters read by the entry/exit rules, with their defaults
+SIGNAL_LEVELS = {
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+}
+
+# Signals work on a single series (bars,) or a batch of series (sets, bars);
+# bars are always the last axis and per-set levels have shape (sets, 1).
+
+def _lagged(values):
+    """Split a series (or per-set level) into its previous-bar and current-bar views."""
+    if np.ndim(values) == 0 or np.shape(values)[-1] == 1:
+        return values, values
+    return values[..., :-1], values[..., 1:]
+
+def _empty_mask(*arrays):
+    """Return an all-False mask broadcast to the shape of the given arrays."""
+    return np.zeros(np.broadcast_shapes(*(np.shape(a) for a in arrays)), dtype=bool)
+
+def crosses_above(series, level):
+    """
+    Flag bars where series moves from at or below level to strictly above it.
+
+    Args:
+        series (np.ndarray): Series that crosses
+        level (np.ndarray or float): Series, per-set level or constant being crossed
+
+    Returns:
+        np.ndarray: Boolean mask, False on the first bar and wherever NaN is involved
+    """
+    previous, current = _lagged(series)
+    level_previous, level_current = _lagged(level)
+
+    mask = _empty_mask(series, level)
+    if mask.shape[-1] < 2:
+        return mask
+
+    mask[..., 1:] = (previous <= level_previous) & (current > level_current)
+    return mask
+
+def crosses_below(series, level):
+    """Flag bars where series moves from at or above level to strictly below it."""
+    previous, current = _lagged(series)
+    level_previous, level_current = _lagged(level)
+
+    mask = _empty_mask(series, level)
+    if mask.shape[-1] < 2:
+        return mask
+
+    mask[..., 1:] = (previous >= level_previous) & (current < level_current)
+    return mask
+
+def entry_signals(prices, indicators, params):
+    """
+    Evaluate the entry rule of the strategy type on every bar at once.
+
+    Args:
+        prices (np.ndarray): Historical prices
+        indicators (Mapping): Indicator series for the strategy
+        params (dict): Strategy parameters
+
+    Returns:
+        np.ndarray: Boolean mask of bars where the entry rule fires
+    """
+    strategy_type = params.get('strategy_type', 'ma_crossover')
+
+    if strategy_type == 'ma_crossover':
+        # Fast MA crosses above slow MA
+        return crosses_above(indicators['ma_fast'], indicators['ma_slow'])
+
+    if strategy_type == 'rsi_oversold':
+        # RSI crosses above the oversold threshold
+        return crosses_above(indicators['rsi'], params.get('rsi_oversold', SIGNAL_LEVELS['rsi_oversold']))
+
+    if strategy_type == 'bollinger_bounce':
+        # Price bounces off the lower band
+        return crosses_above(prices, indicators['bb_lower'])
+
+    if strategy_type == 'macd_crossover':
+        # MACD histogram crosses above zero
+        return crosses_above(indicators['macd_hist'], 0)
+
+    return _empty_mask(prices)
+
+def exit_signals(prices, indicators, params):
+    """
+    Evaluate the exit rule of the strategy type on every bar at once.
+
+    Stop-loss, take-profit and holding period exits depend on the open
+    position and are applied by the position simulation instead.
+
+    Returns:
+        np.ndarray: Boolean mask of bars where the exit rule fires
+    """
+    strategy_type = params.get('strategy_type', 'ma_crossover')
+
+    if strategy_type == 'ma_crossover':
+        # Fast MA crosses below slow MA
+        return crosses_below(indicators['ma_fast'], indicators['ma_slow'])
+
+    if strategy_type == 'rsi_oversold':
+        # RSI overbought
+        with np.errstate(invalid='ignore'):
+            return indicators['rsi'] > params.get('rsi_overbought', SIGNAL_LEVELS['rsi_overbought'])
+
+    if strategy_type == 'bollinger_bounce':
+        # Price reaches the middle band from below
+        middle = indicators['bb_middle']
+        mask = _empty_mask(prices, middle)
+        mask[..., 1:] = (prices[:-1] < middle[..., :-1]) & (prices[1:] >= middle[..., 1:])
+        return mask
+
+    if strategy_type == 'macd_crossover':
+        # MACD histogram crosses below zero
+        return crosses_below(indicators['macd_hist'], 0)
+
+    return _empty_mask(prices)
+
+def batch_signals(prices, graph, param_sets):
+    """
+    Evaluate entry and exit rules for several parameter sets in one pass.
+
+    All sets must share a strategy type. Their indicator series are stacked
+    into (sets, bars) arrays and their thresholds into (sets, 1) columns, so
+    the rules run once over the whole batch.
+
+    Args:
+        prices (np.ndarray): Historical prices
+        graph (IndicatorGraph): Indicator graph for the price history
+        param_sets (list): Strategy parameter dicts with a common strategy type
+
+    Returns:
+        tuple: (entries, exits) boolean arrays of shape (sets, bars)
+    """
+    params = {
+        name: np.array([[p.get(name, default)] for p in param_sets], dtype=np.float64)
+        for name, default in SIGNAL_LEVELS.items()
+    }
+    params['strategy_type'] = param_sets[0].get('strategy_type', 'ma_crossover')
+
+    indicators = {
+        name: np.vstack([graph.for_params(p)[name] for p in param_sets])
+        for name in strategy_indicators(params)
+    }
+
+    shape = (len(param_sets), len(prices))
+    entries = np.broadcast_to(entry_signals(prices, indicators, params), shape)
+    exits = np.broadcast_to(exit_signals(prices, indicators, params), shape)
+    return entries, exits
@@ -0,0 +1,284 @@
+import math
+
+import numpy as np
+
+from backend.kernels import DISABLED, native, simulate_native
+
+def warmup_bars(params, offset=0):
+    """
+    Return the first bar on which the strategy may trade.
+
+    Args:
+        params (dict): Strategy parameters
+        offset (int): Bars of history preceding the first bar that the
+            indicators were already computed over
+    """
+    warmup = max(params.get('ma_fast', 10), params.get('ma_slow', 50))
+    return max(1, math.ceil(warmup) - offset)
+
+class PositionState:
+    """
+    State of an open long position.
+
+    Holds everything the risk exits need so each bar is checked in O(1):
+    the entry bar and price, the bars held so far, the highest price seen
+    since entry, and the stop, target and trailing levels derived from the
+    strategy parameters when the position is opened.
+    """
+
+    __slots__ = (
+        'entry_index', 'entry_price', 'bars_held', 'trailing_high',
+        'stop_price', 'target_price', 'max_hold', 'trailing_factor'
+    )
+
+    def __init__(self, entry_index, entry_price, params):
+        self.entry_index = entry_index
+        self.entry_price = entry_price
+        self.bars_held = 0
+        self.trailing_high = entry_price
+
+        stop_factor, target_factor, self.max_hold, self.trailing_factor = self.risk_limits(params)
+        self.stop_price = entry_price * stop_factor
+        self.target_price = entry_price * target_factor
+
+    @staticmethod
+    def risk_limits(params):
+        """
+        Read the risk exits from the strategy parameters.
+
+        Returns:
+            tuple: (stop factor, target factor, holding period in bars,
+                trailing factor); the stop and target are fractions of the
+                entry price, the trailing factor a fraction of the high since
+                entry, and the last two are None when disabled
+        """
+        stop_factor = 1 - params.get('stop_loss_pct', 5) / 100
+        target_factor = 1 + params.get('take_profit_pct', 10) / 100
+
+        # Non-positive values disable the holding period and trailing stop
+        max_hold_days = params.get('max_hold_days', 30) or 0
+        max_hold = int(max_hold_days) if max_hold_days >= 1 else None
+
+        trailing_stop_pct = params.get('trailing_stop_pct', 0) or 0
+        trailing_factor = 1 - trailing_stop_pct / 100 if trailing_stop_pct > 0 else None
+
+        return stop_factor, target_factor, max_hold, trailing_factor
+
+    def update(self, index, price):
+        """Advance the position to bar index, whose price is price."""
+        self.bars_held = index - self.entry_index
+        if price > self.trailing_high:
+            self.trailing_high = price
+
+    def risk_exit(self, price):
+        """Return True if the stop-loss, take-profit, trailing stop or holding period fires."""
+        if price < self.stop_price or price > self.target_price:
+            return True
+        if self.trailing_factor is not None and price < self.trailing_high * self.trailing_factor:
+            return True
+        return self.max_hold is not None and self.bars_held >= self.max_hold
+
+    def to_dict(self):
+        """Return the state as a plain dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild a position from the dict produced by to_dict()."""
+        position = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(position, name, state[name])
+        return position
+
+def _next_true(mask):
+    """For every bar, the index of the first True at or after it (len(mask) if none)."""
+    length = len(mask)
+    candidates = np.full(length + 1, length)
+    candidates[:length][mask] = np.flatnonzero(mask)
+    return np.minimum.accumulate(candidates[::-1])[::-1]
+
+def _first_risk_exit(prices, state, limit):
+    """
+    Find the first bar after entry where a price-based risk exit fires.
+
+    Bars are scanned in windows that double in size, so a position held for
+    k bars costs O(k) vectorized work. The state is advanced to the returned
+    bar.
+
+    Args:
+        prices (np.ndarray): Historical prices
+        state (PositionState): The open position
+        limit (int): Bar at which the position closes anyway
+
+    Returns:
+        int: Exit bar, or limit if no price-based exit fires before it
+    """
+    bar = state.entry_index + 1
+    window = 16
+
+    while bar < limit:
+        chunk = prices[bar:min(bar + window, limit)]
+        hits = (chunk < state.stop_price) | (chunk > state.target_price)
+
+        highs = None
+        if state.trailing_factor is not None:
+            highs = np.maximum.accumulate(chunk)
+            np.maximum(highs, state.trailing_high, out=highs)
+            hits |= chunk < highs * state.trailing_factor
+
+        hit = np.flatnonzero(hits)
+        if hit.size:
+            bar += int(hit[0])
+            state.update(bar, prices[state.entry_index:bar + 1].max())
+            return bar
+
+        if highs is not None:
+            state.trailing_high = highs[-1]
+        bar += len(chunk)
+        window *= 2
+
+    if limit < len(prices):
+        state.update(limit, prices[state.entry_index:limit + 1].max())
+    return limit
+
+def simulate_trades(prices, entries, exits, start, params):
+    """
+    Turn entry and exit masks into round trips.
+
+    A position is opened on the first entry bar at or after start while flat
+    and closed on the first later bar where the strategy exit rule or one of
+    the position's risk exits fires; the next entry is searched from the bar
+    after the exit. The loop runs once per trade rather than once per bar;
+    with the numba kernel backend the compiled state machine walks the bars
+    instead and gives the same positions.
+
+    Args:
+        prices (np.ndarray): Historical prices
+        entries (np.ndarray): Boolean entry mask
+        exits (np.ndarray): Boolean strategy exit mask
+        start (int): First bar on which trading is allowed
+        params (dict): Strategy parameters (stop, target and holding limits)
+
+    Returns:
+        list: (entry_index, exit_index) pairs; exit_index is None for a
+            position still open on the last bar
+    """
+    if native():
+        return _simulate_compiled(prices, entries, exits, start, params)
+
+    length = len(entries)
+    next_entry = _next_true(entries)
+    next_exit = _next_true(exits)
+
+    positions = []
+    bar = start
+
+    while bar < length:
+        entry = int(next_entry[bar])
+        if entry == length:
+            break
+
+        state = PositionState(entry, float(prices[entry]), params)
+
+        # The strategy exit and the holding period bound the search
+        limit = int(next_exit[entry + 1])
+        if state.max_hold is not None:
+            limit = min(limit, entry + state.max_hold)
+
+        exit_bar = _first_risk_exit(prices, state, limit)
+        if exit_bar >= length:
+            positions.append((entry, None))
+            break
+
+        positions.append((entry, exit_bar))
+        bar = exit_bar + 1
+
+    return positions
+
+def resume_position(prices, exits, state, offset):
+    """
+    Carry a position opened in an earlier chunk of bars through the next one.
+
+    Args:
+        prices (np.ndarray): Prices of the chunk
+        exits (np.ndarray): Boolean strategy exit mask of the chunk
+        state (PositionState): The open position, indexed on the full history
+        offset (int): Full-history index of the chunk's first bar
+
+    Returns:
+        int: Full-history exit bar, or None if the position is still open
+            after the chunk (its trailing high is then brought up to date)
+    """
+    length = len(prices)
+    signals = np.flatnonzero(exits)
+    limit = int(signals[0]) if signals.size else length
+    if state.max_hold is not None:
+        limit = min(limit, state.entry_index + state.max_hold - offset)
+
+    chunk = prices[:limit]
+    hits = (chunk < state.stop_price) | (chunk > state.target_price)
+    if state.trailing_factor is not None:
+        highs = np.maximum(np.maximum.accumulate(chunk), state.trailing_high) if len(chunk) else chunk
+        hits |= chunk < highs * state.trailing_factor
+
+    hit = np.flatnonzero(hits)
+    if hit.size:
+        return offset + int(hit[0])
+    if limit < length:
+        return offset + limit
+
+    if length:
+        state.update(offset + length - 1, max(state.trailing_high, float(prices.max())))
+    return None
+
+def _simulate_compiled(prices, entries, exits, start, params):
+    stop_factor, target_factor, max_hold, trailing_factor = PositionState.risk_limits(params)
+    entry_bars, exit_bars = simulate_native(
+        np.ascontiguousarray(prices, dtype=np.float64), entries, exits, start, stop_factor, target_factor,
+        DISABLED if max_hold is None else max_hold, 0.0 if trailing_factor is None else trailing_factor
+    )
+    return [
+        (entry, None if exit_bar == DISABLED else exit_bar)
+        for entry, exit_bar in zip(entry_bars.tolist(), exit_bars.tolist())
+    ]
+
+def equity_curve(prices, positions, position_size):
+    """
+    Calculate the normalized portfolio value on every bar.
+
+    Args:
+        prices (np.ndarray): Historical prices
+        positions (list): (entry_index, exit_index) pairs from simulate_trades
+        position_size (float): Cash committed to each position
+
+    Returns:
+        np.ndarray: Portfolio value (cash plus position value) per bar, starting at 1.0
+    """
+    length = len(prices)
+    change_bars = [0]
+    cash_levels = [1.0]
+    share_levels = [0.0]
+
+    cash = 1.0
+    for entry, exit_bar in positions:
+        shares = position_size / prices[entry]
+        cash -= position_size
+        change_bars.append(entry)
+        cash_levels.append(cash)
+        share_levels.append(shares)
+
+        if exit_bar is not None:
+            cash += shares * prices[exit_bar]
+            change_bars.append(exit_bar)
+            cash_levels.append(cash)
+            share_levels.append(0.0)
+
+    # Map every bar to the state in force after that bar's trades; change
+    # bars are strictly increasing so a running count of them is the index
+    changes = np.zeros(length, dtype=np.int64)
+    changes[change_bars[1:]] = 1
+    state = np.cumsum(changes)
+    values = np.asarray(cash_levels)[state] + np.asarray(share_levels)[state] * prices
+    values[0] = 1.0
+
+    return values
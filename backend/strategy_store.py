@@ -3,8 +3,10 @@ import json
 import logging
 from datetime import datetime
 
+from backend.instrumentation import LOG_LEVEL
+
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 def save_strategy(user_id, strategy_data):
@@ -18,7 +20,7 @@ def save_strategy(user_id, strategy_data):
     Returns:
         bool: Success status
     """
-    logger.debug(f"Saving strategy for user: {user_id}")
+    logger.debug("Saving strategy for user: %s", user_id)
     
     try:
         # Ensure data directory exists
@@ -47,11 +49,11 @@ def save_strategy(user_id, strategy_data):
         with open('data/user_strategies.json', 'w') as f:
             json.dump(user_strategies, f, indent=2)
         
-        logger.debug(f"Strategy saved successfully for user {user_id}")
+        logger.debug("Strategy saved successfully for user %s", user_id)
         return True
         
     except Exception as e:
-        logger.error(f"Error saving strategy: {str(e)}")
+        logger.error("Error saving strategy: %s", e)
         raise Exception(f"Failed to save strategy: {str(e)}")
 
 def get_user_strategies(user_id):
@@ -64,12 +66,12 @@ def get_user_strategies(user_id):
     Returns:
         list: User's saved strategies
     """
-    logger.debug(f"Getting strategies for user: {user_id}")
+    logger.debug("Getting strategies for user: %s", user_id)
     
     try:
         # Check if data file exists
         if not os.path.exists('data/user_strategies.json'):
-            logger.debug(f"No strategies file found for user {user_id}")
+            logger.debug("No strategies file found for user %s", user_id)
             return []
         
         # Load user strategies
@@ -80,7 +82,7 @@ def get_user_strategies(user_id):
         return user_strategies.get(user_id, [])
         
     except Exception as e:
-        logger.error(f"Error getting user strategies: {str(e)}")
+        logger.error("Error getting user strategies: %s", e)
         return []
 
 def get_all_strategies():
@@ -105,7 +107,7 @@ def get_all_strategies():
         return all_strategies
         
     except Exception as e:
-        logger.error(f"Error getting all strategies: {str(e)}")
+        logger.error("Error getting all strategies: %s", e)
         return []
 
 def delete_strategy(user_id, strategy_id):
@@ -119,12 +121,12 @@ def delete_strategy(user_id, strategy_id):
     Returns:
         bool: Success status
     """
-    logger.debug(f"Deleting strategy {strategy_id} for user: {user_id}")
+    logger.debug("Deleting strategy %s for user: %s", strategy_id, user_id)
     
     try:
         # Check if data file exists
         if not os.path.exists('data/user_strategies.json'):
-            logger.debug(f"No strategies file found for user {user_id}")
+            logger.debug("No strategies file found for user %s", user_id)
             return False
         
         # Load user strategies
@@ -133,7 +135,7 @@ def delete_strategy(user_id, strategy_id):
         
         # Check if user exists
         if user_id not in user_strategies:
-            logger.debug(f"No strategies found for user {user_id}")
+            logger.debug("No strategies found for user %s", user_id)
             return False
         
         # Filter out the strategy to delete
@@ -143,9 +145,9 @@ def delete_strategy(user_id, strategy_id):
         with open('data/user_strategies.json', 'w') as f:
             json.dump(user_strategies, f, indent=2)
         
-        logger.debug(f"Strategy {strategy_id} deleted successfully for user {user_id}")
+        logger.debug("Strategy %s deleted successfully for user %s", strategy_id, user_id)
         return True
         
     except Exception as e:
-        logger.error(f"Error deleting strategy: {str(e)}")
+        logger.error("Error deleting strategy: %s", e)
         return False
@@ -0,0 +1,508 @@
+import math
+import logging
+
+from backend.indicator_graph import indicator_args
+from backend.metrics import periods_per_year, trade_metrics, trade_arrays, round_metrics, empty_metrics
+from backend.signals import SIGNAL_LEVELS
+from backend.simulation import PositionState, warmup_bars
+from backend.instrumentation import LOG_LEVEL
+
+# Configure logging
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+
+def _encode(value):
+    """Store NaN as None so the state is plain JSON."""
+    return None if value != value else value
+
+def _decode(value):
+    return NAN if value is None else value
+
+class OnlineState:
+    """
+    Base class for online indicator state.
+
+    Subclasses list their fields in __slots__; numeric fields that may be
+    NaN round-trip through None so to_dict() output can be stored as JSON.
+    """
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """Return the state as a plain dict."""
+        return {name: _encode(getattr(self, name)) if isinstance(getattr(self, name), float) else getattr(self, name)
+                for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild the state saved by to_dict()."""
+        obj = cls.__new__(cls)
+        for name in cls.__slots__:
+            value = state[name]
+            setattr(obj, name, _decode(value) if value is None or isinstance(value, float) else value)
+        return obj
+
+class RollingWindow(OnlineState):
+    """
+    Mean and population variance of the last period values.
+
+    Values are kept in a ring buffer and the moments are updated with a
+    sliding-window Welford step, so each push is O(1). The moments are
+    recomputed from the buffer each time it wraps, which stops rounding
+    error from accumulating over long streams at O(1) amortized cost.
+    """
+
+    __slots__ = ('period', 'values', 'position', 'mean', 'm2')
+
+    def __init__(self, period):
+        self.period = period
+        self.values = []
+        self.position = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def full(self):
+        return self.period > 0 and len(self.values) == self.period
+
+    def push(self, value):
+        """Add a value, dropping the oldest one once the window is full."""
+        if self.period <= 0:
+            return
+        if not self.full:
+            self.values.append(value)
+            delta = value - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (value - self.mean)
+            return
+
+        old = self.values[self.position]
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.period
+
+        if self.position == 0:
+            self.mean = math.fsum(self.values) / self.period
+            self.m2 = math.fsum((v - self.mean) ** 2 for v in self.values)
+            return
+
+        mean = self.mean + (value - old) / self.period
+        self.m2 = max(self.m2 + (value - old) * (value - mean + old - self.mean), 0.0)
+        self.mean = mean
+
+    def average(self):
+        """Return the window mean, or NaN until the window is full."""
+        return self.mean if self.full else NAN
+
+    def std(self):
+        """Return the window's population standard deviation, or NaN until full."""
+        return math.sqrt(self.m2 / self.period) if self.full else NAN
+
+class OnlineEMA(OnlineState):
+    """Exponential moving average seeded with the SMA of the first period values."""
+
+    __slots__ = ('period', 'count', 'total', 'value')
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.total = 0.0
+        self.value = NAN
+
+    def push(self, price):
+        """Add a value and return the EMA (NaN during the seed window)."""
+        self.count += 1
+        if self.count < self.period:
+            self.total += price
+        elif self.count == self.period:
+            self.value = (self.total + price) / self.period
+        else:
+            multiplier = 2 / (self.period + 1)
+            self.value = (1 - multiplier) * self.value + multiplier * price
+        return self.value
+
+class OnlineRSI(OnlineState):
+    """Relative Strength Index with Wilder smoothing, matching indicators.rsi."""
+
+    __slots__ = ('period', 'count', 'previous', 'gain_sum', 'loss_sum', 'avg_gain', 'avg_loss')
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.previous = NAN
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.avg_gain = NAN
+        self.avg_loss = NAN
+
+    def push(self, price):
+        """Add a price and return the RSI (NaN for the first period bars)."""
+        if self.period <= 0:
+            return NAN
+
+        self.count += 1
+        previous, self.previous = self.previous, price
+        if self.count == 1:
+            return NAN
+
+        gain = max(price - previous, 0.0)
+        loss = max(previous - price, 0.0)
+
+        if self.count <= self.period:
+            self.gain_sum += gain
+            self.loss_sum += loss
+            return NAN
+
+        decay = (self.period - 1) / self.period
+        if self.count == self.period + 1:
+            # The seed averages the first period changes and, as in the
+            # batch version, the change of this bar is applied on top of it
+            self.avg_gain = (self.gain_sum + gain) / self.period
+            self.avg_loss = (self.loss_sum + loss) / self.period
+
+        self.avg_gain = decay * self.avg_gain + gain / self.period
+        self.avg_loss = decay * self.avg_loss + loss / self.period
+
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+class OnlineMACD(OnlineState):
+    """MACD line, signal line and histogram, matching indicators.macd."""
+
+    __slots__ = ('fast', 'slow', 'slow_period', 'signal_period', 'count', 'total', 'signal')
+
+    def __init__(self, fast_period, slow_period, signal_period):
+        self.fast = OnlineEMA(fast_period)
+        self.slow = OnlineEMA(slow_period)
+        self.slow_period = slow_period
+        self.signal_period = signal_period
+        self.count = 0
+        self.total = 0.0
+        self.signal = NAN
+
+    def push(self, price):
+        """Add a price and return (macd, signal, histogram)."""
+        fast = self.fast.push(price)
+        slow = self.slow.push(price)
+        index = self.count
+        self.count += 1
+
+        if index < self.slow_period or self.signal_period <= 0:
+            return NAN, NAN, NAN
+
+        line = fast - slow
+        first_signal = self.slow_period + self.signal_period - 1
+
+        if index < first_signal:
+            self.total += line
+            return line, NAN, NAN
+
+        if index == first_signal:
+            self.signal = (self.total + line) / self.signal_period
+        else:
+            alpha = 2 / (self.signal_period + 1)
+            self.signal = (1 - alpha) * self.signal + alpha * line
+
+        return line, self.signal, line - self.signal
+
+    def to_dict(self):
+        state = super().to_dict()
+        state['fast'] = self.fast.to_dict()
+        state['slow'] = self.slow.to_dict()
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = super().from_dict(state)
+        obj.fast = OnlineEMA.from_dict(state['fast'])
+        obj.slow = OnlineEMA.from_dict(state['slow'])
+        return obj
+
+def _crosses_above(previous, current, level_previous, level_current):
+    return previous <= level_previous and current > level_current
+
+def _crosses_below(previous, current, level_previous, level_current):
+    return previous >= level_previous and current < level_current
+
+class StreamingBacktest:
+    """
+    Incremental counterpart of run_backtest.
+
+    Keeps online state for the indicators the strategy type reads, the open
+    position, the portfolio and the running performance metrics, so each new
+    bar is processed in O(1) without revisiting the history. Feeding a
+    history bar by bar gives the same trades and metrics as run_backtest on
+    it, up to floating point rounding in the indicators.
+
+    The whole state is available as a JSON-compatible dict through
+    to_dict() and can be resumed with from_dict().
+    """
+
+    def __init__(self, strategy_params, ticker=None, interval='1day'):
+        self.params = dict(strategy_params)
+        self.ticker = ticker
+        self.interval = interval
+        self.strategy_type = self.params.get('strategy_type', 'ma_crossover')
+        self.indicators = self._build_indicators()
+
+        self.index = -1
+        self.date = None
+        self.start = warmup_bars(self.params)
+        self.position_size = self.params.get('position_size', 1.0)
+
+        self.last = {}
+        self.position = None
+        self.cash = 1.0
+        self.shares = 0.0
+        self.value = 1.0
+        self.trades = []
+
+        # Running metric accumulators: Welford mean/M2 of bar returns, the
+        # sum of squared losses, bars spent in a position and the equity
+        # peak for drawdowns
+        self.returns = 0
+        self.return_mean = 0.0
+        self.return_m2 = 0.0
+        self.downside_sum = 0.0
+        self.bars_held = 0
+        self.peak = 1.0
+        self.max_drawdown = 0.0
+
+    def _build_indicators(self):
+        params = self.params
+        if self.strategy_type == 'ma_crossover':
+            fast, = indicator_args(params, ('ma_fast',))
+            slow, = indicator_args(params, ('ma_slow',))
+            return {'ma_fast': RollingWindow(fast), 'ma_slow': RollingWindow(slow)}
+        if self.strategy_type == 'rsi_oversold':
+            return {'rsi': OnlineRSI(*indicator_args(params, ('rsi_period',)))}
+        if self.strategy_type == 'bollinger_bounce':
+            period, _ = indicator_args(params, ('bb_period', 'bb_std'))
+            return {'bollinger': RollingWindow(period)}
+        if self.strategy_type == 'macd_crossover':
+            return {'macd': OnlineMACD(*indicator_args(params, ('macd_fast', 'macd_slow', 'macd_signal')))}
+        return {}
+
+    def _indicator_values(self, price):
+        """Advance the indicators by one bar and return this bar's series values."""
+        indicators = self.indicators
+
+        if self.strategy_type == 'ma_crossover':
+            indicators['ma_fast'].push(price)
+            indicators['ma_slow'].push(price)
+            return {'ma_fast': indicators['ma_fast'].average(), 'ma_slow': indicators['ma_slow'].average()}
+
+        if self.strategy_type == 'rsi_oversold':
+            return {'rsi': indicators['rsi'].push(price)}
+
+        if self.strategy_type == 'bollinger_bounce':
+            # Bands come from the window of bars preceding this one
+            window = indicators['bollinger']
+            _, std_dev = indicator_args(self.params, ('bb_period', 'bb_std'))
+            middle = window.average()
+            lower = middle - std_dev * window.std()
+            window.push(price)
+            return {'bb_lower': lower, 'bb_middle': middle}
+
+        if self.strategy_type == 'macd_crossover':
+            return {'macd_hist': indicators['macd'].push(price)[2]}
+
+        return {}
+
+    def _signals(self, price, values):
+        """Evaluate the entry and exit rules for the current bar."""
+        last = self.last
+        if not last:
+            return False, False
+
+        if self.strategy_type == 'ma_crossover':
+            args = (last['ma_fast'], values['ma_fast'], last['ma_slow'], values['ma_slow'])
+            return _crosses_above(*args), _crosses_below(*args)
+
+        if self.strategy_type == 'rsi_oversold':
+            oversold = self.params.get('rsi_oversold', SIGNAL_LEVELS['rsi_oversold'])
+            overbought = self.params.get('rsi_overbought', SIGNAL_LEVELS['rsi_overbought'])
+            entry = _crosses_above(last['rsi'], values['rsi'], oversold, oversold)
+            return entry, values['rsi'] > overbought
+
+        if self.strategy_type == 'bollinger_bounce':
+            entry = _crosses_above(last['price'], price, last['bb_lower'], values['bb_lower'])
+            exit_signal = last['price'] < last['bb_middle'] and price >= values['bb_middle']
+            return entry, exit_signal
+
+        if self.strategy_type == 'macd_crossover':
+            args = (last['macd_hist'], values['macd_hist'], 0, 0)
+            return _crosses_above(*args), _crosses_below(*args)
+
+        return False, False
+
+    def update(self, date, price):
+        """
+        Process one new bar.
+
+        Args:
+            date (str): Bar date
+            price (float): Closing price
+
+        Returns:
+            dict: The bar's signal ('entry', 'exit' or None), exit reason,
+                portfolio value and whether a position is open
+        """
+        price = float(price)
+        self.index += 1
+        self.date = date
+
+        values = self._indicator_values(price)
+        entry, exit_signal = self._signals(price, values)
+
+        signal = None
+        reason = None
+        if self.position is not None:
+            self.position.update(self.index, price)
+            risk = self.position.risk_exit(price)
+            if risk or exit_signal:
+                signal = 'exit'
+                reason = 'risk' if risk else 'signal'
+                self._close(date, price)
+        elif entry and self.index >= self.start:
+            signal = 'entry'
+            self._open(date, price)
+
+        if self.position is not None:
+            self.bars_held += 1
+
+        previous_value = self.value
+        self.value = self.cash + self.shares * price if self.index > 0 else 1.0
+        if self.index > 0:
+            self._record_return(self.value / previous_value - 1)
+
+        values['price'] = price
+        self.last = values
+
+        return {
+            'index': self.index,
+            'date': date,
+            'price': price,
+            'signal': signal,
+            'exit_reason': reason,
+            'portfolio_value': self.value,
+            'in_position': self.position is not None
+        }
+
+    def _open(self, date, price):
+        self.position = PositionState(self.index, price, self.params)
+        self.shares = self.position_size / price
+        self.cash -= self.position_size
+        self.trades.append({
+            'type': 'entry',
+            'date': date,
+            'price': price,
+            'shares': self.shares,
+            'value': self.position_size
+        })
+
+    def _close(self, date, price):
+        self.cash += self.shares * price
+        self.trades.append({
+            'type': 'exit',
+            'date': date,
+            'price': price,
+            'shares': self.shares,
+            'value': self.shares * price
+        })
+        self.position = None
+        self.shares = 0.0
+
+    def _record_return(self, value):
+        self.returns += 1
+        delta = value - self.return_mean
+        self.return_mean += delta / self.returns
+        self.return_m2 += delta * (value - self.return_mean)
+        self.downside_sum += min(value, 0.0) ** 2
+
+        self.peak = max(self.peak, self.value)
+        self.max_drawdown = max(self.max_drawdown, (self.peak - self.value) / self.peak)
+
+    def metrics(self):
+        """
+        Return the performance metrics of the bars seen so far.
+
+        Returns:
+            dict: The same keys as calculate_performance_metrics
+        """
+        bars = self.index + 1
+        if bars < 2:
+            return empty_metrics()
+
+        bars_per_year = periods_per_year(self.interval)
+        years = bars / bars_per_year
+        annualizer = bars_per_year ** 0.5
+        std = math.sqrt(self.return_m2 / self.returns)
+        downside = math.sqrt(self.downside_sum / self.returns)
+        cagr = self.value ** (1 / years) - 1
+
+        metrics = {
+            'total_return': (self.value - 1) * 100,
+            'cagr': cagr * 100,
+            'sharpe_ratio': self.return_mean / std * annualizer if std > 0 else 0.0,
+            'sortino_ratio': self.return_mean / downside * annualizer if downside > 0 else 0.0,
+            'calmar_ratio': cagr / self.max_drawdown if self.max_drawdown > 0 else 0.0,
+            'volatility': std * annualizer * 100,
+            'max_drawdown': self.max_drawdown * 100,
+        }
+        metrics.update(trade_metrics(*trade_arrays(self.trades)))
+        metrics['exposure'] = self.bars_held / bars * 100
+
+        return round_metrics(metrics)
+
+    def to_dict(self):
+        """Return the complete engine state as a JSON-compatible dict."""
+        return {
+            'params': self.params,
+            'ticker': self.ticker,
+            'interval': self.interval,
+            'index': self.index,
+            'date': self.date,
+            'indicators': {name: state.to_dict() for name, state in self.indicators.items()},
+            'last': {name: _encode(value) for name, value in self.last.items()},
+            'position': self.position.to_dict() if self.position is not None else None,
+            'cash': self.cash,
+            'shares': self.shares,
+            'value': self.value,
+            'trades': self.trades,
+            'returns': self.returns,
+            'downside_sum': self.downside_sum,
+            'bars_held': self.bars_held,
+            'return_mean': self.return_mean,
+            'return_m2': self.return_m2,
+            'peak': self.peak,
+            'max_drawdown': self.max_drawdown
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Resume an engine from the dict produced by to_dict()."""
+        engine = cls(state['params'], state.get('ticker'), state.get('interval', '1day'))
+        for name, saved in state['indicators'].items():
+            engine.indicators[name] = type(engine.indicators[name]).from_dict(saved)
+
+        engine.index = state['index']
+        engine.date = state['date']
+        engine.last = {name: _decode(value) for name, value in state['last'].items()}
+        engine.position = PositionState.from_dict(state['position']) if state['position'] is not None else None
+        engine.trades = list(state['trades'])
+        for name in ('cash', 'shares', 'value', 'returns', 'return_mean', 'return_m2', 'downside_sum',
+                     'bars_held', 'peak', 'max_drawdown'):
+            setattr(engine, name, state[name])
+        return engine
+
+    @classmethod
+    def from_history(cls, stock_data, strategy_params):
+        """Build an engine and feed it every bar of a history."""
+        engine = cls(strategy_params, stock_data.get('ticker'), stock_data.get('interval') or '1day')
+        for date, price in zip(stock_data.get('dates', []), stock_data.get('prices', [])):
+            engine.update(date, price)
+        logger.debug("Streaming backtest for %s warmed up on %s bars", engine.ticker, engine.index + 1)
+        return engine
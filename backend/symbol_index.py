@@ -0,0 +1,224 @@
+import os
+import re
+import json
+import time
+import difflib
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Symbol list answering searches locally, as saved by the last refresh
+SYMBOL_INDEX_FILE = os.environ.get("SYMBOL_INDEX_FILE", os.path.join("data", "symbols.json"))
+
+# Seconds before the symbol list is downloaded again (0 never downloads it)
+SYMBOL_INDEX_REFRESH = int(os.environ.get("SYMBOL_INDEX_REFRESH", 24 * 3600))
+
+# Seconds between attempts after a failed download
+SYMBOL_INDEX_RETRY = 15 * 60
+
+# Remote search results kept, and for how many seconds
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 1024))
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", 3600))
+
+# Results returned per search, as the symbol_search request asks for
+SEARCH_LIMIT = 10
+
+# Minimum query length for fuzzy matching, how close a match must be, and
+# how much longer or shorter a candidate may be
+FUZZY_MIN_LENGTH = 3
+FUZZY_CUTOFF = 0.75
+FUZZY_LENGTH_SLACK = 2
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def _entry(item):
+    """Reduce a symbol list item to the fields search results carry."""
+    return {
+        "symbol": item.get("symbol", ""),
+        "name": item.get("instrument_name", item.get("name", "")),
+        "exchange": item.get("exchange", ""),
+        "type": item.get("type", "")
+    }
+
+def _prefixed(pairs, prefix):
+    """Yield the (key, index) pairs of a sorted list whose key starts with prefix."""
+    for position in range(bisect_left(pairs, (prefix,)), len(pairs)):
+        key, index = pairs[position]
+        if not key.startswith(prefix):
+            return
+        yield key, index
+
+def _fuzzy_candidates(pairs):
+    """Group the distinct keys of a sorted list by first character and length."""
+    groups = {}
+    for key, _ in pairs:
+        keys = groups.setdefault((key[:1], len(key)), [])
+        if not keys or keys[-1] != key:
+            keys.append(key)
+    return groups
+
+def save_symbols(path, items):
+    """Write a symbol list for SymbolIndex.load_file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump([_entry(item) for item in items], f)
+    os.replace(temporary, path)
+
+class SymbolIndex:
+    """
+    In-memory index of listed symbols for autocomplete.
+
+    Matches are ranked: exact symbol, symbol prefix, instrument name
+    prefix, then prefix of a word in the name. Only a query matching none
+    of those (usually a typo) is matched fuzzily against symbols and name
+    words of similar length sharing its first character. Prefix lookups
+    are binary searches over sorted keys; a reload swaps in a fully built
+    index, so searches never see a partial one.
+    """
+
+    def __init__(self):
+        self._state = ([], [], [], [], {}, {})
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.matched = 0
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def load(self, items, loaded_at=None):
+        """
+        Replace the indexed symbols.
+
+        Args:
+            items (list): Dicts with 'symbol' and 'instrument_name' or 'name'
+            loaded_at (float): Epoch time the list was downloaded (now by default)
+        """
+        entries = [_entry(item) for item in items if item.get("symbol")]
+        symbols = sorted((entry["symbol"].upper(), i) for i, entry in enumerate(entries))
+        names = sorted((entry["name"].lower(), i) for i, entry in enumerate(entries) if entry["name"])
+        words = sorted({(word, i) for i, entry in enumerate(entries) for word in _WORD.findall(entry["name"].lower())})
+
+        self._state = (entries, symbols, names, words, _fuzzy_candidates(symbols), _fuzzy_candidates(words))
+        self.loaded_at = time.time() if loaded_at is None else loaded_at
+
+    def load_file(self, path):
+        """Load a list saved by save_symbols; returns False when there is none."""
+        try:
+            with open(path) as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            return False
+
+        self.load(items, loaded_at=os.path.getmtime(path))
+        return True
+
+    def age(self):
+        """Seconds since the indexed list was downloaded, None before a load."""
+        return None if self.loaded_at is None else time.time() - self.loaded_at
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        Find symbols matching a query.
+
+        Args:
+            query (str): Partial symbol or instrument name
+            limit (int): Maximum results
+
+        Returns:
+            list: Matches as {'symbol', 'name', 'exchange', 'type'}, best first
+        """
+        entries, symbols, names, words, fuzzy_symbols, fuzzy_words = self._state
+        query = query.strip()
+        if not query or not entries:
+            return []
+
+        upper = query.upper()
+        lower = query.lower()
+        found = OrderedDict()
+
+        def collect(pairs):
+            for _, index in pairs:
+                if len(found) >= limit:
+                    return
+                found.setdefault(index, None)
+
+        # Exact symbols sort first among the symbols they prefix
+        collect(_prefixed(symbols, upper))
+        collect(_prefixed(names, lower))
+        for word in _WORD.findall(lower)[:1]:
+            collect(_prefixed(words, word))
+
+        if not found and len(query) >= FUZZY_MIN_LENGTH:
+            collect(self._fuzzy(symbols, fuzzy_symbols, upper, limit))
+            collect(self._fuzzy(words, fuzzy_words, lower, limit))
+
+        with self._lock:
+            self.searches += 1
+            self.matched += bool(found)
+        return [entries[index] for index in found]
+
+    @staticmethod
+    def _fuzzy(pairs, groups, key, limit):
+        """Yield the pairs whose key is close to key."""
+        candidates = []
+        for length in range(len(key) - FUZZY_LENGTH_SLACK, len(key) + FUZZY_LENGTH_SLACK + 1):
+            candidates.extend(groups.get((key[:1], length), ()))
+        for match in difflib.get_close_matches(key, candidates, n=limit, cutoff=FUZZY_CUTOFF):
+            yield from _prefixed(pairs, match)
+
+    def stats(self):
+        """Return index size, age and search counters."""
+        age = self.age()
+        with self._lock:
+            return {
+                'symbols': len(self),
+                'age_seconds': None if age is None else round(age),
+                'searches': self.searches,
+                'matched': self.matched
+            }
+
+class TTLCache:
+    """Small LRU cache whose entries expire a fixed number of seconds after being stored."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store a value, dropping the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Return cache size and counters."""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+# Shared by every request handled by this process
+symbol_index = SymbolIndex()
+search_cache = TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
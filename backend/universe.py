@@ -0,0 +1,219 @@
+import os
+import time
+import logging
+import statistics
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from backend.backtester import backtest_data, run_backtest
+from backend.bar_store import bar_path, write_bars, open_bars
+from backend.data_fetcher import get_stock_data_many, TWELVEDATA_BATCH_SIZE
+from backend.worker_pool import WORKER_PROCESSES, worker_pool
+from backend.instrumentation import LOG_LEVEL
+
+# Configure logging
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Concurrent data requests and the largest universe accepted per request
+UNIVERSE_FETCH_WORKERS = int(os.environ.get("UNIVERSE_FETCH_WORKERS", 8))
+MAX_UNIVERSE_SYMBOLS = int(os.environ.get("MAX_UNIVERSE_SYMBOLS", 600))
+
+# Names listed at each end of the Sharpe ranking
+RANKED_NAMES = 5
+
+def normalize_tickers(tickers):
+    """Upper-case and de-duplicate ticker symbols, keeping their order."""
+    if isinstance(tickers, str):
+        tickers = tickers.split(',')
+
+    seen = []
+    for ticker in tickers or []:
+        symbol = str(ticker).strip().upper()
+        if symbol and symbol not in seen:
+            seen.append(symbol)
+    return seen
+
+def backtest_symbol(stock_data, strategy_params):
+    """
+    Backtest one symbol and keep only what the universe summary needs.
+
+    Args:
+        stock_data (dict or str): Historical stock data, or the bar store
+            directory to memory-map it from
+        strategy_params (dict): Strategy parameters
+
+    Returns:
+        dict: Ticker, date range, strategy and buy and hold metrics
+    """
+    if isinstance(stock_data, str):
+        stock_data = open_bars(stock_data)
+
+    results = run_backtest(stock_data, strategy_params)
+    return {
+        'ticker': results['ticker'],
+        'status': 'ok',
+        'start_date': results['start_date'],
+        'end_date': results['end_date'],
+        'num_bars': len(stock_data['prices']),
+        'metrics': results['metrics'],
+        'buy_hold_metrics': results['buy_hold_metrics']
+    }
+
+def _defined(value):
+    return value is not None and value == value
+
+def aggregate_results(results):
+    """
+    Summarize per-symbol results across the universe.
+
+    Args:
+        results (list): Per-symbol result dicts from run_universe
+
+    Returns:
+        dict: Cross-sectional statistics, best and worst names, failures
+    """
+    succeeded = [r for r in results if r['status'] == 'ok']
+    failed = [{'ticker': r['ticker'], 'error': r.get('error')} for r in results if r['status'] != 'ok']
+
+    sharpes = [r['metrics']['sharpe_ratio'] for r in succeeded if _defined(r['metrics']['sharpe_ratio'])]
+    returns = [r['metrics']['total_return'] for r in succeeded]
+    drawdowns = [r['metrics']['max_drawdown'] for r in succeeded]
+    beat = [r for r in succeeded if r['metrics'].get('vs_buy_hold', 0) > 0]
+
+    ranked = sorted(
+        (r for r in succeeded if _defined(r['metrics']['sharpe_ratio'])),
+        key=lambda r: r['metrics']['sharpe_ratio'],
+        reverse=True
+    )
+
+    def name(result):
+        return {
+            'ticker': result['ticker'],
+            'sharpe_ratio': result['metrics']['sharpe_ratio'],
+            'total_return': result['metrics']['total_return']
+        }
+
+    return {
+        'symbols': len(results),
+        'succeeded': len(succeeded),
+        'failed': failed,
+        'median_sharpe': round(statistics.median(sharpes), 2) if sharpes else None,
+        'mean_sharpe': round(statistics.fmean(sharpes), 2) if sharpes else None,
+        'median_return': round(statistics.median(returns), 2) if returns else None,
+        'mean_return': round(statistics.fmean(returns), 2) if returns else None,
+        'median_max_drawdown': round(statistics.median(drawdowns), 2) if drawdowns else None,
+        # Share of symbols where the strategy made money / beat buy and hold
+        'hit_rate': round(sum(1 for r in returns if r > 0) / len(returns) * 100, 2) if returns else None,
+        'beat_buy_hold_rate': round(len(beat) / len(succeeded) * 100, 2) if succeeded else None,
+        'best': [name(r) for r in ranked[:RANKED_NAMES]],
+        'worst': [name(r) for r in ranked[::-1][:RANKED_NAMES]]
+    }
+
+def run_universe(tickers, strategy_params, years=5, workers=None, fetch_workers=None, fetch=get_stock_data_many,
+                 share_bars=False):
+    """
+    Backtest one strategy against many symbols, yielding results as they finish.
+
+    Data is fetched on a thread pool in batches of TWELVEDATA_BATCH_SIZE
+    symbols, so uncached symbols share batched requests; as soon as a
+    batch's histories arrive their backtests are submitted to the worker
+    process pool, so downloads and backtests overlap. The tickers are
+    validated before this returns.
+
+    Args:
+        tickers (list): Ticker symbols
+        strategy_params (dict): Strategy parameters
+        years (int): Years of history per symbol
+        workers (int): Backtest worker processes to use at most (defaults to WORKER_PROCESSES)
+        fetch_workers (int): Concurrent batch fetches
+        fetch (callable): Data source with get_stock_data_many's signature
+        share_bars (bool): Write each history to the bar store and pass
+            workers its path, so they memory-map it instead of receiving a copy
+
+    Returns:
+        generator: One {'event': 'result', ...} dict per symbol in completion
+            order, then a final {'event': 'summary', ...}
+    """
+    tickers = normalize_tickers(tickers)
+    if not tickers:
+        raise Exception("No ticker symbols given")
+    if len(tickers) > MAX_UNIVERSE_SYMBOLS:
+        raise Exception(f"Universe too large: {len(tickers)} symbols (max {MAX_UNIVERSE_SYMBOLS})")
+
+    workers = int(workers or WORKER_PROCESSES)
+    fetch_workers = int(fetch_workers or UNIVERSE_FETCH_WORKERS)
+
+    logger.debug("Universe backtest of %s symbols on %s workers", len(tickers), workers)
+    return _universe_events(tickers, strategy_params, years, workers, fetch_workers, fetch, share_bars)
+
+def _universe_events(tickers, strategy_params, years, workers, fetch_workers, fetch, share_bars):
+    pool = worker_pool() if workers > 1 else None
+    started = time.monotonic()
+    results = []
+
+    # Fetched histories wait here until one of this run's backtests finishes
+    waiting = deque()
+    in_flight = 0
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetcher:
+        pending = {}
+        for i in range(0, len(tickers), TWELVEDATA_BATCH_SIZE):
+            batch = tickers[i:i + TWELVEDATA_BATCH_SIZE]
+            pending[fetcher.submit(fetch, batch, years=years)] = ('fetch', batch)
+
+        while pending or waiting:
+            while waiting and in_flight < min(workers, WORKER_PROCESSES):
+                data, ticker = waiting.popleft()
+                pending[pool.submit(backtest_symbol, data, strategy_params)] = ('backtest', ticker)
+                in_flight += 1
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, ticker = pending.pop(future)
+                if stage == 'fetch':
+                    # ticker is the batch of symbols fetched together here
+                    for value in _fetched_events(future, ticker, strategy_params, pool, share_bars, waiting):
+                        results.append(value)
+                        yield {'event': 'result', **value}
+                    continue
+
+                in_flight -= 1
+                try:
+                    value = future.result()
+                except Exception as e:
+                    logger.error("Universe backtest failed for %s: %s", ticker, e)
+                    value = {'ticker': ticker, 'status': 'error', 'stage': stage, 'error': str(e)}
+
+                results.append(value)
+                yield {'event': 'result', **value}
+
+    summary = aggregate_results(results)
+    summary['elapsed'] = round(time.monotonic() - started, 3)
+    yield {'event': 'summary', **summary}
+
+def _fetched_events(future, batch, strategy_params, pool, share_bars, waiting):
+    """Queue a fetched batch's histories for backtesting, yielding the symbols that finish here."""
+    try:
+        fetched, errors = future.result()
+    except Exception as e:
+        fetched, errors = {}, {ticker: str(e) for ticker in batch}
+
+    for ticker in batch:
+        stage = 'fetch'
+        try:
+            if ticker not in fetched:
+                raise Exception(errors.get(ticker) or "No data returned")
+            value = fetched[ticker]
+            data = backtest_data(value, ticker)
+            if pool is not None and share_bars:
+                data = bar_path(ticker, data.get('interval') or '1day')
+                write_bars(data, value)
+            if pool is not None:
+                waiting.append((data, ticker))
+                continue
+            stage = 'backtest'
+            value = backtest_symbol(data, strategy_params)
+        except Exception as e:
+            logger.error("Universe backtest failed for %s: %s", ticker, e)
+            value = {'ticker': ticker, 'status': 'error', 'stage': stage, 'error': str(e)}
+        yield value
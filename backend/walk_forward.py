@@ -0,0 +1,330 @@
+import os
+import time
+import logging
+import tempfile
+from itertools import islice, product
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from backend.backtester import backtest_data, run_backtest, calculate_indicators, calculate_performance_metrics
+from backend.bar_store import BAR_STORE_DIR, delete_bars
+from backend.indicators import as_price_array
+from backend.indicator_cache import data_version
+from backend.indicator_graph import (INDICATOR_PARAMS, SERIES, indicator_args, strategy_indicators, save_nodes,
+                                     open_graph)
+from backend.metrics import periods_per_year, trade_metrics, trade_arrays, round_metrics
+from backend.optimizer import (OPTIMIZATION_GOALS, DEFAULT_PARAMETER_SPACE, build_search_space, optimize_parameters,
+                               score_metrics)
+from backend.worker_pool import WORKER_PROCESSES, worker_pool
+from backend.instrumentation import LOG_LEVEL
+
+# Configure logging
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Default window lengths in bars: two years in-sample, six months out-of-sample
+IN_SAMPLE_BARS = 504
+OUT_OF_SAMPLE_BARS = 126
+
+# Shortest out-of-sample window accepted (about a month of daily bars), and
+# the most folds a run may have; every fold runs a full optimization
+MIN_OUT_OF_SAMPLE_BARS = 20
+MAX_FOLDS = int(os.environ.get("WALK_FORWARD_MAX_FOLDS", 40))
+
+# Parameter combinations per indicator series computed up front for the
+# folds; larger searches compute the rest in the fold that needs them
+SHARED_SERIES_LIMIT = 1024
+
+def window_lengths(in_sample_bars=None, out_of_sample_bars=None):
+    """
+    Validate requested window lengths, applying the defaults.
+
+    Returns:
+        tuple: (in-sample bars, out-of-sample bars)
+
+    Raises:
+        Exception: When a length is not a positive whole number of bars, or
+            the out-of-sample window is shorter than MIN_OUT_OF_SAMPLE_BARS
+    """
+    lengths = []
+    for name, value, default in (('in_sample_bars', in_sample_bars, IN_SAMPLE_BARS),
+                                 ('out_of_sample_bars', out_of_sample_bars, OUT_OF_SAMPLE_BARS)):
+        try:
+            bars = float(default if value is None else value)
+        except (TypeError, ValueError):
+            bars = 0.0
+        if isinstance(value, bool) or not bars.is_integer() or bars <= 0:
+            raise Exception(f"{name} must be a positive whole number of bars, got {value!r}")
+        lengths.append(int(bars))
+
+    if lengths[1] < MIN_OUT_OF_SAMPLE_BARS:
+        raise Exception(f"out_of_sample_bars must be at least {MIN_OUT_OF_SAMPLE_BARS}, got {lengths[1]}")
+    return tuple(lengths)
+
+def walk_forward_windows(length, in_sample_bars, out_of_sample_bars):
+    """
+    Split a history into rolling in-sample/out-of-sample windows.
+
+    Each out-of-sample window directly follows its in-sample window and the
+    pair rolls forward by the out-of-sample length, so the out-of-sample
+    windows tile the history after the first in-sample window. The last one
+    may be shorter.
+
+    Returns:
+        list: (in_sample_start, out_of_sample_start, out_of_sample_end) bar indices
+    """
+    if in_sample_bars <= 0 or out_of_sample_bars <= 0:
+        raise Exception("Walk-forward windows must be at least one bar long")
+
+    folds = []
+    start = 0
+
+    while start + in_sample_bars + 1 < length:
+        split = start + in_sample_bars
+        folds.append((start, split, min(split + out_of_sample_bars, length)))
+        start += out_of_sample_bars
+
+    return folds
+
+def window_data(stock_data, start, stop):
+    """Return the stock data for bars [start, stop)."""
+    return {
+        'ticker': stock_data.get('ticker'),
+        'interval': stock_data.get('interval'),
+        'dates': stock_data['dates'][start:stop],
+        'prices': stock_data['prices'][start:stop]
+    }
+
+def shared_indicators(stock_data, strategy_params, parameter_space):
+    """
+    Build the full-history indicator graph the folds slice their windows from.
+
+    Every series the strategy reads is computed for each parameter
+    combination the search space can produce (up to SHARED_SERIES_LIMIT per
+    series), together with the intermediate nodes behind them.
+
+    Returns:
+        IndicatorGraph: The graph, also kept in the process indicator cache
+    """
+    prices = as_price_array(stock_data['prices'])
+    graph = calculate_indicators(prices, {}, data_version(stock_data, prices))
+    space, _ = build_search_space(parameter_space or DEFAULT_PARAMETER_SPACE, strategy_params)
+
+    for series in strategy_indicators(strategy_params):
+        kind, names, _ = SERIES[series]
+        choices = [space.get(name, [strategy_params.get(name, INDICATOR_PARAMS[name][0])]) for name in names]
+        for values in islice(product(*choices), SHARED_SERIES_LIMIT):
+            graph.node(kind, *indicator_args(dict(zip(names, values)), names))
+
+    return graph
+
+def run_fold(stock_data, strategy_params, fold, options, indicators):
+    """
+    Optimize on a fold's in-sample window and backtest the winner out-of-sample.
+
+    Both windows are views of one full-history indicator graph, so folds
+    share every series computed for it and each is warmed up at the
+    window's first bar.
+
+    Args:
+        indicators (IndicatorGraph or str): The graph from shared_indicators,
+            or the directory save_nodes stored it in, to memory-map it from
+
+    Returns:
+        tuple: (fold result dict, out-of-sample portfolio values)
+    """
+    in_start, split, out_end = fold
+    dates = stock_data['dates']
+
+    prices = as_price_array(stock_data['prices'])
+    graph = open_graph(indicators, prices) if isinstance(indicators, str) else indicators
+
+    optimization = optimize_parameters(
+        window_data(stock_data, in_start, split),
+        strategy_params,
+        workers=1,
+        graph=graph.window(in_start, split),
+        **options
+    )
+    out_of_sample = run_backtest(
+        window_data(stock_data, split, out_end),
+        optimization['best_params'],
+        graph=graph.window(split, out_end)
+    )
+
+    # A position still open is closed at the window's last bar, which is
+    # the value the next fold starts from
+    trades = out_of_sample['trades']
+    if trades and trades[-1]['type'] == 'entry':
+        last_price = float(prices[out_end - 1])
+        trades.append({
+            'type': 'exit',
+            'date': dates[out_end - 1],
+            'price': last_price,
+            'shares': trades[-1]['shares'],
+            'value': trades[-1]['shares'] * last_price
+        })
+        # Score the closed trade so the metrics match the trade list
+        out_of_sample['metrics'].update(round_metrics(trade_metrics(*trade_arrays(trades))))
+
+    result = {
+        'in_sample_start': dates[in_start],
+        'in_sample_end': dates[split - 1],
+        'out_of_sample_start': dates[split],
+        'out_of_sample_end': dates[out_end - 1],
+        'best_params': optimization['best_params'],
+        'in_sample_metrics': optimization['best_metrics'],
+        'out_of_sample_metrics': out_of_sample['metrics'],
+        'out_of_sample_trades': trades,
+        'evaluations': optimization['evaluations']
+    }
+    return result, out_of_sample['portfolio_values']
+
+def stitch_equity(curves):
+    """
+    Chain per-fold equity curves that each start at 1.0 into one curve.
+
+    Each fold starts flat with the capital the previous fold ended with.
+    """
+    stitched = []
+    level = 1.0
+
+    for values in curves:
+        stitched.extend(level * value for value in values)
+        level = stitched[-1]
+
+    return stitched
+
+def walk_forward(stock_data, strategy_params, parameter_space=None, optimization_goal='sharpe', method='grid',
+                 in_sample_bars=None, out_of_sample_bars=None, max_evals=None, time_budget=None,
+                 workers=None, seed=None):
+    """
+    Run walk-forward optimization and out-of-sample validation.
+
+    The history is split into rolling windows; each fold optimizes the
+    strategy on its in-sample window and backtests the best parameters on
+    the following out-of-sample window. Folds are independent and run
+    concurrently in worker processes, which memory-map one copy of the
+    indicator series computed up front for the whole history.
+
+    Args:
+        stock_data (dict): Historical stock data
+        strategy_params (dict): Current strategy parameters
+        parameter_space (dict): Parameter schema to search
+        optimization_goal (str): Metric to optimize for (sharpe, return, drawdown)
+        method (str): Optimization method used in each fold
+        in_sample_bars (int): Length of each in-sample window
+        out_of_sample_bars (int): Length of each out-of-sample window
+        max_evals (int): Evaluation budget per fold
+        time_budget (float): Optimization wall clock budget per fold
+        workers (int): Worker processes to use at most (defaults to WORKER_PROCESSES)
+        seed (int): Random seed for sampling
+
+    Returns:
+        dict: Per-fold results, stitched out-of-sample equity and its metrics
+    """
+    if optimization_goal not in OPTIMIZATION_GOALS:
+        raise Exception(f"Unknown optimization goal: {optimization_goal}")
+
+    in_sample_bars, out_of_sample_bars = window_lengths(in_sample_bars, out_of_sample_bars)
+    workers = int(workers or WORKER_PROCESSES)
+
+    dates = stock_data.get('dates', [])
+    prices = stock_data.get('prices', [])
+    folds = walk_forward_windows(len(prices), in_sample_bars, out_of_sample_bars)
+    if not folds:
+        raise Exception(
+            f"Not enough history for walk-forward: {len(prices)} bars, "
+            f"{in_sample_bars} in-sample bars required"
+        )
+    if len(folds) > MAX_FOLDS:
+        raise Exception(
+            f"Too many walk-forward folds: {len(folds)} (max {MAX_FOLDS}); "
+            f"use a longer out-of-sample window"
+        )
+
+    logger.debug("Walk-forward for %s: %s folds on %s workers", stock_data.get('ticker'), len(folds), workers)
+    started = time.monotonic()
+
+    options = {
+        'parameter_space': parameter_space,
+        'optimization_goal': optimization_goal,
+        'method': method,
+        'max_evals': max_evals,
+        'time_budget': time_budget,
+        'seed': seed
+    }
+
+    data = backtest_data(stock_data)
+
+    graph = shared_indicators(data, strategy_params, parameter_space)
+
+    if workers <= 1 or len(folds) <= 1:
+        outcomes = [run_fold(data, strategy_params, fold, options, graph) for fold in folds]
+    else:
+        # Workers memory-map one stored copy of the series instead of each
+        # rebuilding them
+        os.makedirs(BAR_STORE_DIR, exist_ok=True)
+        path = tempfile.mkdtemp(prefix='indicators_', dir=BAR_STORE_DIR)
+        pending = {}
+        try:
+            save_nodes(graph, path)
+            pool = worker_pool()
+            outcomes = [None] * len(folds)
+            queue = iter(enumerate(folds))
+
+            def submit():
+                item = next(queue, None)
+                if item is not None:
+                    number, fold = item
+                    pending[pool.submit(run_fold, data, strategy_params, fold, options, path)] = number
+
+            for _ in range(min(workers, WORKER_PROCESSES)):
+                submit()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outcomes[pending.pop(future)] = future.result()
+                    submit()
+        finally:
+            # After a failed fold, folds not yet started are not run
+            for future in pending:
+                future.cancel()
+            delete_bars(path)
+
+    fold_results = []
+    trades = []
+    for number, (result, _) in enumerate(outcomes, start=1):
+        fold_results.append({'fold': number, **result})
+        trades.extend(result['out_of_sample_trades'])
+
+    equity = stitch_equity([values for _, values in outcomes])
+    metrics = calculate_performance_metrics(equity, trades, periods_per_year=periods_per_year(stock_data.get('interval')))
+
+    # Time in the market over the stitched curve, weighted by window length
+    lengths = [len(values) for _, values in outcomes]
+    held = sum(r['out_of_sample_metrics']['exposure'] * n for r, n in zip(fold_results, lengths))
+    metrics['exposure'] = round(held / sum(lengths), 2)
+
+    in_scores = [score_metrics(r['in_sample_metrics'], optimization_goal) for r in fold_results]
+    out_scores = [score_metrics(r['out_of_sample_metrics'], optimization_goal) for r in fold_results]
+    in_scores = [score for score in in_scores if score is not None]
+    out_scores = [score for score in out_scores if score is not None]
+    mean_in = sum(in_scores) / len(in_scores) if in_scores else None
+    mean_out = sum(out_scores) / len(out_scores) if out_scores else None
+
+    return {
+        'ticker': stock_data.get('ticker'),
+        'goal': optimization_goal,
+        'method': method,
+        'in_sample_bars': in_sample_bars,
+        'out_of_sample_bars': out_of_sample_bars,
+        'folds': fold_results,
+        'out_of_sample_dates': dates[folds[0][1]:folds[-1][2]],
+        'out_of_sample_values': equity,
+        'out_of_sample_metrics': metrics,
+        'mean_in_sample_score': mean_in,
+        'mean_out_of_sample_score': mean_out,
+        # Share of in-sample performance that survives out-of-sample
+        'walk_forward_efficiency': round(mean_out / mean_in, 4) if mean_in and mean_out is not None else None,
+        'elapsed': round(time.monotonic() - started, 3)
+    }
@@ -0,0 +1,24 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Worker processes shared by optimizations, walk-forward runs and universe
+# backtests; each caller limits how many of its tasks are in flight
+WORKER_PROCESSES = int(os.environ.get("WORKER_PROCESSES", 0)) or os.cpu_count() or 1
+
+_pool = None
+_lock = threading.Lock()
+
+def worker_pool():
+    """
+    Return the process pool shared by every request, creating it on first use.
+
+    The pool is sized once, to WORKER_PROCESSES, and never replaced, so
+    concurrent requests never shut down each other's work. Callers wanting
+    fewer workers submit fewer tasks at a time instead.
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKER_PROCESSES)
+        return _pool
@@ -0,0 +1,387 @@
+"""
+Benchmark suite for the indicator, backtest and metrics code and the /backtest endpoint.
+
+Runs on synthetic data only, so no API keys or network are needed:
+
+    python -m benchmarks.suite                       # 1k, 10k and 100k bars
+    python -m benchmarks.suite --sizes 1k,1m --repeat 3
+    python -m benchmarks.suite --update-baseline     # record a new baseline
+
+Results are written as JSON and compared against the stored baseline; any
+benchmark slower than the baseline by more than the tolerance is reported
+and the run exits with status 1. The sequential kernels (the position state
+machine and the EMA/RSI recursion) are also checked against the NumPy code:
+the plain Python loops always, and their numba-compiled form when numba is
+installed. Backtests must produce identical trades and the recursion must
+agree within a relative tolerance; a mismatch fails the run the same way.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+from contextlib import contextmanager
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+from backend import backtester, kernels
+from backend.indicators import recursive_filter
+from backend.indicator_cache import indicator_cache
+from backend.optimizer import truncate_history
+from backend.indicator_graph import STRATEGY_INDICATORS
+from benchmarks.synthetic import parse_size, synthetic_stock_data
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, 'results.json')
+
+DEFAULT_SIZES = ('1k', '10k', '100k')
+DEFAULT_REPEAT = 5
+DEFAULT_SEED = 42
+
+# A benchmark regresses when its fastest run is this fraction slower than
+# the baseline's and the difference is above the noise floor; the minimum is
+# compared because it is the least disturbed by other load on the machine
+REGRESSION_TOLERANCE = 0.25
+NOISE_FLOOR_MS = 0.5
+
+STRATEGY_TYPES = tuple(STRATEGY_INDICATORS)
+
+# Random parameter sets compared between kernel backends per history size
+PARITY_CASES = 50
+
+# Largest relative difference allowed between the NumPy and loop recursions,
+# and the smoothing spans they are compared at
+FILTER_TOLERANCE = 1e-9
+FILTER_SPANS = (2, 12, 26, 200)
+
+# The Python loops are checked on at most this many of the most recent bars
+LOOP_PARITY_BARS = 10_000
+
+def time_call(func, repeat, setup=None):
+    """
+    Time a call several times after one untimed warm-up call.
+
+    Args:
+        func (callable): Function timed, called without arguments
+        repeat (int): Number of timed calls
+        setup (callable): Called before every timed call, outside the timing
+
+    Returns:
+        dict: Median and minimum time in milliseconds and the number of runs
+    """
+    if setup is not None:
+        setup()
+    func()
+
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'median_ms': round(statistics.median(durations), 4),
+        'min_ms': round(min(durations), 4),
+        'runs': repeat
+    }
+
+def strategy_params(strategy_type):
+    """Default parameters of a strategy type, as the frontend sends them."""
+    return {'strategy_type': strategy_type, 'position_size': 1.0}
+
+def benchmark_functions(stock_data, repeat):
+    """
+    Time every public computation of backend.backtester on one history.
+
+    Indicators are timed directly; run_backtest is timed per strategy type
+    with the indicator cache cleared first, so every run computes its
+    indicators; calculate_performance_metrics is timed on that run's curve.
+
+    Returns:
+        dict: Benchmark name -> timing
+    """
+    prices = np.asarray(stock_data['prices'], dtype=np.float64)
+    results = {
+        'calculate_ma': time_call(lambda: backtester.calculate_ma(prices, 50), repeat),
+        'calculate_rsi': time_call(lambda: backtester.calculate_rsi(prices), repeat),
+        'calculate_bollinger_bands': time_call(lambda: backtester.calculate_bollinger_bands(prices), repeat),
+        'calculate_macd': time_call(lambda: backtester.calculate_macd(prices), repeat),
+    }
+
+    for strategy_type in STRATEGY_TYPES:
+        params = strategy_params(strategy_type)
+        results[f'run_backtest/{strategy_type}'] = time_call(
+            lambda: backtester.run_backtest(stock_data, params), repeat, setup=indicator_cache.clear
+        )
+
+        run = backtester.run_backtest(stock_data, params)
+        values, trades = run['portfolio_values'], run['trades']
+        results[f'calculate_performance_metrics/{strategy_type}'] = time_call(
+            lambda: backtester.calculate_performance_metrics(values, trades), repeat
+        )
+
+    return results
+
+def random_strategy_params(rng):
+    """Draw strategy parameters covering every strategy type and risk exit."""
+    return {
+        'strategy_type': str(rng.choice(STRATEGY_TYPES)),
+        'ma_fast': int(rng.integers(2, 20)),
+        'ma_slow': int(rng.integers(20, 100)),
+        'rsi_period': int(rng.integers(5, 30)),
+        'bb_period': int(rng.integers(10, 40)),
+        'bb_std': float(rng.uniform(1, 3)),
+        'stop_loss_pct': float(rng.uniform(1, 10)),
+        'take_profit_pct': float(rng.uniform(2, 30)),
+        'max_hold_days': int(rng.integers(0, 60)),
+        'trailing_stop_pct': float(rng.choice([0, rng.uniform(1, 10)])),
+        'position_size': 1.0
+    }
+
+@contextmanager
+def loop_kernels():
+    """
+    Route the native kernel calls to the undecorated Python loops.
+
+    The loops are what numba compiles, so running them checks the same
+    logic without numba installed.
+    """
+    with mock.patch.object(kernels, '_simulate_native', kernels._simulate_loop), \
+            mock.patch.object(kernels, '_recursive_native', kernels._recursive_loop), \
+            mock.patch.object(kernels, '_backend', 'numba'):
+        yield
+
+def filter_error(prices):
+    """Return the largest relative difference between the NumPy and loop recursions."""
+    previous = kernels.set_backend('numpy')
+    try:
+        worst = 0.0
+        for span in FILTER_SPANS:
+            decay, gain = 1 - 2 / (span + 1), 2 / (span + 1)
+            vectorized = recursive_filter(prices, decay, gain, prices[0])
+            looped = kernels._recursive_loop(prices, decay, gain, float(prices[0]))
+            worst = max(worst, float(np.max(np.abs(vectorized - looped) / np.abs(looped))))
+        return worst
+    finally:
+        kernels.set_backend(previous)
+
+def check_kernel_parity(stock_data, cases=PARITY_CASES, seed=DEFAULT_SEED):
+    """
+    Run the same backtests on the NumPy kernels and on the sequential loops.
+
+    The loops run as plain Python, on the last LOOP_PARITY_BARS bars, so the
+    check does not depend on numba; when numba is installed they are also
+    run compiled on the whole history.
+
+    Returns:
+        dict: Cases checked, the kernels compared against NumPy, every case
+            whose trades differ ({'kernels', 'params'}) and the largest
+            relative error of the recursion
+    """
+    prices = np.asarray(stock_data['prices'], dtype=np.float64)
+    recent = truncate_history(stock_data, min(1.0, LOOP_PARITY_BARS / max(1, len(prices))))
+    rng = np.random.default_rng(seed)
+    previous = kernels.get_backend()
+    compared = ['python'] + (['numba'] if kernels.numba is not None else [])
+    mismatches = []
+
+    error = filter_error(prices[-LOOP_PARITY_BARS:])
+    if error > FILTER_TOLERANCE:
+        mismatches.append({'kernels': 'recursive_filter', 'params': {'relative_error': error}})
+
+    try:
+        for _ in range(cases):
+            params = random_strategy_params(rng)
+
+            for name in compared:
+                data = recent if name == 'python' else stock_data
+                kernels.set_backend('numpy')
+                indicator_cache.clear()
+                expected = backtester.run_backtest(data, params)['trades']
+
+                indicator_cache.clear()
+                if name == 'python':
+                    with loop_kernels():
+                        trades = backtester.run_backtest(data, params)['trades']
+                else:
+                    kernels.set_backend(name)
+                    trades = backtester.run_backtest(data, params)['trades']
+                if trades != expected:
+                    mismatches.append({'kernels': name, 'params': params})
+    finally:
+        kernels.set_backend(previous)
+        indicator_cache.clear()
+
+    return {'checked': cases, 'kernels': compared, 'filter_error': error, 'mismatches': mismatches}
+
+def benchmark_endpoint(stock_data, repeat):
+    """
+    Time POST /backtest through the Flask test client, one run per strategy type.
+
+    The data fetcher is replaced by one returning stock_data, so the request
+    covers parsing, the backtest and serialization but no network.
+
+    Returns:
+        dict: Benchmark name -> timing
+    """
+    import app as application
+
+    flask_app = application.app
+    flask_app.secret_key = flask_app.secret_key or 'benchmark'
+    client = flask_app.test_client()
+    results = {}
+
+    with mock.patch.object(application, 'get_stock_data', lambda ticker, years=5: stock_data):
+        for strategy_type in STRATEGY_TYPES:
+            body = {'ticker': stock_data['ticker'], 'strategy_params': strategy_params(strategy_type)}
+
+            def request():
+                response = client.post('/backtest', json=body)
+                if response.status_code != 200:
+                    raise Exception(f"/backtest failed: {response.get_json()}")
+
+            results[f'endpoint/backtest/{strategy_type}'] = time_call(request, repeat, setup=indicator_cache.clear)
+
+    return results
+
+def environment():
+    """Describe the machine and library versions the results were taken on."""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'kernel_backend': kernels.get_backend()
+    }
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, endpoints=True):
+    """
+    Run every benchmark for every history size.
+
+    Args:
+        sizes (iterable): History sizes ('1k', '10k', '100k', '1m' or bar counts)
+        repeat (int): Timed calls per benchmark
+        seed (int): Seed of the synthetic histories
+        endpoints (bool): Include the Flask endpoint benchmarks
+
+    Returns:
+        dict: 'environment', run settings, 'benchmarks' (name -> timing) and
+            'parity' (size -> kernel parity check), keyed by size
+    """
+    benchmarks = {}
+    parity = {}
+    for size in sizes:
+        stock_data = synthetic_stock_data(parse_size(size), seed=seed)
+        parity[size] = check_kernel_parity(stock_data, seed=seed)
+
+        timings = benchmark_functions(stock_data, repeat)
+        if endpoints:
+            timings.update(benchmark_endpoint(stock_data, repeat))
+
+        for name, timing in timings.items():
+            benchmarks[f'{size}/{name}'] = timing
+            print(f"{size}/{name:<48} {timing['median_ms']:>12.3f} ms", file=sys.stderr)
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'seed': seed,
+        'repeat': repeat,
+        'sizes': list(sizes),
+        'benchmarks': benchmarks,
+        'parity': parity
+    }
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE, noise_floor=NOISE_FLOOR_MS):
+    """
+    Compare the fastest run of every benchmark with a baseline run.
+
+    Returns:
+        list: One dict per regression with the name, both times and the ratio
+    """
+    regressions = []
+    for name, timing in results['benchmarks'].items():
+        reference = baseline['benchmarks'].get(name)
+        if reference is None:
+            continue
+
+        current, previous = timing['min_ms'], reference['min_ms']
+        if current > previous * (1 + tolerance) and current - previous > noise_floor:
+            regressions.append({
+                'name': name,
+                'baseline_ms': previous,
+                'min_ms': current,
+                'ratio': round(current / previous, 3) if previous else None
+            })
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(DEFAULT_SIZES),
+                        help="Comma separated history sizes (1k, 10k, 100k, 1m or bar counts)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Timed calls per benchmark")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Seed of the synthetic data")
+    parser.add_argument('--no-endpoints', action='store_true', help="Skip the Flask endpoint benchmarks")
+    parser.add_argument('--backend', choices=kernels.BACKENDS, help="Kernel backend to benchmark")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Where the results are written")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline results to compare against")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help="Allowed slowdown as a fraction of the baseline time")
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        kernels.set_backend(args.backend)
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    results = run_suite(sizes, args.repeat, args.seed, endpoints=not args.no_endpoints)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    mismatched = {size: check for size, check in results['parity'].items() if check['mismatches']}
+    if mismatched:
+        for size, check in mismatched.items():
+            first = check['mismatches'][0]
+            print(f"Kernels disagree with NumPy on {len(check['mismatches'])} {size} checks "
+                  f"({check['checked']} backtests), e.g. {first['kernels']}: {first['params']}", file=sys.stderr)
+        return 1
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one", file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if baseline.get('environment') != results['environment']:
+        print("Warning: baseline was recorded on a different environment", file=sys.stderr)
+
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print("No regressions against the baseline", file=sys.stderr)
+        return 0
+
+    print(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}:", file=sys.stderr)
+    for regression in regressions:
+        print(f"  {regression['name']:<56} {regression['baseline_ms']:>10.3f} -> "
+              f"{regression['min_ms']:>10.3f} ms (x{regression['ratio']})", file=sys.stderr)
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import numpy as np
+
+from backend.metrics import SESSION_MINUTES, periods_per_year
+
+# Named history lengths accepted by the benchmark suite
+SIZES = {
+    '1k': 1_000,
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+def parse_size(size):
+    """Turn '10k', '1m' or a plain number into a bar count."""
+    size = str(size).strip().lower()
+    if size in SIZES:
+        return SIZES[size]
+    return int(size)
+
+# Session open in minutes after midnight for intraday bar times
+SESSION_OPEN = 9 * 60 + 30
+
+def _bar_dates(bars, interval, start_date):
+    """Label bars with business days, or session times for intraday intervals."""
+    first_day = np.busday_offset(np.datetime64(start_date, 'D'), 0, roll='forward')
+    per_day = periods_per_year(interval) / 252
+
+    if per_day <= 1:
+        step = {'1week': 5, '1month': 21}.get(interval, 1)
+        days = np.busday_offset(first_day, np.arange(bars) * step)
+        return np.datetime_as_string(days, unit='D').tolist()
+
+    per_day = int(per_day)
+    minutes = SESSION_MINUTES // per_day
+    index = np.arange(bars)
+    days = np.busday_offset(first_day, index // per_day).astype('datetime64[m]')
+    times = days + SESSION_OPEN + (index % per_day) * minutes
+    return np.char.replace(np.datetime_as_string(times, unit='s'), 'T', ' ').tolist()
+
+def synthetic_stock_data(bars, seed=0, ticker='SYNTH', interval='1day', start_price=100.0,
+                         drift=0.07, volatility=0.2, start_date='1990-01-01'):
+    """
+    Generate a reproducible price history shaped like get_stock_data's output.
+
+    Closing prices follow geometric Brownian motion with the given annual
+    drift and volatility; opens, highs and lows are drawn around them so
+    every bar satisfies low <= open, close <= high. The time step follows
+    the interval, so drift and volatility stay annual. Daily bars are dated
+    with consecutive business days and intraday bars with times in the
+    regular session.
+
+    Args:
+        bars (int): Number of bars
+        seed (int): Random seed; the same seed always gives the same history
+        ticker (str): Ticker stored in the result
+        interval (str): Interval stored in the result
+        start_price (float): Price before the first bar
+        drift (float): Annual drift of the log price
+        volatility (float): Annual volatility of the log price
+        start_date (str): First date considered for the first bar
+
+    Returns:
+        dict: Historical stock data in chronological order
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1 / periods_per_year(interval)
+
+    log_returns = (drift - volatility ** 2 / 2) * dt + volatility * np.sqrt(dt) * rng.standard_normal(bars)
+    closes = start_price * np.exp(np.cumsum(log_returns))
+    opens = np.concatenate(([start_price], closes[:-1])) * np.exp(rng.normal(0, volatility * np.sqrt(dt) / 4, bars))
+
+    # Intrabar range beyond the open/close body
+    spread = np.abs(rng.normal(0, volatility * np.sqrt(dt) / 2, (2, bars)))
+    highs = np.maximum(opens, closes) * (1 + spread[0])
+    lows = np.minimum(opens, closes) * (1 - spread[1])
+    volumes = rng.lognormal(13, 0.5, bars).astype(np.int64)
+
+    dates = _bar_dates(bars, interval, start_date)
+
+    return {
+        'ticker': ticker,
+        'interval': interval,
+        'start_date': dates[0] if dates else None,
+        'end_date': dates[-1] if dates else None,
+        'dates': dates,
+        'prices': closes.tolist(),
+        'opens': opens.tolist(),
+        'highs': highs.tolist(),
+        'lows': lows.tolist(),
+        'volumes': volumes.astype(np.float64).tolist()
+    }
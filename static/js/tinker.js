@@ -344,7 +344,7 @@ document.addEventListener('DOMContentLoaded', function() {
         return params;
     }
     
-    // Optimize strategy parameters using AI
+    // Optimize strategy parameters by searching them with backtests
     async function optimizeStrategy() {
         const ticker = tickerInput.value.trim().toUpperCase();
         
@@ -369,6 +369,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 body: JSON.stringify({
                     ticker: ticker,
                     strategy_params: strategyParams,
+                    parameter_space: currentStrategy ? currentStrategy.parameters : null,
                     optimization_goal: 'sharpe'  // Default to Sharpe ratio
                 })
             });
@@ -378,10 +379,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(errorData.error || 'Failed to optimize strategy');
             }
             
-            const optimizedParams = await response.json();
+            const optimization = await response.json();
             
-            // Update form with optimized parameters
-            updateParamsWithOptimized(optimizedParams);
+            // Update form with the best parameters found
+            updateParamsWithOptimized(optimization.best_params);
             
             // Hide loading
             hideBacktestLoading();